@@ -1,14 +1,64 @@
+from contextlib import asynccontextmanager
+
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.orm import sessionmaker, declarative_base
 from .settings import settings
 
+# Sync driver -> asyncio driver for the same database
+_ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+}
+
+
+def _async_database_url(url: str) -> str:
+    u = make_url(url)
+    driver = _ASYNC_DRIVERS.get(u.drivername, u.drivername)
+    return u.set(drivername=driver).render_as_string(hide_password=False)
+
+
 engine = create_engine(settings.database_url, future=True)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, future=True)
 Base = declarative_base()
 
+# Async engine for request paths that must not block the event loop (chat).
+# expire_on_commit=False so ORM attributes stay readable after commit without
+# an implicit (and, under asyncio, illegal) lazy refresh.
+async_engine = create_async_engine(_async_database_url(settings.database_url))
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+@asynccontextmanager
+async def unit_of_work(db: AsyncSession):
+    """
+    One transaction for a whole request turn.
+
+    Helpers used inside only stage rows on the session; everything is flushed
+    and committed once on exit (or rolled back if the block raises).
+    """
+    try:
+        yield db
+        await db.commit()
+    except BaseException:
+        await db.rollback()
+        raise
@@ -3,23 +3,52 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
 from sqlalchemy import text
-from collections import deque
-from typing import Dict, Deque
-import time
+from contextlib import asynccontextmanager
+import json
+import math
+
+import anyio
 
 from .settings import settings
-from .db import Base, engine, get_db
+from .db import Base, engine, async_engine, get_db
+from .services.http import start_http_client, close_http_client
+from .services import stt_models
+from .services.voice_pool import start_voice_pool, shutdown_voice_pool
+from .services.cohort import start_cohort_refresher, stop_cohort_refresher
+from .services.ratelimit import build_rate_limiter
+from .services.resilience import providers_snapshot
+from .migrations import run_migrations
 
 from .routers import user as user_router
 from .routers import chatbot as chatbot_router
 from .routers import mood as mood_router
 from .routers import auth as auth_router
+from .routers import sentiment as sentiment_router
+
+
+# --------------------------------------------------
+# Lifespan (shared clients / pools)
+# --------------------------------------------------
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await start_http_client()
+    if settings.stt_warmup:
+        await anyio.to_thread.run_sync(stt_models.warmup)
+    start_voice_pool()
+    start_cohort_refresher()
+    try:
+        yield
+    finally:
+        await stop_cohort_refresher()
+        shutdown_voice_pool()
+        await close_http_client()
+        await async_engine.dispose()
 
 
 # --------------------------------------------------
 # App
 # --------------------------------------------------
-app = FastAPI(title="BOBA Backend", version="0.3.0")
+app = FastAPI(title="BOBA Backend", version="0.3.0", lifespan=lifespan)
 
 
 # --------------------------------------------------
@@ -43,14 +72,31 @@ app.add_middleware(
 # DB (dev convenience)
 # --------------------------------------------------
 Base.metadata.create_all(bind=engine)
+run_migrations(engine)
 
 
 # --------------------------------------------------
 # Rate Limiter (chat only)
 # --------------------------------------------------
-RATE_WINDOW_SEC = 60
-RATE_MAX_REQS = 10
-_rate_buckets: Dict[str, Deque[float]] = {}
+rate_limiter = build_rate_limiter(settings)
+# The middleware never sees WebSocket traffic; /chat/voice/stream charges
+# each utterance against the same limiter through app.state
+app.state.rate_limiter = rate_limiter
+
+
+async def _rate_limit_user_id(request: Request) -> str | None:
+    if settings.rate_limit_key != "user":
+        return None
+
+    user_id = request.headers.get("x-user-id") or request.query_params.get("user_id")
+    if not user_id and request.headers.get("content-type", "").startswith("application/json"):
+        # Body is cached by Starlette, the endpoint can still read it
+        try:
+            body = json.loads(await request.body() or b"{}")
+            user_id = body.get("user_id") if isinstance(body, dict) else None
+        except ValueError:
+            user_id = None
+    return user_id
 
 
 @app.middleware("http")
@@ -61,22 +107,15 @@ async def rate_limit(request: Request, call_next):
 
     # Apply limit ONLY to chat endpoints
     if request.url.path.startswith(("/chat/text", "/chat/voice")):
-        key = request.client.host if request.client else "unknown"
-        now = time.time()
-        q = _rate_buckets.setdefault(key, deque())
-
-        # drop timestamps outside the window
-        while q and (now - q[0]) > RATE_WINDOW_SEC:
-            q.popleft()
-
-        if len(q) >= RATE_MAX_REQS:
+        ip = request.client.host if request.client else "unknown"
+        allowed, retry_after = await rate_limiter.hit(ip, await _rate_limit_user_id(request))
+        if not allowed:
             return JSONResponse(
                 {"detail": "Too many requests, please slow down."},
                 status_code=429,
+                headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
             )
 
-        q.append(now)
-
     return await call_next(request)
 
 
@@ -87,6 +126,7 @@ app.include_router(auth_router.router)
 app.include_router(user_router.router)
 app.include_router(chatbot_router.router)
 app.include_router(mood_router.router)
+app.include_router(sentiment_router.router)
 
 
 # --------------------------------------------------
@@ -96,11 +136,19 @@ app.include_router(mood_router.router)
 def debug_model():
     return {
         "provider": settings.default_model_provider,
-        "model": settings.default_model_name,
+        "model": settings.ollama_model
+        if settings.default_model_provider.lower() == "ollama"
+        else settings.default_model_name,
         "has_openai_key": bool(settings.openai_api_key),
     }
 
 
+@app.get("/debug/providers")
+def debug_providers():
+    # Circuit breaker state and counters per LLM provider
+    return providers_snapshot()
+
+
 # --------------------------------------------------
 # Health
 # --------------------------------------------------
@@ -0,0 +1,208 @@
+# Lightweight, idempotent schema upgrades for existing databases.
+# create_all() only creates missing tables; columns added to existing models
+# are patched in here so dev/prod databases keep working without Alembic.
+import json
+
+from sqlalchemy import Table, bindparam, func, inspect, select, text, update
+from sqlalchemy.engine import Connection, Engine
+
+from .models import Conversation, Message, Mood
+from .services.cohort import refresh_cohort_cube
+from .services.memory import PREVIEW_CHARS
+
+
+def _add_missing_columns(conn: Connection, table: str, columns: dict[str, str]) -> list[str]:
+    existing = {c["name"] for c in inspect(conn).get_columns(table)}
+    added = []
+    for name, ddl in columns.items():
+        if name not in existing:
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {name} {ddl}"))
+            added.append(name)
+    return added
+
+
+def _ensure_indexes(conn: Connection, table: Table):
+    # create_all() only builds indexes together with a new table
+    for index in table.indexes:
+        index.create(conn, checkfirst=True)
+
+
+def _as_dict(value) -> dict | None:
+    # Raw JSON columns come back as str on SQLite, already parsed on Postgres
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            return None
+    return value if isinstance(value, dict) else None
+
+
+def _backfill_turn_counters(conn: Connection):
+    # Move turn_count / last_trend_turn out of the old JSON meta dict
+    rows = conn.execute(text("SELECT id, meta FROM conversations WHERE meta IS NOT NULL")).all()
+    for conv_id, meta in rows:
+        meta = _as_dict(meta)
+        if not meta or "turn_count" not in meta:
+            continue
+        conn.execute(
+            text("UPDATE conversations SET turn_count = :tc, last_trend_turn = :lt WHERE id = :id"),
+            {
+                "tc": int(meta.get("turn_count") or 0),
+                "lt": int(meta["last_trend_turn"]) if meta.get("last_trend_turn") is not None else None,
+                "id": conv_id,
+            },
+        )
+
+
+def backfill_sentiment_compound(conn: Connection, batch_size: int = 1000) -> int:
+    """
+    Copy annotations.scores.compound into messages.sentiment_compound for user
+    messages that don't have it yet. Walks ids in batches; returns rows updated.
+    """
+    updated = 0
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            text(
+                "SELECT id, annotations FROM messages "
+                "WHERE id > :last_id AND role = 'user' AND sentiment_compound IS NULL "
+                "ORDER BY id LIMIT :n"
+            ),
+            {"last_id": last_id, "n": batch_size},
+        ).all()
+        if not rows:
+            return updated
+
+        params = []
+        for msg_id, annotations in rows:
+            scores = (_as_dict(annotations) or {}).get("scores") or {}
+            try:
+                compound = float(scores["compound"])
+            except (KeyError, TypeError, ValueError):
+                continue
+            params.append({"c": compound, "id": msg_id})
+
+        if params:
+            conn.execute(text("UPDATE messages SET sentiment_compound = :c WHERE id = :id"), params)
+            updated += len(params)
+        last_id = rows[-1][0]
+
+
+def backfill_conversation_stats(conn: Connection, batch_size: int = 1000) -> int:
+    """
+    Fill conversations.message_count / last_message_at / last_message_preview
+    from messages, in id batches. Values go through typed binds so SQLite
+    stores the same timestamp format new writes use (keyset cursors compare
+    them). Empty conversations keep last_message_at NULL, as append_message_async
+    leaves them, so they stay out of the conversation list. Returns
+    conversations updated.
+    """
+    conv = Conversation.__table__
+    msg = Message.__table__
+    updated = 0
+    last_id = 0
+    while True:
+        convs = conn.execute(
+            select(conv.c.id, conv.c.started_at).where(conv.c.id > last_id).order_by(conv.c.id).limit(batch_size)
+        ).all()
+        if not convs:
+            return updated
+        ids = [c.id for c in convs]
+
+        stats = {
+            row.conversation_id: row
+            for row in conn.execute(
+                select(
+                    msg.c.conversation_id,
+                    func.count().label("n"),
+                    func.max(msg.c.created_at).label("last_at"),
+                    func.max(msg.c.id).label("last_id"),
+                )
+                .where(msg.c.conversation_id.in_(ids))
+                .group_by(msg.c.conversation_id)
+            )
+        }
+        previews = dict(
+            conn.execute(
+                select(msg.c.id, msg.c.content).where(msg.c.id.in_([st.last_id for st in stats.values()]))
+            ).all()
+        ) if stats else {}
+
+        params = []
+        for c in convs:
+            st = stats.get(c.id)
+            preview = " ".join((previews.get(st.last_id) or "").split())[:PREVIEW_CHARS] if st else ""
+            params.append({
+                "b_id": c.id,
+                "n": st.n if st else 0,
+                "last_at": (st.last_at or c.started_at) if st else None,
+                "preview": preview or None,
+            })
+        conn.execute(
+            update(conv)
+            .where(conv.c.id == bindparam("b_id"))
+            .values(
+                message_count=bindparam("n"),
+                last_message_at=bindparam("last_at"),
+                last_message_preview=bindparam("preview"),
+            ),
+            params,
+        )
+        updated += len(params)
+        last_id = ids[-1]
+
+
+def backfill_mood_daily(conn: Connection) -> int:
+    """
+    Rebuild the mood_daily rollup from the moods table. Returns rollup rows.
+    """
+    conn.execute(text("DELETE FROM mood_daily"))
+    conn.execute(
+        text(
+            "INSERT INTO mood_daily (user_id_fk, day, mood, count, sum_sentiment, sentiment_count) "
+            "SELECT user_id_fk, day, mood, COUNT(*), COALESCE(SUM(sentiment_score), 0), COUNT(sentiment_score) "
+            "FROM moods WHERE day IS NOT NULL "
+            "GROUP BY user_id_fk, day, mood"
+        )
+    )
+    return conn.execute(text("SELECT COUNT(*) FROM mood_daily")).scalar_one()
+
+
+def run_migrations(engine: Engine):
+    with engine.begin() as conn:
+        added = _add_missing_columns(conn, "conversations", {
+            "turn_count": "INTEGER NOT NULL DEFAULT 0",
+            "last_trend_turn": "INTEGER",
+            "summary": "TEXT",
+            "summary_through_id": "INTEGER",
+            "message_count": "INTEGER NOT NULL DEFAULT 0",
+            "last_message_at": "TIMESTAMP WITH TIME ZONE",
+            "last_message_preview": "VARCHAR(160)",
+        })
+        if "turn_count" in added:
+            _backfill_turn_counters(conn)
+        _ensure_indexes(conn, Conversation.__table__)
+        if "message_count" in added:
+            backfill_conversation_stats(conn)
+
+        added = _add_missing_columns(conn, "messages", {
+            "sentiment_compound": "FLOAT",
+        })
+        _ensure_indexes(conn, Message.__table__)
+        if "sentiment_compound" in added:
+            backfill_sentiment_compound(conn)
+
+        _ensure_indexes(conn, Mood.__table__)
+
+        _add_missing_columns(conn, "sentiment_states", {
+            "version": "INTEGER NOT NULL DEFAULT 0",
+        })
+
+        # mood_daily is new to existing databases (create_all made it empty)
+        rollup_empty = conn.execute(text("SELECT 1 FROM mood_daily LIMIT 1")).first() is None
+        if rollup_empty and conn.execute(text("SELECT 1 FROM moods LIMIT 1")).first() is not None:
+            backfill_mood_daily(conn)
+
+        # Likewise the cohort cube, built from mood_daily
+        if conn.execute(text("SELECT 1 FROM mood_cohort_daily LIMIT 1")).first() is None:
+            refresh_cohort_cube(conn, full=True)
@@ -13,6 +13,7 @@ from sqlalchemy import (
     func,
     Date,
     Float,
+    Index,
 )
 
 from .db import Base
@@ -57,12 +58,22 @@ class User(Base):
         cascade="all, delete-orphan",
     )
 
+    sentiment_state: Mapped["SentimentState | None"] = relationship(
+        back_populates="user",
+        cascade="all, delete-orphan",
+        uselist=False,
+    )
+
 
 # --------------------------------------------------
 # Conversation
 # --------------------------------------------------
 class Conversation(Base):
     __tablename__ = "conversations"
+    __table_args__ = (
+        # Keyset-paginated "my conversations, most recent first"
+        Index("ix_conversations_user_last_message", "user_id_fk", "last_message_at", "id"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
 
@@ -73,6 +84,20 @@ class Conversation(Base):
 
     meta: Mapped[dict | None] = mapped_column(JSON, nullable=True)
 
+    # Trend-reflection throttle (real columns so in-place updates persist)
+    turn_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    last_trend_turn: Mapped[int | None] = mapped_column(Integer, nullable=True)
+
+    # Rolling summary of messages that fell out of the prompt history window;
+    # summary_through_id is the newest message folded into it
+    summary: Mapped[str | None] = mapped_column(Text, nullable=True)
+    summary_through_id: Mapped[int | None] = mapped_column(Integer, nullable=True)
+
+    # Denormalized for conversation lists (maintained by append_message_async)
+    message_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    last_message_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    last_message_preview: Mapped[str | None] = mapped_column(String(160), nullable=True)
+
     user: Mapped["User"] = relationship(back_populates="conversations")
     messages: Mapped[list["Message"]] = relationship(
         back_populates="conversation",
@@ -89,7 +114,17 @@ class Message(Base):
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
 
-    conversation_id: Mapped[int] = mapped_column(ForeignKey("conversations.id"), index=True)
+    # Hot paths: history by conversation ordered by time, and per-role scans
+    # (user messages) for sentiment. conversation_id alone is covered by the
+    # leading column of both.
+    __table_args__ = (
+        Index("ix_messages_conversation_created", "conversation_id", "created_at"),
+        Index("ix_messages_conversation_role_created", "conversation_id", "role", "created_at"),
+        # Keyset-paginated message lists (id cursor within a conversation)
+        Index("ix_messages_conversation_id_id", "conversation_id", "id"),
+    )
+
+    conversation_id: Mapped[int] = mapped_column(ForeignKey("conversations.id"))
 
     role: Mapped[str] = mapped_column(String(16))  # user | assistant | system
     content: Mapped[str] = mapped_column(Text)
@@ -97,6 +132,9 @@ class Message(Base):
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
     annotations: Mapped[dict | None] = mapped_column(JSON, nullable=True)
 
+    # VADER compound copied out of annotations so SQL can filter/aggregate it
+    sentiment_compound: Mapped[float | None] = mapped_column(Float, nullable=True)
+
     conversation: Mapped["Conversation"] = relationship(back_populates="messages")
 
 
@@ -123,6 +161,10 @@ class Memory(Base):
 # --------------------------------------------------
 class Mood(Base):
     __tablename__ = "moods"
+    __table_args__ = (
+        # Per-user day ranges (analytics)
+        Index("ix_moods_user_day", "user_id_fk", "day"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
 
@@ -136,3 +178,64 @@ class Mood(Base):
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
 
     user: Mapped["User"] = relationship(back_populates="moods")
+
+
+# --------------------------------------------------
+# Daily mood rollup (maintained on write)
+# --------------------------------------------------
+class MoodDaily(Base):
+    __tablename__ = "mood_daily"
+
+    # PK order serves "one user, a range of days" scans
+    user_id_fk: Mapped[int] = mapped_column(ForeignKey("users.id"), primary_key=True)
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    mood: Mapped[str] = mapped_column(String(32), primary_key=True)
+
+    count: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    # Only moods logged with a sentiment_score contribute here
+    sum_sentiment: Mapped[float] = mapped_column(Float, default=0.0, server_default="0")
+    sentiment_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+
+
+# --------------------------------------------------
+# Cohort cube: mood_daily summed over all users
+# --------------------------------------------------
+class MoodCohortDaily(Base):
+    __tablename__ = "mood_cohort_daily"
+
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    mood: Mapped[str] = mapped_column(String(32), primary_key=True)
+
+    users: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    count: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    sum_sentiment: Mapped[float] = mapped_column(Float, default=0.0, server_default="0")
+    sentiment_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+
+
+class MoodCohortDirty(Base):
+    # Days whose mood_daily rows changed since the cube was last refreshed
+    __tablename__ = "mood_cohort_dirty"
+
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+
+
+# --------------------------------------------------
+# Rolling sentiment state (trend reflection)
+# --------------------------------------------------
+class SentimentState(Base):
+    __tablename__ = "sentiment_states"
+
+    user_id_fk: Mapped[int] = mapped_column(ForeignKey("users.id"), primary_key=True)
+
+    # Ring buffer of recent user-message compounds (see services/trend.py)
+    window: Mapped[list | None] = mapped_column(JSON, nullable=True)
+    head: Mapped[int] = mapped_column(Integer, default=0)
+    size: Mapped[int] = mapped_column(Integer, default=0)
+    early_sum: Mapped[float] = mapped_column(Float, default=0.0)
+    late_sum: Mapped[float] = mapped_column(Float, default=0.0)
+    # Bumped on every write; concurrent turns compare-and-swap on it
+    version: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+
+    updated_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), onupdate=func.now())
+
+    user: Mapped["User"] = relationship(back_populates="sentiment_state")
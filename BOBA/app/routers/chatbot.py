@@ -1,32 +1,47 @@
-from fastapi import APIRouter, Depends, UploadFile, File, Form, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, UploadFile, File, Form, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from dataclasses import dataclass, field
 from datetime import datetime, timezone
+from typing import AsyncIterator
+import json
+import logging
+import math
 
-from ..db import get_db
+import anyio
+
+from ..db import AsyncSessionLocal, get_async_db, unit_of_work
+from ..models import User, Conversation
 from ..schemas import ChatIn, ChatOut
 
 from ..services.memory import (
-    ensure_user,
-    start_or_get_conversation,
-    append_message,
-    last_n_messages,
-    recall_profile,
+    get_user_async,
+    get_conversation_async,
+    start_or_get_conversation_async,
+    next_turn_async,
+    append_message_async,
+    history_window_async,
+    store_summary_async,
+    profile_with_memories,
     extract_memories_from_text,
-    save_kv_memories,
-    update_user_profile_from_memories,
-    sentiment_trend_summary,
+    save_kv_memories_async,
+    update_user_profile_from_memories_async,
+    sentiment_trend_summary_async,
 )
 
 from ..services.empathy import analyze_text
-from ..services.llm import generate_reply
+from ..services.crisis import crisis_matcher
+from ..services.user_cache import user_cache
+from ..services.llm import generate_reply, stream_reply, prompt_prefix_hash, ReplySource, StreamInterrupted
 from ..services.timeline import human_delta
+from ..services.history import format_line
+from ..settings import settings
 
 # Voice helpers (kept even if you focus on text)
-from ..services.voice import (
-    convert_to_wav_bytes,
-    transcribe_bytes,
-    prosody_features,
-)
+from ..services.voice import decode_audio, prosody_features, StreamingRecognizer, SAMPLE_RATE
+from ..services.voice_pool import run_voice_analysis, VoicePoolSaturated, VoicePoolUnavailable
+
+log = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/chat", tags=["chat"])
 
@@ -40,30 +55,17 @@ def _normalize_conversation_id(conversation_id: int | None) -> int | None:
 
 
 def _history_to_text(history) -> str:
-    lines = []
-    for m in history:
-        role = "User" if m.role == "user" else "BOBA" if m.role == "assistant" else m.role
-        content = (m.content or "").strip()
-        if content:
-            lines.append(f"{role}: {content}")
-    return "\n".join(lines).strip()
+    lines = [format_line(m.role, m.content) for m in history]
+    return "\n".join(line for line in lines if line).strip()
 
 
 def _is_crisis_like(text: str) -> bool:
     """
     Non-clinical keyword screen. This is a SAFETY TRIGGER, not a diagnosis.
     We use it to decide whether to bypass the LLM and show crisis resources.
+    The lexicon lives in app/data/crisis_terms.txt (see services/crisis.py).
     """
-    t = (text or "").lower()
-
-    keywords = [
-        "suicide", "kill myself", "end my life", "want to die", "i want to die",
-        "self harm", "self-harm", "hurt myself", "cut myself", "cutting",
-        "overdose", "hang myself", "jump off", "take my life",
-        "can't go on", "no reason to live",
-    ]
-
-    return any(k in t for k in keywords)
+    return crisis_matcher.is_crisis(text)
 
 
 def _crisis_reply(profile: dict) -> str:
@@ -85,220 +87,497 @@ def _crisis_reply(profile: dict) -> str:
     )
 
 
-@router.post("/text", response_model=ChatOut)
-async def chat_text(payload: ChatIn, db: Session = Depends(get_db)):
-    payload.conversation_id = _normalize_conversation_id(payload.conversation_id)
+@dataclass
+class _Turn:
+    user: User
+    conv: Conversation | None  # None until staged for a new conversation
+    text: str
+    analysis: dict
+    profile: dict
+    last_seen: datetime | None
+    last_delta: str | None
+    crisis: bool
+    learned: dict = field(default_factory=dict)
+    prompt: str = ""
+    trend: str | None = None
+    # Summary fold computed while building the prompt, stored with the turn
+    # if the conversation's summary_through_id is still summary_base_id
+    summary: str | None = None
+    summary_through_id: int | None = None
+    summary_base_id: int | None = None
+
+
+async def _prepare_turn(
+    db: AsyncSession,
+    user_id: str,
+    conversation_id: int | None,
+    text: str,
+    analysis: dict,
+) -> _Turn:
+    """
+    Everything a reply needs, read without staging anything. The caller ends
+    the read transaction before generating the reply so no pooled connection
+    is held for the provider call, then writes the turn with _stage_turn.
+    """
+    # A new user/conversation stays transient until _stage_turn
+    user = await get_user_async(db, user_id) or User(user_id=user_id)
+    conv = await get_conversation_async(db, user, conversation_id)
 
-    user = ensure_user(db, payload.user_id)
-    conv = start_or_get_conversation(db, user, payload.conversation_id)
+    last_seen = user.last_seen
 
-    last_delta = human_delta(user.last_seen)
+    # Explicit memory learning only when user states facts
+    learned = extract_memories_from_text(text)
 
-    # Analyze user text
-    analysis = analyze_text(payload.message)
+    turn = _Turn(
+        user=user,
+        conv=conv,
+        text=text,
+        analysis=analysis,
+        profile=profile_with_memories(user, learned),
+        last_seen=last_seen,
+        last_delta=human_delta(last_seen),
+        # ✅ Phase 5: Safety override (bypass LLM)
+        crisis=_is_crisis_like(text),
+        learned=learned,
+    )
+    if turn.crisis:
+        return turn
 
-    # Save user message
-    append_message(
+    # Persisted history within the token budget; the current message is
+    # added to the prompt once, below
+    base_id = conv.summary_through_id if conv else None
+    history, summary, through_id = await history_window_async(db, conv)
+    if through_id is not None:
+        turn.summary, turn.summary_through_id = summary, through_id
+        turn.summary_base_id = base_id
+
+    history_text = _history_to_text(history)
+
+    turn.prompt = (
+        "Conversation so far:\n"
+        f"{history_text}\n\n"
+        f"User: {text}"
+    )
+    if summary:
+        turn.prompt = f"Earlier in this conversation (summary):\n{summary}\n\n" + turn.prompt
+
+    # Trend reflection (optional, throttled per conversation)
+    turn_no = ((conv.turn_count if conv else 0) or 0) + 1
+    last_trend_turn = conv.last_trend_turn if conv else None
+    allow_trend = (last_trend_turn is None) or ((turn_no - last_trend_turn) >= 4)
+
+    if allow_trend:
+        turn.trend = await sentiment_trend_summary_async(db, user, min_msgs=6, pending=analysis)
+
+    return turn
+
+
+async def _stage_turn(db: AsyncSession, turn: _Turn, reply_text: str, reply_annotations: dict):
+    """
+    Stages the whole turn: user message (which also advances the user's
+    rolling sentiment state), learned memories, conversation counters and
+    the reply. The caller commits once.
+    """
+    user = turn.user
+    if turn.conv is None:
+        turn.conv = await start_or_get_conversation_async(db, user, None)
+    conv = turn.conv
+
+    if turn.summary_through_id is not None:
+        await store_summary_async(
+            db, conv, turn.summary, turn.summary_through_id, base_id=turn.summary_base_id
+        )
+
+    await append_message_async(
         db,
         conv,
         role="user",
-        content=payload.message,
-        annotations=analysis,
+        content=turn.text,
+        annotations=turn.analysis,
+        user=user,
     )
 
-    # Explicit memory learning only when user states facts
-    learned = extract_memories_from_text(payload.message)
-    if learned:
-        save_kv_memories(db, user, learned)
-        update_user_profile_from_memories(db, user, learned)
-
-    profile = recall_profile(user)
+    if turn.learned:
+        await save_kv_memories_async(db, user, turn.learned)
+        await update_user_profile_from_memories_async(db, user, turn.learned)
 
-    # ✅ Phase 5: Safety override (bypass LLM)
-    if _is_crisis_like(payload.message):
-        reply_text = _crisis_reply(profile)
+    if not turn.crisis:
+        turn_no = await next_turn_async(db, conv)
+        if turn.trend:
+            conv.last_trend_turn = turn_no
 
-        append_message(
+    if reply_text:
+        await append_message_async(
             db,
             conv,
             role="assistant",
             content=reply_text,
-            annotations={"provider": "safety", "reason": "crisis_like"},
+            annotations=reply_annotations,
         )
 
-        user.last_seen = datetime.now(timezone.utc)
-        db.commit()
+    user.last_seen = datetime.now(timezone.utc)
 
-        return ChatOut(
-            conversation_id=conv.id,
-            reply=reply_text,
-            last_seen_delta_human=last_delta,
-            annotations=analysis,
-        )
 
-    # Build context for LLM
-    history = last_n_messages(db, conv, n=12)
-    history_text = _history_to_text(history)
+def _crisis_annotations() -> dict:
+    return {"provider": "safety", "reason": "crisis_like"}
 
-    prompt = (
-        "Conversation so far:\n"
-        f"{history_text}\n\n"
-        f"User: {payload.message}"
+
+def _llm_annotations(turn: _Turn, source: ReplySource) -> dict:
+    sentiment = turn.analysis.get("sentiment", "neutral")
+    annotations = {
+        "provider": source.provider,
+        "sentiment_seen": sentiment,
+    }
+    if source.fallback:
+        annotations["fallback"] = source.fallback
+    if source.provider != "rule":
+        # Lets us measure provider prompt-cache hit rates per prefix (only
+        # for prompts that actually reached the provider)
+        annotations["prompt_prefix"] = prompt_prefix_hash(sentiment)
+    return annotations
+
+
+def _chat_out(turn: _Turn, reply_text: str) -> ChatOut:
+    return ChatOut(
+        conversation_id=turn.conv.id,
+        reply=reply_text,
+        last_seen_delta_human=turn.last_delta,
+        annotations=turn.analysis,
     )
 
-    # Trend reflection (optional, throttled via conv.meta)
-    trend = None
-    if getattr(conv, "meta", None) is None or not isinstance(conv.meta, dict):
-        conv.meta = {}
 
-    turn = int(conv.meta.get("turn_count", 0)) + 1
-    conv.meta["turn_count"] = turn
+async def _chat_turn(
+    db: AsyncSession,
+    user_id: str,
+    conversation_id: int | None,
+    text: str,
+    analysis: dict,
+) -> ChatOut:
+    """
+    Shared text/voice turn. Reads happen first and their transaction ends
+    before the provider call; the turn is then staged and written in a
+    single flush + commit when the unit of work exits.
+    """
+    turn = await _prepare_turn(db, user_id, conversation_id, text, analysis)
+    # Nothing is staged yet: this only returns the connection to the pool
+    # (expire_on_commit=False keeps the loaded rows usable)
+    await db.commit()
+
+    if turn.crisis:
+        reply_text = _crisis_reply(turn.profile)
+        reply_annotations = _crisis_annotations()
+    else:
+        reply_text, source = await generate_reply(
+            prompt=turn.prompt,
+            profile=turn.profile,
+            sentiment_label=analysis.get("sentiment", "neutral"),
+            last_seen=turn.last_seen,
+            trend_summary=turn.trend,
+            followup_question=None,
+        )
+        reply_annotations = _llm_annotations(turn, source)
 
-    last_trend_turn = conv.meta.get("last_trend_turn")
-    allow_trend = (last_trend_turn is None) or ((turn - int(last_trend_turn)) >= 4)
+    async with unit_of_work(db):
+        await _stage_turn(db, turn, reply_text, reply_annotations)
 
-    if allow_trend:
-        trend = sentiment_trend_summary(db, user, lookback_user_msgs=18, min_msgs=6)
-        if trend:
-            conv.meta["last_trend_turn"] = turn
-
-    db.commit()
-
-    reply_text = await generate_reply(
-        prompt=prompt,
-        profile=profile,
-        sentiment_label=analysis.get("sentiment", "neutral"),
-        last_seen=user.last_seen,
-        trend_summary=trend,
-        followup_question=None,
-    )
+    user_cache.put(turn.user)
+    return _chat_out(turn, reply_text)
 
-    append_message(
-        db,
-        conv,
-        role="assistant",
-        content=reply_text,
-        annotations={"provider": "llm", "sentiment_seen": analysis.get("sentiment")},
-    )
 
-    user.last_seen = datetime.now(timezone.utc)
-    db.commit()
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
 
-    return ChatOut(
-        conversation_id=conv.id,
-        reply=reply_text,
-        last_seen_delta_human=last_delta,
-        annotations=analysis,
+
+async def _stream_turn(db: AsyncSession, turn: _Turn) -> AsyncIterator[str]:
+    parts: list[str] = []
+    completed = False
+    source = ReplySource()
+    try:
+        async for token in stream_reply(
+            prompt=turn.prompt,
+            profile=turn.profile,
+            sentiment_label=turn.analysis.get("sentiment", "neutral"),
+            last_seen=turn.last_seen,
+            trend_summary=turn.trend,
+            source=source,
+        ):
+            parts.append(token)
+            yield _sse("token", {"text": token})
+        completed = True
+    except StreamInterrupted:
+        # Keep the partial reply (annotated as interrupted below)
+        yield _sse("error", {"detail": "The reply was cut off, please try again."})
+    finally:
+        # Persist the turn even if the client disconnected mid-stream; the
+        # shield keeps the commit from being cancelled along with the response.
+        # No connection is held while tokens are relayed: the session only
+        # goes back to the pool for this write.
+        with anyio.CancelScope(shield=True):
+            annotations = _llm_annotations(turn, source)
+            if not completed:
+                annotations["interrupted"] = True
+            try:
+                async with unit_of_work(db):
+                    await _stage_turn(db, turn, "".join(parts).strip(), annotations)
+                user_cache.put(turn.user)
+            finally:
+                await db.close()
+
+    yield _sse("done", _chat_out(turn, "".join(parts).strip()).model_dump(mode="json"))
+
+
+def _sse_response(events: AsyncIterator[str]) -> StreamingResponse:
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
 
 
+async def _single_event_stream(out: ChatOut) -> AsyncIterator[str]:
+    yield _sse("token", {"text": out.reply})
+    yield _sse("done", out.model_dump(mode="json"))
+
+
+@router.post("/text", response_model=ChatOut)
+async def chat_text(payload: ChatIn, db: AsyncSession = Depends(get_async_db)):
+    payload.conversation_id = _normalize_conversation_id(payload.conversation_id)
+
+    # Analyze user text
+    analysis = analyze_text(payload.message)
+
+    return await _chat_turn(db, payload.user_id, payload.conversation_id, payload.message, analysis)
+
+
+@router.post("/text/stream")
+async def chat_text_stream(payload: ChatIn):
+    """
+    Same turn as /chat/text, relayed as server-sent events:
+    `token` events with content deltas, an `error` event if the provider
+    fails mid-reply, then one `done` event carrying the ChatOut body. The
+    turn (user and assistant messages) is persisted once the stream ends.
+    """
+    payload.conversation_id = _normalize_conversation_id(payload.conversation_id)
+
+    analysis = analyze_text(payload.message)
+
+    # The response body outlives request-scoped dependencies, so the stream
+    # owns its session and closes it when done.
+    db = AsyncSessionLocal()
+    try:
+        turn = await _prepare_turn(db, payload.user_id, payload.conversation_id, payload.message, analysis)
+        # Release the connection before streaming (nothing is staged yet)
+        await db.commit()
+
+        # Crisis override short-circuits before any provider stream is opened
+        if turn.crisis:
+            reply_text = _crisis_reply(turn.profile)
+            async with unit_of_work(db):
+                await _stage_turn(db, turn, reply_text, _crisis_annotations())
+            user_cache.put(turn.user)
+            await db.close()
+            return _sse_response(_single_event_stream(_chat_out(turn, reply_text)))
+    except BaseException:
+        await db.rollback()
+        await db.close()
+        raise
+
+    return _sse_response(_stream_turn(db, turn))
+
+
 @router.post("/voice", response_model=ChatOut)
 async def chat_voice(
     user_id: str = Form(...),
     file: UploadFile = File(...),
     conversation_id: int | None = Form(None),
     stt_engine: str = Form("whisper"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     conversation_id = _normalize_conversation_id(conversation_id)
 
-    user = ensure_user(db, user_id)
-    conv = start_or_get_conversation(db, user, conversation_id)
-
-    last_delta = human_delta(user.last_seen)
-
     raw = await file.read()
     try:
-        wav_bytes = convert_to_wav_bytes(raw, file.content_type or "audio/wav")
+        # Decoded once (ffmpeg, off the loop); STT and prosody share this buffer
+        samples = await anyio.to_thread.run_sync(decode_audio, raw, file.content_type or "audio/wav")
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Audio decode error: {e}")
 
-    stt = transcribe_bytes(wav_bytes, engine=stt_engine)
+    try:
+        stt, prosody = await run_voice_analysis(samples, engine=stt_engine)
+    except VoicePoolSaturated:
+        raise HTTPException(
+            status_code=503,
+            detail="Voice processing is busy, please try again shortly.",
+            headers={"Retry-After": "5"},
+        )
+    except VoicePoolUnavailable:
+        raise HTTPException(
+            status_code=503,
+            detail="Voice processing is restarting, please try again shortly.",
+            headers={"Retry-After": "5"},
+        )
+
     text = (stt.get("text") or "").strip()
     if not text:
         raise HTTPException(status_code=422, detail=f"Could not transcribe audio: {stt}")
 
-    prosody = prosody_features(wav_bytes)
     analysis = analyze_text(text)
     analysis["prosody"] = prosody
 
-    append_message(db, conv, role="user", content=text, annotations=analysis)
-
-    learned = extract_memories_from_text(text)
-    if learned:
-        save_kv_memories(db, user, learned)
-        update_user_profile_from_memories(db, user, learned)
-
-    profile = recall_profile(user)
-
-    # ✅ Phase 5: Safety override (voice too)
-    if _is_crisis_like(text):
-        reply_text = _crisis_reply(profile)
-
-        append_message(
-            db,
-            conv,
-            role="assistant",
-            content=reply_text,
-            annotations={"provider": "safety", "reason": "crisis_like"},
-        )
+    return await _chat_turn(db, user_id, conversation_id, text, analysis)
 
-        user.last_seen = datetime.now(timezone.utc)
-        db.commit()
 
-        return ChatOut(
-            conversation_id=conv.id,
-            reply=reply_text,
-            last_seen_delta_human=last_delta,
-            annotations=analysis,
-        )
+_voice_ws_sessions = 0
 
-    history = last_n_messages(db, conv, n=12)
-    history_text = _history_to_text(history)
+# Sample rates Vosk models are used with; anything else is a client bug
+_VOICE_WS_SAMPLE_RATES = range(8000, 48001)
 
-    prompt = f"Conversation so far:\n{history_text}\n\nUser: {text}"
 
-    # Trend reflection throttle
-    trend = None
-    if getattr(conv, "meta", None) is None or not isinstance(conv.meta, dict):
-        conv.meta = {}
+async def _receive_start(ws: WebSocket) -> tuple[str, int | None, int] | None:
+    """
+    (user_id, conversation_id, sample_rate) from the opening frame, or None
+    after rejecting it with an error frame and close code 1008.
+    """
+    msg = await ws.receive()
+    if msg["type"] == "websocket.disconnect":
+        return None
 
-    turn = int(conv.meta.get("turn_count", 0)) + 1
-    conv.meta["turn_count"] = turn
+    try:
+        start = json.loads(msg.get("text") or "")
+        if not isinstance(start, dict) or start.get("type") != "start":
+            raise ValueError
+        user_id = str(start.get("user_id") or "").strip()
+        if not user_id:
+            raise ValueError
+        sample_rate = int(start.get("sample_rate") or SAMPLE_RATE)
+        if sample_rate not in _VOICE_WS_SAMPLE_RATES:
+            raise ValueError
+        conversation_id = start.get("conversation_id")
+        conversation_id = _normalize_conversation_id(int(conversation_id) if conversation_id else None)
+    except (TypeError, ValueError):
+        await ws.send_json({
+            "type": "error",
+            "detail": "First message must be JSON {type: start, user_id, sample_rate?: 8000-48000}.",
+        })
+        await ws.close(code=1008)
+        return None
 
-    last_trend_turn = conv.meta.get("last_trend_turn")
-    allow_trend = (last_trend_turn is None) or ((turn - int(last_trend_turn)) >= 4)
+    return user_id, conversation_id, sample_rate
 
-    if allow_trend:
-        trend = sentiment_trend_summary(db, user, lookback_user_msgs=18, min_msgs=6)
-        if trend:
-            conv.meta["last_trend_turn"] = turn
-
-    db.commit()
-
-    reply_text = await generate_reply(
-        prompt=prompt,
-        profile=profile,
-        sentiment_label=analysis.get("sentiment", "neutral"),
-        last_seen=user.last_seen,
-        trend_summary=trend,
-        followup_question=None,
-    )
 
-    append_message(
-        db,
-        conv,
-        role="assistant",
-        content=reply_text,
-        annotations={"provider": "llm", "sentiment_seen": analysis.get("sentiment")},
-    )
+@router.websocket("/voice/stream")
+async def chat_voice_stream(ws: WebSocket, db: AsyncSession = Depends(get_async_db)):
+    """
+    Live voice input with incremental recognition (Vosk).
+
+    Client -> server:
+      {"type": "start", "user_id": "...", "conversation_id": 12, "sample_rate": 16000}
+      binary frames of 16-bit little-endian mono PCM while the user speaks
+      {"type": "end"} to force the end of an utterance (optional; silence is
+      also detected by the recognizer, and an utterance is cut at
+      VOICE_WS_MAX_UTTERANCE_SEC), {"type": "stop"} to close
+
+    Server -> client:
+      {"type": "ready"}, {"type": "partial", "text"}, {"type": "final", "text"},
+      {"type": "reply", ...ChatOut}, {"type": "error", "detail"}
+
+    Each utterance counts against the chat rate limit; a limited one gets an
+    error frame with retry_after and no reply, as does one whose reply
+    fails; the session stays open for the next utterance. A bad start frame
+    is answered with an error frame and close code 1008.
+    """
+    global _voice_ws_sessions
+    await ws.accept()
 
-    user.last_seen = datetime.now(timezone.utc)
-    db.commit()
+    if _voice_ws_sessions >= settings.voice_ws_max_sessions:
+        await ws.send_json({"type": "error", "detail": "Voice streaming is busy, please try again shortly."})
+        await ws.close(code=1013)
+        return
 
-    return ChatOut(
-        conversation_id=conv.id,
-        reply=reply_text,
-        last_seen_delta_human=last_delta,
-        annotations=analysis,
-    )
+    _voice_ws_sessions += 1
+    try:
+        start = await _receive_start(ws)
+        if start is None:
+            return
+        user_id, conversation_id, sample_rate = start
+
+        try:
+            # May load the Vosk model on first use
+            rec = await anyio.to_thread.run_sync(
+                StreamingRecognizer, sample_rate, settings.voice_ws_max_utterance_sec
+            )
+        except Exception as e:
+            await ws.send_json({"type": "error", "detail": f"Recognizer unavailable: {e}"})
+            await ws.close(code=1011)
+            return
+
+        await ws.send_json({"type": "ready"})
+
+        last_partial = ""
+        while True:
+            msg = await ws.receive()
+            if msg["type"] == "websocket.disconnect":
+                return
+
+            if msg.get("bytes"):
+                ended, text = await anyio.to_thread.run_sync(rec.accept, msg["bytes"])
+                if not ended:
+                    if text and text != last_partial:
+                        last_partial = text
+                        await ws.send_json({"type": "partial", "text": text})
+                    continue
+            elif msg.get("text"):
+                try:
+                    control = json.loads(msg["text"]).get("type")
+                except (ValueError, AttributeError):
+                    continue
+                if control == "stop":
+                    break
+                if control != "end":
+                    continue
+                text = await anyio.to_thread.run_sync(rec.finish)
+            else:
+                continue
+
+            # Utterance ended
+            last_partial = ""
+            samples = rec.take_samples()
+            if not text:
+                continue
+
+            await ws.send_json({"type": "final", "text": text})
+
+            # Same buckets as the HTTP rate-limit middleware in app.main
+            allowed, retry_after = await ws.app.state.rate_limiter.hit(
+                ws.client.host if ws.client else "unknown",
+                user_id if settings.rate_limit_key == "user" else None,
+            )
+            if not allowed:
+                await ws.send_json({
+                    "type": "error",
+                    "detail": "Too many requests, please slow down.",
+                    "retry_after": max(1, math.ceil(retry_after)),
+                })
+                continue
+
+            try:
+                prosody = await anyio.to_thread.run_sync(prosody_features, samples, rec.sample_rate)
+                analysis = analyze_text(text)
+                analysis["prosody"] = prosody
+                out = await _chat_turn(db, user_id, conversation_id, text, analysis)
+            except Exception:
+                # Provider or DB failure: report it and keep the session for
+                # the next utterance (the turn's writes were rolled back)
+                log.warning("voice stream turn failed", exc_info=True)
+                await db.rollback()
+                await ws.send_json({"type": "error", "detail": "Couldn't reply to that, please try again."})
+                continue
+
+            conversation_id = out.conversation_id
+            await ws.send_json({"type": "reply", **out.model_dump(mode="json")})
+
+        await ws.close()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        _voice_ws_sessions -= 1
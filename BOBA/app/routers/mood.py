@@ -1,19 +1,32 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.orm import Session
-from sqlalchemy import func, cast, Text
+from sqlalchemy import func
 from typing import List
+from datetime import datetime, timezone
+import codecs
+
+import anyio
+
 from ..db import get_db
-from ..models import Mood, User
-from ..schemas import MoodLogIn, MoodOut
-from ..services.memory import ensure_user
+from ..models import Mood, MoodDaily, User
+from ..schemas import MoodLogIn, MoodOut, CohortIn
+from ..services.memory import ensure_user, get_user_pk
+from ..services.mood_rollup import add_to_mood_daily
+from ..services.moods import VALID_MOODS, IMPORT_FORMATS, import_moods
+from ..services.analytics import load_sentiment_series, mood_analytics, window_start
+from ..services.cohort import (
+    cohort_rows_all,
+    cohort_rows_for_users,
+    cohort_summary,
+)
+from ..settings import settings
 
 router = APIRouter(prefix="/mood", tags=["mood"])
 
-VALID_MOODS = {"happy", "sad", "anxious", "stressed", "tired", "neutral", "angry"}
-
 @router.post("/log", response_model=MoodOut)
 def log_mood(payload: MoodLogIn, db: Session = Depends(get_db)):
     user = ensure_user(db, payload.user_id)
+    user_pk, user_id = user.id, user.user_id
 
     mood_clean = payload.mood.lower().strip()
 
@@ -24,19 +37,25 @@ def log_mood(payload: MoodLogIn, db: Session = Depends(get_db)):
             detail=f"Invalid mood '{payload.mood}'. Valid options: {list(VALID_MOODS)}"
         )
 
+    # Set the day here (UTC) rather than via the server default, so the Mood
+    # row and its rollup bucket always agree
+    day = datetime.now(timezone.utc).date()
+
     row = Mood(
-        user_id_fk=user.id,
+        user_id_fk=user_pk,
         mood=mood_clean,
         note=payload.note or None,
         sentiment_score=payload.sentiment_score,
+        day=day,
     )
     db.add(row)
+    add_to_mood_daily(db, [(user_pk, day, mood_clean, payload.sentiment_score)])
     db.commit()
     db.refresh(row)
 
     return MoodOut(
         id=row.id,
-        user_id=user.user_id,
+        user_id=user_id,
         mood=row.mood,
         note=row.note,
         sentiment_score=row.sentiment_score,
@@ -51,13 +70,13 @@ def recent_moods(
     limit: int = Query(14, ge=1, le=90),
     db: Session = Depends(get_db),
 ):
-    user = db.query(User).filter(User.user_id == user_id).first()
-    if not user:
+    user_pk = get_user_pk(db, user_id)
+    if user_pk is None:
         raise HTTPException(status_code=404, detail="User not found")
 
     rows = (
         db.query(Mood)
-        .filter(Mood.user_id_fk == user.id)
+        .filter(Mood.user_id_fk == user_pk)
         .order_by(Mood.created_at.desc())
         .limit(limit)
         .all()
@@ -66,7 +85,7 @@ def recent_moods(
     return [
         MoodOut(
             id=r.id,
-            user_id=user.user_id,
+            user_id=user_id,
             mood=r.mood,
             note=r.note,
             sentiment_score=r.sentiment_score,
@@ -83,33 +102,152 @@ def mood_summary(
     days: int = Query(30, ge=1, le=365),
     db: Session = Depends(get_db),
 ):
-    user = db.query(User).filter(User.user_id == user_id).first()
-    if not user:
+    user_pk = get_user_pk(db, user_id)
+    if user_pk is None:
         raise HTTPException(status_code=404, detail="User not found")
 
-    # last N days
+    # Last N calendar days (UTC), today included; reads the daily rollup so
+    # the cost follows the number of days, not the number of moods logged
+    since = window_start(datetime.now(timezone.utc).date(), days)
     rows = (
-        db.query(Mood.mood, func.count(Mood.id))
-        .filter(Mood.user_id_fk == user.id)
-        .filter(Mood.created_at >= func.now() - cast(f"{days} days", Text))
-        .group_by(Mood.mood)
+        db.query(
+            MoodDaily.mood,
+            func.sum(MoodDaily.count),
+            func.sum(MoodDaily.sum_sentiment),
+            func.sum(MoodDaily.sentiment_count),
+        )
+        .filter(MoodDaily.user_id_fk == user_pk)
+        .filter(MoodDaily.day >= since)
+        .group_by(MoodDaily.mood)
         .all()
     )
 
-    total = sum(count for _, count in rows) or 1
+    total = sum(count for _, count, _, _ in rows) or 1
 
     dist = [
         {
             "mood": mood,
             "count": int(count),
-            "pct": round(100.0 * count / total, 2)
+            "pct": round(100.0 * count / total, 2),
+            "avg_sentiment": round(sum_sentiment / scored, 4) if scored else None,
         }
-        for mood, count in rows
+        for mood, count, sum_sentiment, scored in rows
     ]
 
     return {
-        "user_id": user.user_id,
+        "user_id": user_id,
         "days": days,
+        "since": since.isoformat(),
         "total": total if total != 1 else 0,
         "distribution": dist,
     }
+
+
+@router.get("/analytics")
+def mood_analytics_view(
+    user_id: str = Query(...),
+    days: int = Query(90, ge=7, le=365),
+    db: Session = Depends(get_db),
+):
+    """
+    Rolling means, streaks, volatility and weekday profile over the last
+    `days` calendar days (UTC), from mood logs and message sentiment.
+    """
+    user_pk = get_user_pk(db, user_id)
+    if user_pk is None:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    since = window_start(datetime.now(timezone.utc).date(), days)
+    obs_days, values, sources = load_sentiment_series(db, user_pk, since)
+
+    return {"user_id": user_id, **mood_analytics(since, days, obs_days, values, sources)}
+
+
+@router.get("/cohort")
+def cohort_all(
+    days: int = Query(30, ge=1, le=365),
+    db: Session = Depends(get_db),
+):
+    """
+    Mood distribution and average sentiment per day across all users,
+    served from the cohort cube as of its last background refresh.
+    """
+    since = window_start(datetime.now(timezone.utc).date(), days)
+    return {"cohort": "all", **cohort_summary(cohort_rows_all(db, since), since, days)}
+
+
+@router.post("/cohort")
+def cohort_users(payload: CohortIn, db: Session = Depends(get_db)):
+    """
+    Same as GET /mood/cohort for an explicit list of user ids, in one grouped
+    pass over those users' daily rollups.
+    """
+    user_ids = list(dict.fromkeys(payload.user_ids))
+    if len(user_ids) > settings.cohort_max_users:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Too many user ids ({len(user_ids)}); max {settings.cohort_max_users} per request",
+        )
+
+    found = {}
+    # Chunked so the IN list stays under SQLite's bound-parameter limit
+    for i in range(0, len(user_ids), 5000):
+        chunk = user_ids[i:i + 5000]
+        found.update(db.query(User.user_id, User.id).filter(User.user_id.in_(chunk)).all())
+
+    since = window_start(datetime.now(timezone.utc).date(), payload.days)
+    user_pks = list(found.values())
+    rows = []
+    for i in range(0, len(user_pks), 5000):
+        rows.extend(cohort_rows_for_users(db, user_pks[i:i + 5000], since))
+
+    return {
+        "cohort": "users",
+        "users": len(found),
+        "unknown_user_ids": [u for u in user_ids if u not in found],
+        **cohort_summary(rows, since, payload.days),
+    }
+
+
+@router.post("/import")
+async def import_moods_view(
+    request: Request,
+    format: str | None = Query(None, description="ndjson | csv (default: from Content-Type)"),
+    chunk_size: int = Query(1000, ge=1, le=10000),
+):
+    """
+    Bulk import historical moods from an NDJSON or CSV (with header) body:
+    user_id, mood, created_at and/or day, optional sentiment_score and note.
+    The body is streamed, never held in memory as a whole. Users must exist.
+    Invalid lines are reported per line and skipped.
+    """
+    fmt = format or ("csv" if "csv" in request.headers.get("content-type", "") else "ndjson")
+    if fmt not in IMPORT_FORMATS:
+        raise HTTPException(status_code=422, detail=f"Unknown format '{fmt}'. Valid options: {list(IMPORT_FORMATS)}")
+
+    body = request.stream()
+
+    async def next_chunk() -> bytes | None:
+        try:
+            return await body.__anext__()
+        except StopAsyncIteration:
+            return None
+
+    def lines():
+        # Runs in the import thread; pulls body chunks from the event loop
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        pending = ""
+        while True:
+            chunk = anyio.from_thread.run(next_chunk)
+            if chunk is None:
+                break
+            pending += decoder.decode(chunk)
+            *complete, pending = pending.split("\n")
+            for line in complete:
+                yield line + "\n"
+        pending += decoder.decode(b"", final=True)
+        if pending:
+            yield pending
+
+    report = await anyio.to_thread.run_sync(import_moods, lines(), fmt, chunk_size)
+    return report.as_dict()
@@ -0,0 +1,21 @@
+from fastapi import APIRouter, HTTPException
+
+from ..schemas import SentimentBatchIn, SentimentBatchOut
+from ..services.empathy import analyze_texts
+
+router = APIRouter(prefix="/sentiment", tags=["sentiment"])
+
+MAX_BATCH_TEXTS = 10000
+
+
+# Plain `def`: VADER is CPU-bound, so FastAPI runs this in its threadpool
+@router.post("/batch", response_model=SentimentBatchOut)
+def sentiment_batch(payload: SentimentBatchIn):
+    if len(payload.texts) > MAX_BATCH_TEXTS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Too many texts ({len(payload.texts)}); max {MAX_BATCH_TEXTS} per request",
+        )
+
+    results = analyze_texts(payload.texts)
+    return SentimentBatchOut(count=len(results), results=results)
@@ -1,10 +1,19 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select, and_, or_
 from sqlalchemy.orm import Session
-from ..db import get_db, Base, engine
-from ..models import User
-from ..schemas import UserCreate, UserOut
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..db import get_db, get_async_db, Base, engine
+from ..models import User, Conversation, Message
+from ..schemas import UserCreate, UserOut, ConversationSummary, ConversationPage, MessageOut, MessagePage
 from ..services.memory import save_kv_memories
+from ..services.user_cache import user_cache
+from ..services.export import EXPORT_FORMATS, export_records, ndjson_stream, gzip_json_stream
 from datetime import datetime, timezone
+from urllib.parse import quote
+import base64
+import json
+import re
 
 router = APIRouter(prefix="/users", tags=["users"])
 
@@ -24,6 +33,7 @@ def register_user(payload: UserCreate, db: Session = Depends(get_db)):
         user.last_seen = datetime.now(timezone.utc)
         db.commit()
         db.refresh(user)
+        user_cache.put(user)
 
         # ✅ Auto-save/refresh memories on update
         save_kv_memories(db, user, {
@@ -48,6 +58,7 @@ def register_user(payload: UserCreate, db: Session = Depends(get_db)):
     db.add(user)
     db.commit()
     db.refresh(user)
+    user_cache.put(user)
 
     # ✅ Auto-save memories on create
     save_kv_memories(db, user, {
@@ -61,11 +72,176 @@ def register_user(payload: UserCreate, db: Session = Depends(get_db)):
 
 @router.get("/{user_id}", response_model=UserOut)
 def get_user(user_id: str, db: Session = Depends(get_db)):
+    cached = user_cache.get(user_id)
+    if cached:
+        return cached.as_user_out()
     user = db.query(User).filter(User.user_id == user_id).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
+    user_cache.put(user)
     return user
 
+_UNSAFE_FILENAME_CHARS = re.compile(r"[^A-Za-z0-9._-]")
+
+
+def _attachment(filename: str) -> dict:
+    """
+    Content-Disposition for a download named after user input: an ASCII
+    `filename` fallback (headers are latin-1, quotes would end the value)
+    plus the exact name as RFC 6266 `filename*`.
+    """
+    fallback = _UNSAFE_FILENAME_CHARS.sub("_", filename)
+    return {
+        "Content-Disposition": f"attachment; filename=\"{fallback}\"; filename*=UTF-8''{quote(filename, safe='')}"
+    }
+
+
+@router.get("/{user_id}/export")
+async def export_user_history(
+    user_id: str,
+    format: str = Query("ndjson", description="ndjson | json.gz"),
+    since: datetime | None = Query(None, description="only messages created at or after this time (naive = UTC)"),
+    until: datetime | None = Query(None, description="only messages created before this time (naive = UTC)"),
+    include_annotations: bool = Query(True),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Stream a user's conversations and messages, oldest first.
+    ndjson: one record per line (user, then each conversation followed by its
+    messages). json.gz: the same as a single gzip-compressed JSON document.
+    """
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=422, detail=f"Unknown format '{format}'. Valid options: {list(EXPORT_FORMATS)}")
+
+    cached = user_cache.get(user_id)
+    user_pk = cached.pk if cached else (
+        await db.execute(select(User.id).where(User.user_id == user_id))
+    ).scalar_one_or_none()
+    if user_pk is None:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    records = export_records(user_pk, user_id, since, until, include_annotations)
+    if format == "json.gz":
+        return StreamingResponse(
+            gzip_json_stream(records),
+            media_type="application/gzip",
+            headers=_attachment(f"{user_id}-export.json.gz"),
+        )
+    return StreamingResponse(
+        ndjson_stream(records),
+        media_type="application/x-ndjson",
+        headers=_attachment(f"{user_id}-export.ndjson"),
+    )
+
+def _encode_cursor(*values) -> str:
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> list:
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except ValueError:
+        raise HTTPException(status_code=422, detail="Invalid cursor")
+
+
+def _user_pk_or_404(db: Session, user_id: str) -> int:
+    cached = user_cache.get(user_id)
+    if cached:
+        return cached.pk
+    user_pk = db.query(User.id).filter(User.user_id == user_id).scalar()
+    if user_pk is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return user_pk
+
+
+@router.get("/{user_id}/conversations", response_model=ConversationPage)
+def list_conversations(
+    user_id: str,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: str | None = Query(None),
+    db: Session = Depends(get_db),
+):
+    """
+    Conversations with at least one message, most recent activity first.
+    Keyset pagination on (last_message_at, id): every page is one index range
+    scan, however deep.
+    """
+    user_pk = _user_pk_or_404(db, user_id)
+
+    q = db.query(Conversation).filter(
+        Conversation.user_id_fk == user_pk,
+        Conversation.last_message_at.is_not(None),
+    )
+    if cursor:
+        try:
+            last_at, last_id = _decode_cursor(cursor)
+            last_at = datetime.fromisoformat(last_at)
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=422, detail="Invalid cursor")
+        q = q.filter(
+            or_(
+                Conversation.last_message_at < last_at,
+                and_(Conversation.last_message_at == last_at, Conversation.id < last_id),
+            )
+        )
+
+    rows = q.order_by(Conversation.last_message_at.desc(), Conversation.id.desc()).limit(limit + 1).all()
+    items, more = rows[:limit], len(rows) > limit
+    return ConversationPage(
+        items=[ConversationSummary.model_validate(c) for c in items],
+        next_cursor=_encode_cursor(items[-1].last_message_at.isoformat(), items[-1].id) if more else None,
+    )
+
+
+@router.get("/{user_id}/conversations/{conversation_id}/messages", response_model=MessagePage)
+def list_messages(
+    user_id: str,
+    conversation_id: int,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: str | None = Query(None),
+    order: str = Query("desc", pattern="^(asc|desc)$"),
+    include_annotations: bool = Query(False),
+    db: Session = Depends(get_db),
+):
+    """
+    Messages of one conversation, newest first by default (order=asc for
+    oldest first). Keyset pagination on message id.
+    """
+    user_pk = _user_pk_or_404(db, user_id)
+    owned = db.query(Conversation.id).filter(
+        Conversation.id == conversation_id,
+        Conversation.user_id_fk == user_pk,
+    ).scalar()
+    if owned is None:
+        raise HTTPException(status_code=404, detail="Conversation not found")
+
+    q = db.query(Message).filter(Message.conversation_id == conversation_id)
+    if cursor:
+        try:
+            (last_id,) = _decode_cursor(cursor)
+            last_id = int(last_id)
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=422, detail="Invalid cursor")
+        q = q.filter(Message.id < last_id if order == "desc" else Message.id > last_id)
+
+    q = q.order_by(Message.id.desc() if order == "desc" else Message.id.asc())
+    rows = q.limit(limit + 1).all()
+    items, more = rows[:limit], len(rows) > limit
+    return MessagePage(
+        items=[
+            MessageOut(
+                id=m.id,
+                role=m.role,
+                content=m.content,
+                created_at=m.created_at,
+                annotations=m.annotations if include_annotations else None,
+            )
+            for m in items
+        ],
+        next_cursor=_encode_cursor(items[-1].id) if more else None,
+    )
+
+
 # (Optional) Quick endpoint to view memories for a user
 @router.get("/{user_id}/memories")
 def get_user_memories(user_id: str, db: Session = Depends(get_db)):
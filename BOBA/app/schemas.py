@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional, Any
 from datetime import datetime
 
@@ -59,6 +59,14 @@ class ConversationSummary(BaseModel):
     class Config:
         from_attributes = True
 
+class ConversationPage(BaseModel):
+    items: List[ConversationSummary]
+    next_cursor: Optional[str] = None   # pass back as ?cursor= for the next page
+
+class MessagePage(BaseModel):
+    items: List[MessageOut]
+    next_cursor: Optional[str] = None
+
 from typing import List
 from datetime import date
 
@@ -79,3 +87,18 @@ class MoodOut(BaseModel):
 
     class Config:
         from_attributes = True
+
+class SentimentBatchIn(BaseModel):
+    texts: List[str]
+
+class SentimentResult(BaseModel):
+    sentiment: str               # "positive" | "neutral" | "negative"
+    scores: dict[str, float]     # VADER neg/neu/pos/compound
+
+class SentimentBatchOut(BaseModel):
+    count: int
+    results: List[SentimentResult]
+
+class CohortIn(BaseModel):
+    user_ids: List[str]
+    days: int = Field(30, ge=1, le=365)
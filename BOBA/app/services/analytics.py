@@ -0,0 +1,168 @@
+# Per-user mood analytics over a dense daily axis, computed with NumPy.
+#
+# Observations are mood logs (with or without a sentiment_score) and user
+# message sentiment compounds. They are binned per day with bincount, and
+# every metric below is derived from those per-day sums/counts, so the cost
+# is a few passes over arrays of length `days` regardless of history size.
+from datetime import date, timedelta
+
+import numpy as np
+from sqlalchemy import Date, Float, Integer, cast, func, literal, select, union_all
+from sqlalchemy.orm import Session
+
+from ..models import Conversation, Message, Mood
+from .empathy import NEGATIVE_THRESHOLD, POSITIVE_THRESHOLD
+
+SOURCE_MOOD = 0
+SOURCE_MESSAGE = 1
+
+# A streak day is one whose mean would get that label in services/empathy.py
+POSITIVE = POSITIVE_THRESHOLD
+NEGATIVE = NEGATIVE_THRESHOLD
+
+WEEKDAYS = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+ROLLING_WINDOWS = (7, 30)
+
+
+def window_start(today: date, days: int) -> date:
+    """First day of the `days`-day window ending today (inclusive)."""
+    return today - timedelta(days=days - 1)
+
+
+def _day_of(column, dialect: str):
+    # CAST(.. AS DATE) on SQLite yields the year only (numeric affinity)
+    return func.date(column) if dialect == "sqlite" else cast(column, Date)
+
+
+def load_sentiment_series(db: Session, user_pk: int, since: date) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    (days datetime64[D], values float64 with NaN for unscored moods,
+    sources int8) for a user since `since`, in one UNION ALL query.
+    """
+    dialect = db.get_bind().dialect.name
+    moods = select(
+        Mood.day.label("day"),
+        cast(Mood.sentiment_score, Float).label("value"),
+        literal(SOURCE_MOOD, Integer).label("source"),
+    ).where(Mood.user_id_fk == user_pk, Mood.day >= since)
+    messages = (
+        select(
+            _day_of(Message.created_at, dialect).label("day"),
+            Message.sentiment_compound,
+            literal(SOURCE_MESSAGE, Integer),
+        )
+        .join(Conversation, Conversation.id == Message.conversation_id)
+        .where(
+            Conversation.user_id_fk == user_pk,
+            Message.role == "user",
+            Message.sentiment_compound.is_not(None),
+            Message.created_at >= since,
+        )
+    )
+
+    rows = db.execute(union_all(moods, messages)).all()
+    if not rows:
+        return np.empty(0, "datetime64[D]"), np.empty(0, np.float64), np.empty(0, np.int8)
+
+    days, values, sources = zip(*rows)
+    return (
+        np.array([str(d) for d in days], dtype="datetime64[D]"),
+        np.array([np.nan if v is None else v for v in values], dtype=np.float64),
+        np.array(sources, dtype=np.int8),
+    )
+
+
+def _nan_list(a: np.ndarray, ndigits: int = 4) -> list:
+    return [None if np.isnan(x) else round(float(x), ndigits) for x in a]
+
+
+def _rolling_mean(sums: np.ndarray, counts: np.ndarray, window: int) -> np.ndarray:
+    """Observation-weighted trailing mean per day; NaN where the window is empty."""
+    cs = np.concatenate(([0.0], np.cumsum(sums)))
+    cc = np.concatenate(([0.0], np.cumsum(counts)))
+    lo = np.maximum(np.arange(1, len(sums) + 1) - window, 0)
+    s = cs[1:] - cs[lo]
+    c = cc[1:] - cc[lo]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(c > 0, s / c, np.nan)
+
+
+def _runs(mask: np.ndarray, grace: int = 0) -> dict:
+    """
+    Longest run of True days, and the run still going at the end of the
+    axis (allowing `grace` trailing days that haven't happened yet, e.g.
+    nothing logged today so far).
+    """
+    if not mask.any():
+        return {"current": 0, "longest": 0}
+    edges = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    lengths = ends - starts
+    current = int(lengths[-1]) if len(mask) - ends[-1] <= grace else 0
+    return {"current": current, "longest": int(lengths.max())}
+
+
+def mood_analytics(since: date, days: int, obs_days: np.ndarray, values: np.ndarray, sources: np.ndarray) -> dict:
+    n = days
+    start = np.datetime64(since, "D")
+    idx = (obs_days - start).astype(np.int64)
+    keep = (idx >= 0) & (idx < n)
+    idx, values, sources = idx[keep], values[keep], sources[keep]
+
+    scored = ~np.isnan(values)
+    s_idx, s_val = idx[scored], values[scored]
+
+    sums = np.bincount(s_idx, weights=s_val, minlength=n)
+    counts = np.bincount(s_idx, minlength=n).astype(np.float64)
+    mood_counts = np.bincount(idx[sources == SOURCE_MOOD], minlength=n)
+    message_counts = np.bincount(idx[sources == SOURCE_MESSAGE], minlength=n)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        daily = np.where(counts > 0, sums / counts, np.nan)
+
+    has_daily = ~np.isnan(daily)
+    daily_values = daily[has_daily]
+    changes = np.diff(daily_values)
+
+    # Weekday of each observation (1970-01-01 was a Thursday)
+    weekday = ((obs_days[keep][scored] - np.datetime64("1970-01-01", "D")).astype(np.int64) + 3) % 7
+    wd_sum = np.bincount(weekday, weights=s_val, minlength=7)
+    wd_n = np.bincount(weekday, minlength=7)
+
+    dates = np.arange(start, start + n, dtype="datetime64[D]")
+
+    return {
+        "since": since.isoformat(),
+        "days": n,
+        "totals": {
+            "moods": int(mood_counts.sum()),
+            "messages": int(message_counts.sum()),
+            "scored": int(scored.sum()),
+            "mean": round(float(s_val.mean()), 4) if len(s_val) else None,
+        },
+        "series": {
+            "dates": [str(d) for d in dates],
+            "daily_mean": _nan_list(daily),
+            **{f"rolling_{w}": _nan_list(_rolling_mean(sums, counts, w)) for w in ROLLING_WINDOWS},
+            "mood_count": mood_counts.tolist(),
+            "message_count": message_counts.tolist(),
+        },
+        "volatility": {
+            "daily_std": round(float(daily_values.std()), 4) if len(daily_values) > 1 else None,
+            "mean_abs_change": round(float(np.abs(changes).mean()), 4) if len(changes) else None,
+        },
+        "streaks": {
+            "logging": _runs(mood_counts > 0, grace=1),
+            "positive": _runs(has_daily & (daily >= POSITIVE)),
+            "negative": _runs(has_daily & (daily <= NEGATIVE)),
+        },
+        "weekday": [
+            {
+                "weekday": WEEKDAYS[i],
+                "mean": round(float(wd_sum[i] / wd_n[i]), 4) if wd_n[i] else None,
+                "n": int(wd_n[i]),
+            }
+            for i in range(7)
+        ],
+    }
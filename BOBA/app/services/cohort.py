@@ -0,0 +1,213 @@
+# Cohort (multi-user) mood aggregates per day.
+#
+# All users: served from the mood_cohort_daily cube, which is mood_daily
+# summed over users per (day, mood). Writers only mark the days they touched
+# in mood_cohort_dirty (insert-or-ignore, no shared counters to contend on);
+# refresh_cohort_cube() re-aggregates just those days, from a lifespan
+# background task (COHORT_REFRESH_INTERVAL_SEC) or scripts/refresh_cohort_cube.py,
+# never on the read path: on Postgres a refresh blocks mood writers.
+# An explicit user list: one grouped pass over those users' mood_daily rows.
+import asyncio
+import logging
+from datetime import date
+
+import anyio
+from sqlalchemy import delete, func, insert, select, text
+from sqlalchemy.dialects import postgresql, sqlite
+
+from ..db import engine
+from ..models import MoodCohortDaily, MoodCohortDirty, MoodDaily
+from ..settings import settings
+
+_INSERT_IGNORE = {
+    "sqlite": sqlite.insert,
+    "postgresql": postgresql.insert,
+}
+
+# Days per IN (...) batch when refreshing
+_DAY_CHUNK = 500
+
+log = logging.getLogger(__name__)
+
+_refresher: asyncio.Task | None = None
+
+
+def mark_cohort_dirty(db, days) -> None:
+    """Stage dirty markers for `days`; commit with the mood writes."""
+    days = sorted(set(days))
+    if not days:
+        return
+    insert_ = _INSERT_IGNORE.get(db.get_bind().dialect.name)
+    if insert_ is None:
+        known = set(db.execute(select(MoodCohortDirty.day).where(MoodCohortDirty.day.in_(days))).scalars())
+        db.add_all(MoodCohortDirty(day=d) for d in days if d not in known)
+        return
+    db.execute(insert_(MoodCohortDirty.__table__).on_conflict_do_nothing(), [{"day": d} for d in days])
+
+
+def _aggregate_days():
+    return select(
+        MoodDaily.day,
+        MoodDaily.mood,
+        func.count(),
+        func.sum(MoodDaily.count),
+        func.sum(MoodDaily.sum_sentiment),
+        func.sum(MoodDaily.sentiment_count),
+    ).group_by(MoodDaily.day, MoodDaily.mood)
+
+
+def _cube_insert(query):
+    return insert(MoodCohortDaily).from_select(
+        ["day", "mood", "users", "count", "sum_sentiment", "sentiment_count"],
+        query,
+    )
+
+
+def _dialect(conn):
+    # Connection has .dialect; a Session goes through its bind
+    return getattr(conn, "dialect", None) or conn.get_bind().dialect
+
+
+def _lock_markers(conn, dialect) -> None:
+    # A mood write that hits an existing marker (ON CONFLICT DO NOTHING)
+    # takes no row lock, so on Postgres a refresh could clear that marker
+    # and aggregate before the write commits, losing it. Its INSERT does
+    # hold ROW EXCLUSIVE on the table until commit: SHARE ROW EXCLUSIVE
+    # waits for those writes to finish and holds off new ones until this
+    # refresh commits. SQLite already serializes writers.
+    if dialect.name == "postgresql":
+        conn.execute(text(f"LOCK TABLE {MoodCohortDirty.__tablename__} IN SHARE ROW EXCLUSIVE MODE"))
+
+
+def _claim_dirty_days(conn, dialect) -> list[date]:
+    if dialect.delete_returning:
+        return list(conn.execute(delete(MoodCohortDirty).returning(MoodCohortDirty.day)).scalars())
+    days = list(conn.execute(select(MoodCohortDirty.day)).scalars())
+    conn.execute(delete(MoodCohortDirty).where(MoodCohortDirty.day.in_(days)))
+    return days
+
+
+def refresh_cohort_cube(conn, full: bool = False) -> int:
+    """
+    Re-aggregate dirty days (or everything with full=True) into the cube.
+    `conn` is a Connection or Session; the caller commits. Returns days done.
+    Markers are claimed in the same transaction as the aggregate, so a
+    mood write is either in it or re-marks its day for the next refresh.
+    """
+    dialect = _dialect(conn)
+    _lock_markers(conn, dialect)
+
+    if full:
+        conn.execute(delete(MoodCohortDirty))
+        conn.execute(delete(MoodCohortDaily))
+        conn.execute(_cube_insert(_aggregate_days()))
+        return conn.execute(select(func.count(func.distinct(MoodCohortDaily.day)))).scalar_one()
+
+    days = sorted(_claim_dirty_days(conn, dialect))
+    for i in range(0, len(days), _DAY_CHUNK):
+        chunk = days[i:i + _DAY_CHUNK]
+        conn.execute(delete(MoodCohortDaily).where(MoodCohortDaily.day.in_(chunk)))
+        conn.execute(_cube_insert(_aggregate_days().where(MoodDaily.day.in_(chunk))))
+    return len(days)
+
+
+def _refresh_dirty_days() -> int:
+    with engine.begin() as conn:
+        return refresh_cohort_cube(conn)
+
+
+async def _refresh_loop(interval: float):
+    while True:
+        await anyio.sleep(interval)
+        try:
+            n = await anyio.to_thread.run_sync(_refresh_dirty_days)
+            if n:
+                log.info("cohort cube: refreshed %d day(s)", n)
+        except Exception:
+            log.warning("cohort cube refresh failed", exc_info=True)
+
+
+def start_cohort_refresher():
+    """Refresh dirty days every COHORT_REFRESH_INTERVAL_SEC (0 = cron only)."""
+    global _refresher
+    interval = settings.cohort_refresh_interval_sec
+    if interval > 0 and _refresher is None:
+        _refresher = asyncio.get_running_loop().create_task(_refresh_loop(interval))
+
+
+async def stop_cohort_refresher():
+    global _refresher
+    if _refresher is None:
+        return
+    _refresher.cancel()
+    try:
+        await _refresher
+    except asyncio.CancelledError:
+        pass
+    _refresher = None
+
+
+def cohort_rows_all(db, since: date) -> list[tuple]:
+    return db.execute(
+        select(
+            MoodCohortDaily.day,
+            MoodCohortDaily.mood,
+            MoodCohortDaily.users,
+            MoodCohortDaily.count,
+            MoodCohortDaily.sum_sentiment,
+            MoodCohortDaily.sentiment_count,
+        ).where(MoodCohortDaily.day >= since)
+    ).all()
+
+
+def cohort_rows_for_users(db, user_pks: list[int], since: date) -> list[tuple]:
+    return db.execute(
+        _aggregate_days().where(MoodDaily.day >= since, MoodDaily.user_id_fk.in_(user_pks))
+    ).all()
+
+
+def cohort_summary(rows, since: date, days: int) -> dict:
+    """
+    (day, mood, users, count, sum_sentiment, sentiment_count) rows ->
+    per-day mood distribution + average sentiment, and window totals.
+    """
+    per_day: dict[date, dict] = {}
+    dist: dict[str, int] = {}
+    total = scored = 0
+    sentiment_sum = 0.0
+
+    for day, mood, users, count, s_sum, s_n in rows:
+        d = per_day.setdefault(day, {"total": 0, "sum": 0.0, "n": 0, "moods": {}})
+        d["total"] += count
+        d["sum"] += s_sum or 0.0
+        d["n"] += s_n or 0
+        # Rows for the same (day, mood) may arrive in several user chunks
+        m = d["moods"].setdefault(mood, {"count": 0, "users": 0})
+        m["count"] += int(count)
+        m["users"] += int(users)
+        dist[mood] = dist.get(mood, 0) + count
+        total += count
+        sentiment_sum += s_sum or 0.0
+        scored += s_n or 0
+
+    series = [
+        {
+            "day": str(day),
+            "total": int(d["total"]),
+            "avg_sentiment": round(d["sum"] / d["n"], 4) if d["n"] else None,
+            "moods": d["moods"],
+        }
+        for day, d in sorted(per_day.items())
+    ]
+
+    return {
+        "days": days,
+        "since": since.isoformat(),
+        "total": int(total),
+        "avg_sentiment": round(sentiment_sum / scored, 4) if scored else None,
+        "distribution": [
+            {"mood": mood, "count": int(count), "pct": round(100.0 * count / total, 2)}
+            for mood, count in sorted(dist.items(), key=lambda kv: -kv[1])
+        ],
+        "series": series,
+    }
@@ -0,0 +1,137 @@
+# Crisis keyword screen shared by every safety check (chat override and
+# empathy.detect_crisis). This is a SAFETY TRIGGER, not a diagnosis.
+#
+# The lexicon is compiled into one prefix-factored regex (a trie rendered as
+# nested alternations), so a message is scanned once regardless of how many
+# phrases there are, and phrases only match on word boundaries.
+import os
+import re
+import threading
+import time
+from pathlib import Path
+
+from ..settings import settings
+
+DEFAULT_LEXICON_PATH = Path(__file__).resolve().parent.parent / "data" / "crisis_terms.txt"
+
+# Used if the lexicon file is missing or empty
+FALLBACK_TERMS = [
+    "suicide", "suicides", "kill myself", "end my life", "want to die",
+    "self harm", "self harms", "self harmed", "self harming", "hurt myself",
+    "cut myself", "cutting", "overdose", "overdoses", "overdosed", "hang myself",
+    "jump off", "take my life", "can't go on", "no reason to live",
+]
+
+_SEPARATOR = r"[\s\-]+"
+_APOSTROPHE = r"['’]?"
+
+
+def _atoms(term: str) -> list[str]:
+    atoms: list[str] = []
+    for ch in " ".join(term.lower().replace("-", " ").split()):
+        if ch == " ":
+            atoms.append(_SEPARATOR)
+        elif ch in "'’":
+            atoms.append(_APOSTROPHE)
+        else:
+            atoms.append(re.escape(ch))
+    return atoms
+
+
+def _trie_regex(node: dict) -> str:
+    branches = [atom + _trie_regex(child) for atom, child in sorted(node.items()) if atom]
+    if not branches:
+        return ""
+    body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+    # "" marks the end of a phrase, so the rest of this branch is optional
+    if "" in node:
+        return "(?:" + body + ")?"
+    return body
+
+
+def compile_lexicon(terms: list[str]) -> re.Pattern | None:
+    trie: dict = {}
+    for term in terms:
+        atoms = _atoms(term)
+        if not atoms:
+            continue
+        node = trie
+        for atom in atoms:
+            node = node.setdefault(atom, {})
+        node[""] = {}
+    if not trie:
+        return None
+    # Phrases are lowercased and callers lowercase the text: much faster in
+    # `re` than IGNORECASE, which defeats its literal-prefix optimizations.
+    return re.compile(r"(?<!\w)" + _trie_regex(trie) + r"(?!\w)")
+
+
+def load_terms(path: Path) -> list[str]:
+    terms = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                terms.append(line)
+    return terms
+
+
+class CrisisMatcher:
+    """
+    Compiled crisis lexicon that hot-reloads its file: at most every
+    `check_interval` seconds a match call stats the file and recompiles if
+    its mtime changed. No restart needed after editing the lexicon.
+    """
+
+    def __init__(self, path: Path | str, check_interval: float = 5.0):
+        self.path = Path(path)
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._mtime: float | None = None
+        self._next_check = 0.0
+        self.terms: list[str] = []
+        self._pattern: re.Pattern | None = None
+        self.reload()
+
+    def reload(self) -> int:
+        """(Re)compile from the lexicon file. Returns the number of phrases."""
+        with self._lock:
+            try:
+                mtime = os.stat(self.path).st_mtime
+                terms = load_terms(self.path)
+            except OSError:
+                mtime, terms = None, []
+            self.terms = terms or list(FALLBACK_TERMS)
+            self._pattern = compile_lexicon(self.terms)
+            self._mtime = mtime
+            self._next_check = time.monotonic() + self.check_interval
+            return len(self.terms)
+
+    def _maybe_reload(self):
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        self._next_check = now + self.check_interval
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError:
+            mtime = None
+        if mtime != self._mtime:
+            self.reload()
+
+    def search(self, text: str) -> str | None:
+        """First crisis phrase found in `text` (lowercased), or None."""
+        self._maybe_reload()
+        if not text or self._pattern is None:
+            return None
+        m = self._pattern.search(text.lower())
+        return m.group(0) if m else None
+
+    def is_crisis(self, text: str) -> bool:
+        return self.search(text) is not None
+
+
+crisis_matcher = CrisisMatcher(
+    settings.crisis_lexicon_path or DEFAULT_LEXICON_PATH,
+    check_interval=settings.crisis_reload_interval_sec,
+)
@@ -1,7 +1,11 @@
 # Lightweight text sentiment + empathetic nudge. Uses NLTK VADER.
+from functools import lru_cache
+
 import nltk
 from nltk.sentiment import SentimentIntensityAnalyzer
 
+from .crisis import crisis_matcher
+
 _vader = None
 
 def get_vader():
@@ -14,15 +18,56 @@ def get_vader():
         _vader = SentimentIntensityAnalyzer()
     return _vader
 
+# Short messages ("ok", "thanks", "im tired") repeat a lot, so their scores
+# are memoized. Keys are whitespace-normalized only: VADER is case- and
+# punctuation-sensitive ("GREAT!!" != "great"), so those are kept.
+SENTIMENT_CACHE_SIZE = 8192
+SENTIMENT_CACHE_MAX_CHARS = 80
+
+def _normalize(text: str) -> str:
+    return " ".join((text or "").split())
+
+@lru_cache(maxsize=SENTIMENT_CACHE_SIZE)
+def _cached_scores(normalized: str) -> tuple:
+    return tuple(get_vader().polarity_scores(normalized).items())
+
+def _scores(normalized: str) -> dict:
+    if len(normalized) <= SENTIMENT_CACHE_MAX_CHARS:
+        return dict(_cached_scores(normalized))
+    return get_vader().polarity_scores(normalized)
+
+# Compound cut-offs for the labels (stricter than VADER's usual +/-0.05, so
+# mildly worded messages stay neutral)
+POSITIVE_THRESHOLD = 0.3
+NEGATIVE_THRESHOLD = -0.3
+
+def _label(compound: float) -> str:
+    if compound >= POSITIVE_THRESHOLD:
+        return 'positive'
+    if compound <= NEGATIVE_THRESHOLD:
+        return 'negative'
+    return 'neutral'
+
+def _result(scores: dict) -> dict:
+    return {"sentiment": _label(scores['compound']), "scores": scores}
+
 def analyze_text(text: str) -> dict:
-    sia = get_vader()
-    scores = sia.polarity_scores(text)
-    label = 'neutral'
-    if scores['compound'] >= 0.3:
-        label = 'positive'
-    elif scores['compound'] <= -0.3:
-        label = 'negative'
-    return {"sentiment": label, "scores": scores}
+    return _result(_scores(_normalize(text)))
+
+def analyze_texts(texts: list[str]) -> list[dict]:
+    """
+    Score many texts in one call (same output as analyze_text per item).
+    Duplicates within the batch are scored once.
+    """
+    by_text: dict[str, dict] = {}
+    out = []
+    for text in texts:
+        norm = _normalize(text)
+        scores = by_text.get(norm)
+        if scores is None:
+            scores = by_text[norm] = _scores(norm)
+        out.append(_result(dict(scores)))
+    return out
 
 def empathy_prompt_fragment(sentiment_label: str) -> str:
     if sentiment_label == 'negative':
@@ -36,11 +81,6 @@ def empathy_prompt_fragment(sentiment_label: str) -> str:
         )
     return "Be supportive and curious, ask gentle follow-ups."
 
-CRISIS_TERMS = [
-    "suicide", "kill myself", "end my life", "self harm",
-    "cutting", "overdose", "die", "want to disappear"
-]
-
 def detect_crisis(text: str) -> bool:
-    t = text.lower()
-    return any(term in t for term in CRISIS_TERMS)
+    # Same compiled lexicon as the chat safety override
+    return crisis_matcher.is_crisis(text)
@@ -0,0 +1,182 @@
+# Streaming export of a user's conversations and messages.
+#
+# Memory stays flat however long the history is: all of the user's messages
+# are read in one pass ordered by (conversation_id, id), in pages of
+# EXPORT_PAGE rows, and grouped into conversations as they stream. On
+# Postgres the pages come from a server-side cursor (yield_per). On SQLite
+# each page is a short keyset query instead, so a slow client never keeps a
+# read open on the database file (which would block writers).
+import json
+import zlib
+from datetime import datetime, timezone
+from typing import AsyncIterator
+
+from sqlalchemy import select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..db import AsyncSessionLocal
+from ..models import Conversation, Message
+
+EXPORT_PAGE = 500
+EXPORT_FORMATS = ("ndjson", "json.gz")
+
+
+def _as_utc(value: datetime | None) -> datetime | None:
+    # SQLite stores created_at as naive UTC and drops a bound value's tzinfo,
+    # so bounds are converted first. Naive bounds are taken as UTC.
+    if value is None:
+        return None
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+
+def _iso(value) -> str | None:
+    return value.isoformat() if value is not None else None
+
+
+def _conversation_record(row) -> dict:
+    return {
+        "type": "conversation",
+        "id": row.id,
+        "started_at": _iso(row.started_at),
+        "ended_at": _iso(row.ended_at),
+        "summary": row.summary,
+    }
+
+
+def _message_record(row, include_annotations: bool) -> dict:
+    rec = {
+        "type": "message",
+        "id": row.id,
+        "conversation_id": row.conversation_id,
+        "role": row.role,
+        "content": row.content,
+        "created_at": _iso(row.created_at),
+        "sentiment_compound": row.sentiment_compound,
+    }
+    if include_annotations:
+        rec["annotations"] = row.annotations
+    return rec
+
+
+async def _message_pages(db: AsyncSession, query) -> AsyncIterator[list]:
+    # `query` is ordered by (conversation_id, id)
+    if db.get_bind().dialect.name == "sqlite":
+        page = query
+        while True:
+            rows = (await db.execute(page.limit(EXPORT_PAGE))).all()
+            if rows:
+                yield rows
+            if len(rows) < EXPORT_PAGE:
+                return
+            last = rows[-1]
+            page = query.where(
+                tuple_(Message.conversation_id, Message.id) > tuple_(last.conversation_id, last.id)
+            )
+    else:
+        result = await db.stream(query.execution_options(yield_per=EXPORT_PAGE))
+        async for rows in result.partitions():
+            yield rows
+
+
+async def export_records(
+    user_pk: int,
+    user_id: str,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    include_annotations: bool = True,
+) -> AsyncIterator[dict]:
+    """
+    A user record, then each conversation that has messages in
+    [since, until) followed by those messages, oldest first.
+    """
+    since, until = _as_utc(since), _as_utc(until)
+    yield {"type": "user", "user_id": user_id, "exported_at": datetime.now(timezone.utc).isoformat()}
+
+    # Opened here, not in a dependency: the body streams after the endpoint returns
+    async with AsyncSessionLocal() as db:
+        # Headers only; the messages come from one query below
+        result = await db.execute(
+            select(
+                Conversation.id,
+                Conversation.started_at,
+                Conversation.ended_at,
+                Conversation.summary,
+            ).where(Conversation.user_id_fk == user_pk)
+        )
+        conversations = {row.id: row for row in result}
+
+        columns = [
+            Message.id,
+            Message.conversation_id,
+            Message.role,
+            Message.content,
+            Message.created_at,
+            Message.sentiment_compound,
+        ]
+        if include_annotations:
+            columns.append(Message.annotations)
+
+        query = (
+            select(*columns)
+            .join(Conversation, Conversation.id == Message.conversation_id)
+            .where(Conversation.user_id_fk == user_pk)
+        )
+        if since is not None:
+            query = query.where(Message.created_at >= since)
+        if until is not None:
+            query = query.where(Message.created_at < until)
+        query = query.order_by(Message.conversation_id, Message.id)
+
+        current = None
+        async for rows in _message_pages(db, query):
+            for row in rows:
+                if row.conversation_id != current:
+                    current = row.conversation_id
+                    yield _conversation_record(conversations[current])
+                yield _message_record(row, include_annotations)
+
+
+async def ndjson_stream(records: AsyncIterator[dict]) -> AsyncIterator[bytes]:
+    buf: list[str] = []
+    async for rec in records:
+        buf.append(json.dumps(rec, ensure_ascii=False))
+        if len(buf) >= EXPORT_PAGE:
+            yield ("\n".join(buf) + "\n").encode()
+            buf = []
+    if buf:
+        yield ("\n".join(buf) + "\n").encode()
+
+
+async def gzip_json_stream(records: AsyncIterator[dict]) -> AsyncIterator[bytes]:
+    """
+    One JSON document, gzip-compressed on the fly:
+    {"user": {...}, "conversations": [{..., "messages": [...]}, ...]}
+    """
+    gz = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31: gzip container
+    out: list[str] = []
+    in_conversation = first_message = False
+    first_conversation = True
+
+    async for rec in records:
+        kind = rec.pop("type")
+        if kind == "user":
+            out.append('{"user": ' + json.dumps(rec, ensure_ascii=False) + ', "conversations": [')
+        elif kind == "conversation":
+            if in_conversation:
+                out.append("]}")
+            out.append(("" if first_conversation else ", ") + json.dumps(rec, ensure_ascii=False)[:-1] + ', "messages": [')
+            in_conversation, first_conversation, first_message = True, False, True
+        else:
+            out.append(("" if first_message else ", ") + json.dumps(rec, ensure_ascii=False))
+            first_message = False
+
+        if len(out) >= EXPORT_PAGE:
+            data = gz.compress("".join(out).encode())
+            out = []
+            if data:
+                yield data
+
+    if in_conversation:
+        out.append("]}")
+    out.append("]}\n")
+    yield gz.compress("".join(out).encode()) + gz.flush()
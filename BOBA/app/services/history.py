@@ -0,0 +1,59 @@
+# Prompt history window: newest messages that fit a token budget, with older
+# turns folded into a rolling per-conversation summary so the prompt stays
+# bounded however long the conversation runs.
+
+# Rough token estimate (~4 chars/token for English); no tokenizer dependency
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def role_label(role: str) -> str:
+    return "User" if role == "user" else "BOBA" if role == "assistant" else role
+
+
+def format_line(role: str, content: str | None) -> str:
+    content = (content or "").strip()
+    return f"{role_label(role)}: {content}" if content else ""
+
+
+def select_window(messages: list, token_budget: int, max_messages: int) -> tuple[list, list]:
+    """
+    Split oldest->newest `messages` into (dropped, kept): `kept` is the
+    longest newest suffix within `token_budget` and `max_messages`.
+    """
+    used = 0
+    start = len(messages)
+    for i in range(len(messages) - 1, -1, -1):
+        if len(messages) - i > max_messages:
+            break
+        cost = estimate_tokens(format_line(messages[i].role, messages[i].content))
+        if used + cost > token_budget:
+            break
+        used += cost
+        start = i
+    return messages[:start], messages[start:]
+
+
+def fold_summary(summary: str | None, dropped: list, max_chars: int, line_chars: int) -> str:
+    """
+    Append one clipped line per dropped message to the summary, then trim
+    the oldest lines until it fits `max_chars`.
+    """
+    lines = summary.splitlines() if summary else []
+    for m in dropped:
+        line = format_line(m.role, " ".join((m.content or "").split()))
+        if not line:
+            continue
+        if len(line) > line_chars:
+            line = line[: line_chars - 1].rstrip() + "…"
+        lines.append(line)
+
+    total = sum(len(line) + 1 for line in lines)
+    start = 0
+    while start < len(lines) and total > max_chars:
+        total -= len(lines[start]) + 1
+        start += 1
+    return "\n".join(lines[start:])
@@ -0,0 +1,56 @@
+# Process-wide pooled HTTP client shared by every LLM provider.
+# Created/closed by the FastAPI lifespan in app.main so connections (and TLS
+# sessions) to the provider are reused across chat turns.
+import logging
+
+import httpx
+
+from ..settings import settings
+
+log = logging.getLogger(__name__)
+
+_client: httpx.AsyncClient | None = None
+
+
+def _build_client() -> httpx.AsyncClient:
+    limits = httpx.Limits(
+        max_connections=settings.llm_max_connections,
+        max_keepalive_connections=settings.llm_max_keepalive_connections,
+        keepalive_expiry=settings.llm_keepalive_expiry_sec,
+    )
+    timeout = httpx.Timeout(settings.llm_timeout_sec, connect=settings.llm_connect_timeout_sec)
+
+    http2 = settings.llm_http2
+    if http2:
+        try:
+            import h2  # noqa: F401
+        except ImportError:
+            log.warning("LLM_HTTP2 is set but 'h2' is not installed; using HTTP/1.1")
+            http2 = False
+
+    return httpx.AsyncClient(timeout=timeout, limits=limits, http2=http2)
+
+
+async def start_http_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None:
+        _client = _build_client()
+    return _client
+
+
+async def close_http_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Shared client. Built lazily if the app lifespan has not run
+    (scripts, ad-hoc use); normally it already exists.
+    """
+    global _client
+    if _client is None:
+        _client = _build_client()
+    return _client
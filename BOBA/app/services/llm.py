@@ -1,9 +1,35 @@
-import httpx
+import hashlib
+import json
+import logging
+from dataclasses import dataclass
+from typing import AsyncIterator
+
+import anyio
 
 from ..settings import settings
+from .http import get_http_client
+from .resilience import ProviderUnavailable, provider_guard, hedge_deadline
 from .empathy import empathy_prompt_fragment
 from .timeline import human_delta
 
+log = logging.getLogger(__name__)
+
+
+class StreamInterrupted(Exception):
+    """The provider failed after the first token; the reply is incomplete."""
+
+
+@dataclass
+class ReplySource:
+    """
+    Who produced a reply: the provider name, or "rule" for the rule-based
+    reply, with `fallback` saying why a configured provider didn't answer
+    (no_api_key, circuit_open, queue_full, queue_timeout, hedged, error,
+    empty).
+    """
+    provider: str = "rule"
+    fallback: str | None = None
+
 
 def _profile_block(profile: dict) -> str:
     if not profile:
@@ -27,6 +53,71 @@ def _profile_block(profile: dict) -> str:
     return "Known user profile (from database): " + ", ".join(parts) + "."
 
 
+# --------------------------------------------------
+# System prompt
+# --------------------------------------------------
+# Everything static is built once at import. Each prompt starts with the
+# same persona/style/recall/closing text followed by one of three
+# precomputed empathy variants, so requests with the same sentiment share a
+# byte-identical prefix that providers can cache. Per-user material
+# (profile, timing, trend) goes after it, in a fixed order.
+_BASE = (
+    "You are BOBA, a warm, friendly, funny, non-clinical mental health companion. "
+    "You're created based on a real life cat but this doesn't change how you behave"
+    "You have an avatar of a cute cat so some people may refer you as one."
+    "You are supportive like a close friend or even better to say close buddy. "
+    "You may give some therapeutic-style reflections, but do not sound clinical or robotic. "
+    "Avoid medical or diagnostic claims. "
+    "Keep replies natural, human, and not robotic. "
+    "Do not overuse the user's name; use it at most once occasionally."
+)
+
+_STYLE_RULES = (
+    "Conversation style rules: "
+    "- You may include a brief, understated human aside when the user's tone is neutral or mildly positive. "
+    "- You don't need to start conversations with Hey everytime"
+    "- This aside should sound like something a calm friend might say in passing. "
+    "- Can try to be funny. "
+    "- Use jokes, sarcasm, emojis, or punchlines it's appropiate. "
+    "- Do NOT add more than one such aside. "
+    "- Do NOT do this during distress, sadness, or crisis-like situations. "
+    "- It is completely okay to say nothing extra."
+)
+
+_RECALL_RULES = (
+    "If the user asks what you remember about them, "
+    "answer using the Known user profile (from database). "
+    "If something is missing, say you don’t have it yet without pressure."
+)
+
+_CLOSING = (
+    "Do not force questions. "
+    "Silence and presence are acceptable. "
+    "End responses in a natural, open way."
+)
+
+_STATIC_PREFIX = " ".join([_BASE, _STYLE_RULES, _RECALL_RULES, _CLOSING])
+
+_PROMPT_PREFIXES = {
+    label: _STATIC_PREFIX + " " + empathy_prompt_fragment(label)
+    for label in ("negative", "neutral", "positive")
+}
+
+_PROMPT_PREFIX_HASHES = {
+    label: hashlib.sha256(prefix.encode("utf-8")).hexdigest()[:16]
+    for label, prefix in _PROMPT_PREFIXES.items()
+}
+
+
+def _prefix_label(sentiment_label: str) -> str:
+    return sentiment_label if sentiment_label in _PROMPT_PREFIXES else "neutral"
+
+
+def prompt_prefix_hash(sentiment_label: str) -> str:
+    """Short hash of the cacheable system-prompt prefix used for this sentiment."""
+    return _PROMPT_PREFIX_HASHES[_prefix_label(sentiment_label)]
+
+
 def _boba_system_prompt(
     profile: dict,
     sentiment_label: str,
@@ -35,48 +126,15 @@ def _boba_system_prompt(
 ) -> str:
     """
     Stable tone + optional model-generated micro-humor.
+    Precomputed prefix first, then per-user parts in a fixed order.
     """
+    parts = [_PROMPT_PREFIXES[_prefix_label(sentiment_label)], _profile_block(profile)]
 
-    base = (
-        "You are BOBA, a warm, friendly, funny, non-clinical mental health companion. "
-        "You're created based on a real life cat but this doesn't change how you behave"
-        "You have an avatar of a cute cat so some people may refer you as one."
-        "You are supportive like a close friend or even better to say close buddy. "
-        "You may give some therapeutic-style reflections, but do not sound clinical or robotic. "
-        "Avoid medical or diagnostic claims. "
-        "Keep replies natural, human, and not robotic. "
-        "Do not overuse the user's name; use it at most once occasionally."
-    )
-
-    style_rules = (
-        "Conversation style rules: "
-        "- You may include a brief, understated human aside when the user's tone is neutral or mildly positive. "
-        "- You don't need to start conversations with Hey everytime"
-        "- This aside should sound like something a calm friend might say in passing. "
-        "- Can try to be funny. "
-        "- Use jokes, sarcasm, emojis, or punchlines it's appropiate. "
-        "- Do NOT add more than one such aside. "
-        "- Do NOT do this during distress, sadness, or crisis-like situations. "
-        "- It is completely okay to say nothing extra."
-    )
-
-    empathy = empathy_prompt_fragment(sentiment_label)
-
-    timing = ""
     if last_seen:
-        timing = f"The user last visited {human_delta(last_seen)}. You may acknowledge this softly if it fits."
-
-    memory = _profile_block(profile)
-
-    recall_rules = (
-        "If the user asks what you remember about them, "
-        "answer using the Known user profile (from database). "
-        "If something is missing, say you don’t have it yet without pressure."
-    )
+        parts.append(f"The user last visited {human_delta(last_seen)}. You may acknowledge this softly if it fits.")
 
-    trend = ""
     if trend_summary:
-        trend = (
+        parts.append(
             "You have an optional emotional trend reflection: "
             f"'{trend_summary}'. "
             "If it fits naturally, include it as ONE gentle sentence. "
@@ -84,22 +142,7 @@ def _boba_system_prompt(
             "Do not add extra questions because of it."
         )
 
-    closing = (
-        "Do not force questions. "
-        "Silence and presence are acceptable. "
-        "End responses in a natural, open way."
-    )
-
-    return " ".join([
-        base,
-        style_rules,
-        empathy,
-        timing,
-        memory,
-        recall_rules,
-        trend,
-        closing,
-    ])
+    return " ".join(parts)
 
 
 async def rule_based_reply(
@@ -128,44 +171,186 @@ async def rule_based_reply(
     return (pre + "I’m here with you.").strip()
 
 
-async def xai_reply(
+def _chat_messages(
     prompt: str,
     profile: dict,
     sentiment_label: str,
     last_seen,
     trend_summary: str | None,
-):
-    if not settings.xai_api_key:
-        return await rule_based_reply(prompt, profile, sentiment_label, last_seen, trend_summary)
+) -> list[dict]:
+    return [
+        {
+            "role": "system",
+            "content": _boba_system_prompt(
+                profile,
+                sentiment_label,
+                last_seen,
+                trend_summary,
+            ),
+        },
+        {"role": "user", "content": prompt},
+    ]
+
 
+def _xai_payload(
+    prompt: str,
+    profile: dict,
+    sentiment_label: str,
+    last_seen,
+    trend_summary: str | None,
+    stream: bool = False,
+) -> dict:
     payload = {
         "model": settings.default_model_name,
-        "messages": [
-            {
-                "role": "system",
-                "content": _boba_system_prompt(
-                    profile,
-                    sentiment_label,
-                    last_seen,
-                    trend_summary,
-                ),
-            },
-            {"role": "user", "content": prompt},
-        ],
+        "messages": _chat_messages(prompt, profile, sentiment_label, last_seen, trend_summary),
         "temperature": 0.7,
     }
+    if stream:
+        payload["stream"] = True
+    return payload
 
-    headers = {"Authorization": f"Bearer {settings.xai_api_key}"}
 
-    async with httpx.AsyncClient(timeout=60) as client:
-        r = await client.post(
-            f"{settings.xai_base_url}/v1/chat/completions",
-            json=payload,
-            headers=headers,
-        )
+def _require_configured(provider: str) -> None:
+    """
+    Raises ProviderUnavailable if the provider can't be called at all, so the
+    rule-based reply isn't passed off as the provider's. Checked before the
+    provider guard so a missing key is neither a success nor a failure.
+    """
+    if provider == "xai" and not settings.xai_api_key:
+        raise ProviderUnavailable(provider, "no_api_key")
+
+
+def _xai_headers() -> dict:
+    return {"Authorization": f"Bearer {settings.xai_api_key}"}
+
+
+async def xai_reply(
+    prompt: str,
+    profile: dict,
+    sentiment_label: str,
+    last_seen,
+    trend_summary: str | None,
+):
+    _require_configured("xai")
+
+    r = await get_http_client().post(
+        f"{settings.xai_base_url}/v1/chat/completions",
+        json=_xai_payload(prompt, profile, sentiment_label, last_seen, trend_summary),
+        headers=_xai_headers(),
+    )
+    r.raise_for_status()
+    data = r.json()
+    return data["choices"][0]["message"]["content"].strip()
+
+
+async def xai_stream(
+    prompt: str,
+    profile: dict,
+    sentiment_label: str,
+    last_seen,
+    trend_summary: str | None,
+) -> AsyncIterator[str]:
+    """
+    Yields content deltas from the OpenAI-compatible SSE stream
+    (`data: {...}` lines, terminated by `data: [DONE]`).
+    """
+    _require_configured("xai")
+
+    async with get_http_client().stream(
+        "POST",
+        f"{settings.xai_base_url}/v1/chat/completions",
+        json=_xai_payload(prompt, profile, sentiment_label, last_seen, trend_summary, stream=True),
+        headers=_xai_headers(),
+    ) as r:
         r.raise_for_status()
-        data = r.json()
-        return data["choices"][0]["message"]["content"].strip()
+        async for line in r.aiter_lines():
+            if not line.startswith("data:"):
+                continue
+            data = line[len("data:"):].strip()
+            if data == "[DONE]":
+                break
+            try:
+                chunk = json.loads(data)
+                delta = chunk["choices"][0].get("delta") or {}
+            except (ValueError, KeyError, IndexError):
+                continue
+            if delta.get("content"):
+                yield delta["content"]
+
+
+def _ollama_payload(
+    prompt: str,
+    profile: dict,
+    sentiment_label: str,
+    last_seen,
+    trend_summary: str | None,
+    stream: bool = False,
+) -> dict:
+    return {
+        "model": settings.ollama_model,
+        "messages": _chat_messages(prompt, profile, sentiment_label, last_seen, trend_summary),
+        "stream": stream,
+        "keep_alive": settings.ollama_keep_alive,
+        "options": {"temperature": 0.7},
+    }
+
+
+async def ollama_reply(
+    prompt: str,
+    profile: dict,
+    sentiment_label: str,
+    last_seen,
+    trend_summary: str | None,
+):
+    r = await get_http_client().post(
+        f"{settings.ollama_base_url}/api/chat",
+        json=_ollama_payload(prompt, profile, sentiment_label, last_seen, trend_summary),
+    )
+    r.raise_for_status()
+    data = r.json()
+    if data.get("error"):
+        raise RuntimeError(f"ollama: {data['error']}")
+    return data["message"]["content"].strip()
+
+
+async def ollama_stream(
+    prompt: str,
+    profile: dict,
+    sentiment_label: str,
+    last_seen,
+    trend_summary: str | None,
+) -> AsyncIterator[str]:
+    """
+    Yields content deltas from Ollama's NDJSON stream (one JSON object per
+    line, the last one has `"done": true`).
+    """
+    async with get_http_client().stream(
+        "POST",
+        f"{settings.ollama_base_url}/api/chat",
+        json=_ollama_payload(prompt, profile, sentiment_label, last_seen, trend_summary, stream=True),
+    ) as r:
+        r.raise_for_status()
+        async for line in r.aiter_lines():
+            if not line.strip():
+                continue
+            try:
+                chunk = json.loads(line)
+            except ValueError:
+                continue
+            if chunk.get("error"):
+                raise RuntimeError(f"ollama: {chunk['error']}")
+            content = (chunk.get("message") or {}).get("content")
+            if content:
+                yield content
+            if chunk.get("done"):
+                break
+
+
+# provider -> (reply, stream)
+_PROVIDERS = {
+    "xai": (xai_reply, xai_stream),
+    "ollama": (ollama_reply, ollama_stream),
+}
 
 
 async def generate_reply(
@@ -175,13 +360,90 @@ async def generate_reply(
     last_seen,
     trend_summary: str | None = None,
     followup_question=None,  # intentionally ignored in stable mode
-):
+) -> tuple[str, ReplySource]:
+    """(reply, source): the provider's reply, else the rule-based one."""
     provider = (settings.default_model_provider or "rule").lower()
+    source = ReplySource()
 
-    if provider == "xai":
+    if provider in _PROVIDERS:
+        reply, _ = _PROVIDERS[provider]
+        guard = provider_guard(provider)
         try:
-            return await xai_reply(prompt, profile, sentiment_label, last_seen, trend_summary)
+            _require_configured(provider)
+            # The deadline covers queueing for a slot as well as the call
+            with anyio.move_on_after(hedge_deadline()):
+                async with guard.call():
+                    text = await reply(prompt, profile, sentiment_label, last_seen, trend_summary)
+                    return text, ReplySource(provider)
+            guard.note_hedged()
+            source.fallback = "hedged"
+        except ProviderUnavailable as e:
+            log.info("skipping %s: %s", provider, e.reason)
+            source.fallback = e.reason
         except Exception:
-            return await rule_based_reply(prompt, profile, sentiment_label, last_seen, trend_summary)
+            log.warning("%s reply failed", provider, exc_info=True)
+            source.fallback = "error"
+
+    return await rule_based_reply(prompt, profile, sentiment_label, last_seen, trend_summary), source
+
+
+async def stream_reply(
+    prompt: str,
+    profile: dict,
+    sentiment_label: str,
+    last_seen,
+    trend_summary: str | None = None,
+    source: ReplySource | None = None,
+) -> AsyncIterator[str]:
+    """
+    Streaming counterpart of generate_reply. If the provider is
+    unavailable, misses the hedge deadline for its first token, or fails
+    before the first token, the rule-based reply is yielded instead. If it
+    fails mid-stream, StreamInterrupted is raised after the tokens already
+    yielded, so the caller can tell a truncated reply from a complete one.
+    `source`, if given, is filled in with who answered.
+    """
+    provider = (settings.default_model_provider or "rule").lower()
+    if source is None:
+        source = ReplySource()
+
+    if provider in _PROVIDERS:
+        _, stream = _PROVIDERS[provider]
+        guard = provider_guard(provider)
+        started = False
+        try:
+            _require_configured(provider)
+            # The slot spans the whole stream, so the hedge deadline (first
+            # token only) sits inside it; a hedged call is abandoned so it is
+            # recorded as cancelled, like a hedged generate_reply
+            async with guard.call() as call:
+                tokens = stream(prompt, profile, sentiment_label, last_seen, trend_summary)
+                try:
+                    first = None
+                    with anyio.move_on_after(hedge_deadline()) as scope:
+                        first = await anext(tokens, None)
+                    if first is not None:
+                        started = True
+                        source.provider = provider
+                        yield first
+                        async for token in tokens:
+                            yield token
+                        return
+                    if scope.cancelled_caught:
+                        call.abandon()
+                        guard.note_hedged()
+                        source.fallback = "hedged"
+                    else:
+                        source.fallback = "empty"
+                finally:
+                    await tokens.aclose()
+        except ProviderUnavailable as e:
+            log.info("skipping %s: %s", provider, e.reason)
+            source.fallback = e.reason
+        except Exception as e:
+            log.warning("%s stream failed (started=%s)", provider, started, exc_info=True)
+            if started:
+                raise StreamInterrupted(provider) from e
+            source.fallback = "error"
 
-    return await rule_based_reply(prompt, profile, sentiment_label, last_seen, trend_summary)
+    yield await rule_based_reply(prompt, profile, sentiment_label, last_seen, trend_summary)
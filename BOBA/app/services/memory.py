@@ -1,20 +1,43 @@
 import re
+from datetime import datetime, timezone
+from sqlalchemy import ColumnElement, select, update
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import Session
-from ..models import User, Memory, Conversation, Message
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..models import User, Memory, Conversation, Message, SentimentState
+from .trend import RollingSentiment, WINDOW
+from .user_cache import user_cache
+from .history import select_window, fold_summary
+from ..settings import settings
 
 MEMORY_KEYS = {"name", "nickname", "age", "hobbies", "diagnosis"}
 
 
 def ensure_user(db: Session, user_id: str, **defaults) -> User:
+    cached = user_cache.get(user_id)
+    if cached:
+        return db.merge(cached.to_detached_user(), load=False)
+
     user = db.query(User).filter(User.user_id == user_id).first()
     if not user:
         user = User(user_id=user_id, **defaults)
         db.add(user)
         db.commit()
         db.refresh(user)
+    user_cache.put(user)
     return user
 
 
+def get_user_pk(db: Session, user_id: str) -> int | None:
+    """users.id for a user_id, from the user cache when possible."""
+    cached = user_cache.get(user_id)
+    if cached:
+        return cached.pk
+    user = db.query(User).filter(User.user_id == user_id).first()
+    return user_cache.put(user).pk if user else None
+
+
 def recall_profile(user: User) -> dict:
     return {
         "name": user.name,
@@ -36,84 +59,146 @@ def save_kv_memories(db: Session, user: User, items: dict):
     db.commit()
 
 
-def update_user_profile_from_memories(db: Session, user: User, items: dict):
-    changed = False
-
-    if items.get("name") and not user.name:
-        user.name = str(items["name"]).strip()
-        changed = True
-
-    if items.get("nickname") and not user.nickname:
-        user.nickname = str(items["nickname"]).strip()
-        changed = True
+def _profile_updates(profile: dict, items: dict) -> dict:
+    """Fields from `items` that would fill an empty slot in `profile`."""
+    updates = {}
+    for key in ("name", "nickname", "hobbies", "diagnosis"):
+        if items.get(key) and not profile.get(key):
+            updates[key] = str(items[key]).strip()
 
-    if items.get("age") is not None and user.age is None:
+    if items.get("age") is not None and profile.get("age") is None:
         try:
-            user.age = int(items["age"])
-            changed = True
+            updates["age"] = int(items["age"])
         except Exception:
             pass
 
-    if items.get("hobbies") and not user.hobbies:
-        user.hobbies = str(items["hobbies"]).strip()
-        changed = True
+    return updates
 
-    if items.get("diagnosis") and not user.diagnosis:
-        user.diagnosis = str(items["diagnosis"]).strip()
-        changed = True
 
-    if changed:
+def _apply_profile_items(user: User, items: dict) -> bool:
+    updates = _profile_updates(recall_profile(user), items)
+    for key, value in updates.items():
+        setattr(user, key, value)
+    return bool(updates)
+
+
+def profile_with_memories(user: User, items: dict) -> dict:
+    """recall_profile() as it will read once `items` are applied (user untouched)."""
+    profile = recall_profile(user)
+    profile.update(_profile_updates(profile, items))
+    return profile
+
+
+def update_user_profile_from_memories(db: Session, user: User, items: dict):
+    if _apply_profile_items(user, items):
         db.commit()
         db.refresh(user)
+        user_cache.put(user)
+
+
+# =========================
+# Memory fact extraction
+# =========================
+# Nearly no message states a fact, so extraction is: a cheap literal
+# prefilter, then ONE scan with a combined trigger regex, then tiny anchored
+# value matches at each trigger. Only the first MAX_SCAN_CHARS are scanned
+# for triggers, so long pasted text costs a bounded amount.
+MAX_SCAN_CHARS = 2000
+
+_TRIGGER_LITERALS = (
+    "call me", "my name", "i am", "i'm", "hobbies",
+    "i like", "i enjoy", "i love", "diagnos",
+)
+
+_TRIGGER_RE = re.compile(
+    r"\b(?:"
+    r"(?P<nickname>(?:you can )?call me)"
+    r"|(?P<name>my name is)"
+    r"|(?P<age>i am|i'm)"
+    r"|(?P<hobbies>my hobbies (?:are|include))"
+    r"|(?P<likes>i (?:like|enjoy|love))"
+    r"|(?P<diagnosed>i was diagnosed with|i've been diagnosed with)"
+    r"|(?P<diagnosis>my diagnosis is)"
+    r")\s+",
+    re.I,
+)
+
+_WORD_VALUE_RE = re.compile(r"[A-Za-z][A-Za-z0-9_\-]{1,20}\b")
+_AGE_VALUE_RE = re.compile(r"(\d{1,2})\s*(?:years?\s*old)?\b", re.I)
+
+# Free-text facts run to the end of the message: (min_len, max_len)
+_TAIL_LIMITS = {
+    "hobbies": (0, 120),
+    "likes": (2, 120),
+    "diagnosed": (2, 80),
+    "diagnosis": (2, 80),
+}
+
+
+def _tail_value(t: str, pos: int, kind: str) -> tuple[bool, str | None]:
+    """
+    Rest of the (stripped) message after a trigger, mirroring the old
+    `(.+)$` patterns: returns (single_line, value). Multi-line tails don't
+    match at all (a later trigger may); single-line ones are then checked
+    against the length limits for `kind`.
+    """
+    if pos >= len(t) or t.find("\n", pos) != -1:
+        return False, None
+    lo, hi = _TAIL_LIMITS[kind]
+    # Cheap reject before slicing long pasted text (small slack for " .!")
+    if len(t) - pos > hi + 16:
+        return True, None
+    value = t[pos:].strip(" .!")
+    return True, (value if lo <= len(value) <= hi else None)
 
 
 def extract_memories_from_text(text: str) -> dict:
     t = (text or "").strip()
-    low = t.lower()
-    out: dict = {}
+    head = t[:MAX_SCAN_CHARS]
+    low = head.lower()
+    if not any(k in low for k in _TRIGGER_LITERALS):
+        return {}
+
+    found: dict = {}
+    for m in _TRIGGER_RE.finditer(head):
+        kind = m.lastgroup
+        if kind in found:
+            continue
+        pos = m.end()
+
+        if kind in ("nickname", "name"):
+            v = _WORD_VALUE_RE.match(t, pos)
+            if v:
+                found[kind] = v.group(0)
+        elif kind == "age":
+            v = _AGE_VALUE_RE.match(t, pos)
+            if v:
+                age = int(v.group(1))
+                found[kind] = age if 5 <= age <= 120 else None
+        else:
+            single_line, value = _tail_value(t, pos, kind)
+            if single_line:
+                found[kind] = value
+
+        if len(found) == len(_TRIGGER_RE.groupindex):
+            break
 
-    # Nickname
-    m = re.search(r"\b(?:call me|you can call me)\s+([A-Za-z][A-Za-z0-9_\-]{1,20})\b", t, re.I)
-    if m:
-        out["nickname"] = m.group(1)
-
-    # Name
-    m = re.search(r"\bmy name is\s+([A-Za-z][A-Za-z0-9_\-]{1,20})\b", t, re.I)
-    if m:
-        out["name"] = m.group(1)
-
-    # Age
-    m = re.search(r"\b(?:i am|i'm)\s+(\d{1,2})\s*(?:years?\s*old)?\b", low)
-    if m:
-        age = int(m.group(1))
-        if 5 <= age <= 120:
-            out["age"] = age
-
-    # Hobbies
-    m = re.search(r"\b(?:my hobbies are|my hobbies include)\s+(.+)$", t, re.I)
-    if m:
-        hobbies = m.group(1).strip(" .!")
-        if len(hobbies) <= 120:
-            out["hobbies"] = hobbies
-
-    m = re.search(r"\b(?:i like|i enjoy|i love)\s+(.+)$", t, re.I)
-    if m:
-        hobbies = m.group(1).strip(" .!")
-        if 2 <= len(hobbies) <= 120:
-            out.setdefault("hobbies", hobbies)
-
-    # Diagnosis
-    m = re.search(r"\b(?:i was diagnosed with|i've been diagnosed with)\s+(.+)$", t, re.I)
-    if m:
-        diag = m.group(1).strip(" .!")
-        if 2 <= len(diag) <= 80:
-            out["diagnosis"] = diag
-
-    m = re.search(r"\bmy diagnosis is\s+(.+)$", t, re.I)
-    if m:
-        diag = m.group(1).strip(" .!")
-        if 2 <= len(diag) <= 80:
-            out["diagnosis"] = diag
+    out: dict = {}
+    for key in ("nickname", "name", "age"):
+        if found.get(key) is not None:
+            out[key] = found[key]
+
+    # Explicit "my hobbies are" beats "i like/enjoy/love"
+    if found.get("hobbies") is not None:
+        out["hobbies"] = found["hobbies"]
+    elif found.get("likes") is not None:
+        out["hobbies"] = found["likes"]
+
+    # "my diagnosis is" beats "i was diagnosed with"
+    if found.get("diagnosis") is not None:
+        out["diagnosis"] = found["diagnosis"]
+    elif found.get("diagnosed") is not None:
+        out["diagnosis"] = found["diagnosed"]
 
     return out
 
@@ -175,43 +260,23 @@ def extract_pending_field_value(field: str, text: str) -> dict:
     return {}
 
 
-def start_or_get_conversation(db: Session, user: User, conversation_id: int | None):
-    if conversation_id:
-        conv = db.query(Conversation).filter(
-            Conversation.id == conversation_id,
-            Conversation.user_id_fk == user.id
-        ).first()
-        if conv:
-            return conv
-
-    conv = Conversation(user_id_fk=user.id, meta={})
-    db.add(conv)
-    db.commit()
-    db.refresh(conv)
-    return conv
-
-
-def append_message(db: Session, conversation: Conversation, role: str, content: str, annotations=None):
-    msg = Message(
-        conversation_id=conversation.id,
-        role=role,
-        content=content,
-        annotations=annotations or {},
-    )
-    db.add(msg)
-    db.commit()
-    db.refresh(msg)
-    return msg
+PREVIEW_CHARS = 160
 
 
-def last_n_messages(db: Session, conversation: Conversation, n: int = 12):
-    return (
-        db.query(Message)
-        .filter(Message.conversation_id == conversation.id)
-        .order_by(Message.created_at.desc())
-        .limit(n)
-        .all()[::-1]
-    )
+def _touch_conversation(conversation: Conversation, content: str):
+    # Denormalized list fields, so listing conversations needs no COUNT/MAX
+    if conversation.id is None:
+        conversation.message_count = (conversation.message_count or 0) + 1
+    else:
+        # Incremented in the UPDATE so concurrent turns can't lose a count.
+        # A second message in the same flush builds on the staged expression.
+        # The attribute is expired after the flush; don't read it back here.
+        staged = conversation.message_count
+        base = staged if isinstance(staged, ColumnElement) else Conversation.message_count
+        conversation.message_count = base + 1
+    conversation.last_message_at = datetime.now(timezone.utc)
+    preview = " ".join((content or "").split())
+    conversation.last_message_preview = preview[:PREVIEW_CHARS] or None
 
 
 # =========================
@@ -227,60 +292,375 @@ def _extract_compound(annotations: dict) -> float | None:
         return None
 
 
-def sentiment_trend_summary(
-    db: Session,
-    user: User,
-    lookback_user_msgs: int = 18,
-    min_msgs: int = 6,
-) -> str | None:
+# =========================
+# Async variants (chat routes)
+# =========================
+# Chat-path helpers on an AsyncSession so DB I/O yields to the event loop.
+# These only *stage* changes: the caller owns the transaction (see
+# db.unit_of_work), so a whole chat turn is flushed and committed once. Relationships are used instead of FK ids so new rows can be
+# linked before anything has been flushed.
+async def get_user_async(db: AsyncSession, user_id: str) -> User | None:
+    """Existing user (cache hit attached without a SELECT); never stages one."""
+    cached = user_cache.get(user_id)
+    if cached:
+        return await db.merge(cached.to_detached_user(), load=False)
+
+    user = (
+        await db.execute(select(User).where(User.user_id == user_id))
+    ).scalars().first()
+    if user:
+        user_cache.put(user)
+    return user
+
+
+async def save_kv_memories_async(db: AsyncSession, user: User, items: dict):
+    for k, v in items.items():
+        if k not in MEMORY_KEYS:
+            continue
+        if v is None:
+            continue
+        db.add(Memory(user=user, key=k, value=str(v).strip()))
+
+
+async def update_user_profile_from_memories_async(db: AsyncSession, user: User, items: dict) -> bool:
+    return _apply_profile_items(user, items)
+
+
+async def get_conversation_async(db: AsyncSession, user: User, conversation_id: int | None) -> Conversation | None:
+    if not conversation_id or user.id is None:
+        return None
+    return (
+        await db.execute(
+            select(Conversation).where(
+                Conversation.id == conversation_id,
+                Conversation.user_id_fk == user.id,
+            )
+        )
+    ).scalars().first()
+
+
+async def start_or_get_conversation_async(db: AsyncSession, user: User, conversation_id: int | None):
+    conv = await get_conversation_async(db, user, conversation_id)
+    if conv:
+        return conv
+
+    conv = Conversation(user=user, meta={}, turn_count=0, message_count=0)
+    db.add(conv)
+    return conv
+
+
+async def next_turn_async(db: AsyncSession, conversation: Conversation) -> int:
+    """
+    Advance conversation.turn_count and return the new value. Incremented in
+    the UPDATE (not read-modify-write) so concurrent turns each get their own
+    number; runs inside the caller's transaction.
     """
-    Returns a short, gentle trend reflection based on recent USER messages.
+    if conversation.id is None:
+        conversation.turn_count = (conversation.turn_count or 0) + 1
+        return conversation.turn_count
+
+    stmt = (
+        update(Conversation)
+        .where(Conversation.id == conversation.id)
+        .values(turn_count=Conversation.turn_count + 1)
+        .execution_options(synchronize_session=False)
+    )
+    if db.get_bind().dialect.update_returning:
+        turn_no = (await db.execute(stmt.returning(Conversation.turn_count))).scalar_one()
+    else:
+        await db.execute(stmt)
+        turn_no = (
+            await db.execute(select(Conversation.turn_count).where(Conversation.id == conversation.id))
+        ).scalar_one()
+    # Keep the loaded object in step without marking it dirty
+    set_committed_value(conversation, "turn_count", turn_no)
+    return turn_no
+
+
+async def append_message_async(
+    db: AsyncSession,
+    conversation: Conversation,
+    role: str,
+    content: str,
+    annotations=None,
+    user: User | None = None,
+) -> Message:
+    compound = _extract_compound(annotations or {})
+    _touch_conversation(conversation, content)
+    msg = Message(
+        conversation=conversation,
+        role=role,
+        content=content,
+        annotations=annotations or {},
+        sentiment_compound=compound,
+    )
+    db.add(msg)
+
+    # Keep the rolling trend state current (O(1) per user message)
+    if role == "user" and user is not None and compound is not None:
+        await record_user_sentiment_async(db, user, compound)
+
+    return msg
+
 
-    Uses annotations->scores->compound (VADER-style). Example outputs:
-    - "Over the last few chats, it seems like things have felt a bit heavier."
-    - "You’ve sounded a bit lighter recently—like something is easing up."
+# Rows per query when folding a long unsummarized backlog into the summary
+HISTORY_FOLD_PAGE = 500
+
+
+async def history_window_async(
+    db: AsyncSession, conversation: Conversation | None
+) -> tuple[list, str | None, int | None]:
     """
-    # Get recent user messages across conversations for this user
+    (messages, summary, summary_through_id) for the prompt: the newest
+    persisted messages that fit settings.history_token_budget, oldest ->
+    newest. Every older message not summarized yet is folded into the
+    returned summary; when that happens summary_through_id is the last
+    folded id and the caller stores both on the conversation with the turn
+    (nothing is staged here), so each message is summarized exactly once.
+    """
+    if conversation is None or conversation.id is None:
+        return [], conversation.summary if conversation else None, None
+
+    q = select(Message).where(Message.conversation_id == conversation.id)
+    if conversation.summary_through_id:
+        q = q.where(Message.id > conversation.summary_through_id)
+
+    # A little slack over the window so the turns that just fell out of it
+    # are usually fetched here already
+    limit = settings.history_max_messages + 8
     rows = (
-        db.query(Message)
-        .join(Conversation, Conversation.id == Message.conversation_id)
-        .filter(Conversation.user_id_fk == user.id)
-        .filter(Message.role == "user")
-        .order_by(Message.created_at.desc())
-        .limit(lookback_user_msgs)
-        .all()
+        await db.execute(
+            q.order_by(Message.created_at.desc(), Message.id.desc()).limit(limit)
+        )
+    ).scalars().all()[::-1]
+
+    dropped, kept = select_window(rows, settings.history_token_budget, settings.history_max_messages)
+
+    summary = conversation.summary
+    through_id = None
+
+    def fold(messages):
+        nonlocal summary, through_id
+        summary = fold_summary(
+            summary,
+            messages,
+            max_chars=settings.history_summary_max_chars,
+            line_chars=settings.history_summary_line_chars,
+        )
+        through_id = max(m.id for m in messages)
+
+    if len(rows) == limit:
+        # More unsummarized messages may precede the fetched ones (e.g. a
+        # long conversation from before summaries existed): fold them all,
+        # oldest first, a page at a time
+        cursor = conversation.summary_through_id or 0
+        oldest_id = min(m.id for m in rows)
+        while True:
+            page = (
+                await db.execute(
+                    select(Message)
+                    .where(Message.conversation_id == conversation.id)
+                    .where(Message.id > cursor, Message.id < oldest_id)
+                    .order_by(Message.id)
+                    .limit(HISTORY_FOLD_PAGE)
+                )
+            ).scalars().all()
+            if not page:
+                break
+            fold(page)
+            cursor = page[-1].id
+            if len(page) < HISTORY_FOLD_PAGE:
+                break
+
+    if dropped:
+        fold(dropped)
+
+    return kept, summary, through_id
+
+
+async def store_summary_async(
+    db: AsyncSession,
+    conversation: Conversation,
+    summary: str | None,
+    through_id: int,
+    base_id: int | None,
+) -> bool:
+    """
+    Stage a summary fold made from the conversation's summary as of
+    summary_through_id == `base_id`. Concurrent turns can fold the same
+    backlog, so the write is a compare-and-swap on summary_through_id: if
+    another turn stored a fold first this one is dropped (its messages are
+    folded again by a later turn, never twice). Returns whether it was stored.
+    """
+    if conversation.id is None:
+        conversation.summary, conversation.summary_through_id = summary, through_id
+        return True
+
+    unchanged = (
+        Conversation.summary_through_id.is_(None)
+        if base_id is None
+        else Conversation.summary_through_id == base_id
     )
+    result = await db.execute(
+        update(Conversation)
+        .where(Conversation.id == conversation.id, unchanged)
+        .values(summary=summary, summary_through_id=through_id)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount != 1:
+        return False
+    # Keep the loaded object in step without marking it dirty
+    set_committed_value(conversation, "summary", summary)
+    set_committed_value(conversation, "summary_through_id", through_id)
+    return True
 
-    compounds: list[float] = []
-    for m in rows:
-        ann = m.annotations or {}
-        c = _extract_compound(ann)
-        if c is not None:
-            compounds.append(c)
 
-    if len(compounds) < min_msgs:
-        return None
+# Optimistic updates of a user's sentiment state before it is rebuilt from
+# their messages instead (see record_user_sentiment_async)
+SENTIMENT_CAS_ATTEMPTS = 3
 
-    # Reverse so oldest -> newest
-    compounds = compounds[::-1]
+_INSERT_IGNORE = {
+    "sqlite": sqlite.insert,
+    "postgresql": postgresql.insert,
+}
 
-    # Compare early vs late average (simple but effective)
-    mid = len(compounds) // 2
-    early = compounds[:mid]
-    late = compounds[mid:]
 
-    def avg(xs: list[float]) -> float:
-        return sum(xs) / max(len(xs), 1)
+async def _stored_rolling(db: AsyncSession, user_pk: int) -> tuple[RollingSentiment, int] | None:
+    """
+    (rolling state, version) as committed, bypassing the identity map. A
+    stored window of another length (WINDOW changed) is rebuilt from the
+    messages, keeping the version so the next write replaces it.
+    """
+    row = (
+        await db.execute(
+            select(
+                SentimentState.window,
+                SentimentState.head,
+                SentimentState.size,
+                SentimentState.early_sum,
+                SentimentState.late_sum,
+                SentimentState.version,
+            ).where(SentimentState.user_id_fk == user_pk)
+        )
+    ).first()
+    if row is None:
+        return None
+    if len(row.window or []) != WINDOW:
+        return await _rolling_from_messages(db, user_pk), row.version or 0
+    rolling = RollingSentiment(
+        WINDOW,
+        buf=row.window,
+        head=row.head or 0,
+        size=row.size or 0,
+        early_sum=row.early_sum or 0.0,
+        late_sum=row.late_sum or 0.0,
+    )
+    return rolling, row.version or 0
+
+
+async def _rolling_from_messages(db: AsyncSession, user_pk: int | None) -> RollingSentiment:
+    # The user's last WINDOW persisted message compounds, oldest first
+    rolling = RollingSentiment(WINDOW)
+    if user_pk is None:
+        return rolling
+    compounds = (
+        await db.execute(
+            select(Message.sentiment_compound)
+            .join(Conversation, Conversation.id == Message.conversation_id)
+            .where(Conversation.user_id_fk == user_pk)
+            .where(Message.role == "user")
+            .where(Message.sentiment_compound.is_not(None))
+            .order_by(Message.created_at.desc(), Message.id.desc())
+            .limit(WINDOW)
+        )
+    ).scalars().all()
+    for c in compounds[::-1]:
+        rolling.push(c)
+    return rolling
+
+
+async def _current_rolling(db: AsyncSession, user: User) -> RollingSentiment:
+    stored = await _stored_rolling(db, user.id) if user.id is not None else None
+    if stored is not None:
+        return stored[0]
+    # No state yet: seed from history (stored by the next recorded message)
+    return await _rolling_from_messages(db, user.id)
+
+
+def _rolling_values(rolling: RollingSentiment) -> dict:
+    return {
+        "window": list(rolling.buf),
+        "head": rolling.head,
+        "size": rolling.size,
+        "early_sum": rolling.early_sum,
+        "late_sum": rolling.late_sum,
+    }
 
-    early_avg = avg(early)
-    late_avg = avg(late)
-    delta = late_avg - early_avg
 
-    # Thresholds tuned to avoid over-claiming
-    if delta <= -0.12:
-        return "Over the last few chats, it seems like things have felt a bit heavier for you."
-    if delta >= 0.12:
-        return "Lately, you’ve sounded a little lighter—like something might be easing up, even if it’s subtle."
+async def record_user_sentiment_async(db: AsyncSession, user: User, compound: float):
+    """
+    Push `compound` onto the user's rolling state. Concurrent turns for one
+    user race on the same row, so the write is a compare-and-swap on
+    `version`; after SENTIMENT_CAS_ATTEMPTS lost races the window is rebuilt
+    from the user's messages. Runs inside the turn's transaction (the
+    current message is staged, not flushed, so it is never counted twice).
+    """
+    if user.id is None:
+        # New user: no other turn can have a state for it yet
+        rolling = RollingSentiment(WINDOW)
+        rolling.push(compound)
+        db.add(SentimentState(user=user, version=1, **_rolling_values(rolling)))
+        return
+
+    for _ in range(SENTIMENT_CAS_ATTEMPTS):
+        stored = await _stored_rolling(db, user.id)
+        if stored is None:
+            rolling = await _rolling_from_messages(db, user.id)
+            rolling.push(compound)
+            insert_ = _INSERT_IGNORE.get(db.get_bind().dialect.name)
+            if insert_ is None:
+                db.add(SentimentState(user_id_fk=user.id, version=1, **_rolling_values(rolling)))
+                return
+            result = await db.execute(
+                insert_(SentimentState)
+                .values(user_id_fk=user.id, version=1, **_rolling_values(rolling))
+                .on_conflict_do_nothing()
+            )
+        else:
+            rolling, version = stored
+            rolling.push(compound)
+            result = await db.execute(
+                update(SentimentState)
+                .where(SentimentState.user_id_fk == user.id, SentimentState.version == version)
+                .values(version=version + 1, **_rolling_values(rolling))
+            )
+        if result.rowcount == 1:
+            return
+
+    # Still contended: the messages are the source of truth
+    rolling = await _rolling_from_messages(db, user.id)
+    rolling.push(compound)
+    await db.execute(
+        update(SentimentState)
+        .where(SentimentState.user_id_fk == user.id)
+        .values(version=SentimentState.version + 1, **_rolling_values(rolling))
+    )
 
-    # If no clear trend, avoid saying anything
-    return None
+
+async def sentiment_trend_summary_async(
+    db: AsyncSession,
+    user: User,
+    min_msgs: int = 6,
+    pending: dict | None = None,
+) -> str | None:
+    """
+    Gentle trend reflection from the rolling per-user state that
+    append_message_async maintains (no history query). Covers the last
+    WINDOW user messages, plus `pending` (annotations of a user message not
+    appended yet) without touching the stored state.
+    """
+    rolling = await _current_rolling(db, user)
+    compound = _extract_compound(pending or {})
+    if compound is not None:
+        rolling.push(compound)
+    return rolling.summary(min_msgs)
@@ -0,0 +1,97 @@
+# Daily mood rollup: (user, day, mood) -> count, sum_sentiment, sentiment_count.
+#
+# Writers add their moods here in the same transaction as the Mood rows, so
+# summaries read one row per (day, mood) instead of scanning every log entry.
+# Increments are applied with a single INSERT .. ON CONFLICT DO UPDATE on
+# SQLite and Postgres, which is safe under concurrent writers. The days
+# touched are also marked dirty for the cohort cube (services/cohort.py).
+from datetime import date
+
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from ..models import MoodDaily
+from .cohort import mark_cohort_dirty
+
+_UPSERT_INSERTS = {
+    "sqlite": sqlite.insert,
+    "postgresql": postgresql.insert,
+}
+
+
+def aggregate_moods(rows) -> list[dict]:
+    """
+    Collapse (user_pk, day, mood, sentiment_score | None) tuples into one
+    increment per rollup key.
+    """
+    acc: dict[tuple[int, date, str], list] = {}
+    for user_pk, day, mood, score in rows:
+        inc = acc.setdefault((user_pk, day, mood), [0, 0.0, 0])
+        inc[0] += 1
+        if score is not None:
+            inc[1] += float(score)
+            inc[2] += 1
+    return [
+        {
+            "user_id_fk": user_pk,
+            "day": day,
+            "mood": mood,
+            "count": n,
+            "sum_sentiment": total,
+            "sentiment_count": scored,
+        }
+        for (user_pk, day, mood), (n, total, scored) in acc.items()
+    ]
+
+
+def add_to_mood_daily(db: Session, rows) -> int:
+    """
+    Stage rollup increments for newly written moods (see aggregate_moods for
+    the row shape). Commit with the Mood rows. Returns rollup keys touched.
+    """
+    values = aggregate_moods(rows)
+    if not values:
+        return 0
+    mark_cohort_dirty(db, (v["day"] for v in values))
+
+    insert = _UPSERT_INSERTS.get(db.get_bind().dialect.name)
+    if insert is None:
+        _add_one_by_one(db, values)
+        return len(values)
+
+    # One parameterized statement run executemany-style: compiled once and
+    # cached, unlike a multi-row VALUES clause
+    table = MoodDaily.__table__
+    stmt = insert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.user_id_fk, table.c.day, table.c.mood],
+        set_={
+            "count": table.c.count + stmt.excluded["count"],
+            "sum_sentiment": table.c.sum_sentiment + stmt.excluded["sum_sentiment"],
+            "sentiment_count": table.c.sentiment_count + stmt.excluded["sentiment_count"],
+        },
+    )
+    db.execute(stmt, values)
+    return len(values)
+
+
+def _add_one_by_one(db: Session, values: list[dict]):
+    # Dialects without ON CONFLICT: read-modify-write under the row lock
+    for v in values:
+        row = db.execute(
+            select(MoodDaily)
+            .where(
+                MoodDaily.user_id_fk == v["user_id_fk"],
+                MoodDaily.day == v["day"],
+                MoodDaily.mood == v["mood"],
+            )
+            .with_for_update()
+        ).scalar_one_or_none()
+        if row is None:
+            db.add(MoodDaily(**v))
+        else:
+            row.count += v["count"]
+            row.sum_sentiment += v["sum_sentiment"]
+            row.sentiment_count += v["sentiment_count"]
+    db.flush()
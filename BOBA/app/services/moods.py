@@ -0,0 +1,204 @@
+# Mood categories and streaming bulk import.
+#
+# import_moods() consumes an iterator of text lines (NDJSON or CSV with a
+# header), validates each record, resolves user ids in batches and inserts in
+# chunks: one executemany INSERT + rollup upsert + commit per chunk. Bad
+# lines are reported and skipped; they never abort the import.
+import csv
+import json
+from dataclasses import dataclass, field
+from datetime import date, datetime, time, timezone
+from typing import Callable, Iterable, Iterator
+
+from sqlalchemy import insert, select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from ..db import SessionLocal
+from ..models import Mood, User
+from .mood_rollup import add_to_mood_daily
+
+VALID_MOODS = {"happy", "sad", "anxious", "stressed", "tired", "neutral", "angry"}
+
+IMPORT_FORMATS = ("ndjson", "csv")
+
+# Keep the report bounded however broken the input is
+MAX_REPORTED_ERRORS = 1000
+
+
+@dataclass
+class ImportReport:
+    lines: int = 0
+    imported: int = 0
+    failed: int = 0
+    errors: list[dict] = field(default_factory=list)
+
+    def error(self, line: int, message: str):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "error": message})
+
+    def as_dict(self) -> dict:
+        return {
+            "lines": self.lines,
+            "imported": self.imported,
+            "failed": self.failed,
+            # Unknown users are found when a chunk is flushed, after later
+            # lines may already have failed validation
+            "errors": sorted(self.errors, key=lambda e: e["line"]),
+            "errors_truncated": self.failed > len(self.errors),
+        }
+
+
+def _records(lines: Iterable[str], fmt: str) -> Iterator[tuple[int, dict | None, str | None]]:
+    """(line_no, record, error) per input record."""
+    if fmt == "csv":
+        reader = csv.DictReader(lines)
+        for row in reader:
+            if None in row:
+                yield reader.line_num, None, "too many columns"
+            else:
+                yield reader.line_num, row, None
+        return
+
+    for line_no, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            rec = json.loads(line)
+        except ValueError as e:
+            yield line_no, None, f"invalid JSON: {e}"
+            continue
+        if not isinstance(rec, dict):
+            yield line_no, None, "expected a JSON object"
+            continue
+        yield line_no, rec, None
+
+
+def _parse_created_at(value) -> datetime:
+    dt = datetime.fromisoformat(str(value).strip())
+    # Naive timestamps are taken as UTC
+    return dt.replace(tzinfo=timezone.utc) if dt.tzinfo is None else dt.astimezone(timezone.utc)
+
+
+def _validate(rec: dict) -> dict:
+    user_id = str(rec.get("user_id") or "").strip()
+    if not user_id:
+        raise ValueError("missing user_id")
+
+    mood = str(rec.get("mood") or "").lower().strip()
+    if mood not in VALID_MOODS:
+        raise ValueError(f"invalid mood '{rec.get('mood')}'")
+
+    created_at = rec.get("created_at") or None
+    day = rec.get("day") or None
+    try:
+        created_at = _parse_created_at(created_at) if created_at else None
+        day = date.fromisoformat(str(day).strip()) if day else None
+    except ValueError as e:
+        raise ValueError(f"invalid date: {e}") from None
+    if created_at is None and day is None:
+        raise ValueError("need created_at or day")
+    if day is None:
+        day = created_at.date()
+    if created_at is None:
+        created_at = datetime.combine(day, time.min, tzinfo=timezone.utc)
+
+    score = rec.get("sentiment_score")
+    if score in (None, ""):
+        score = None
+    else:
+        try:
+            score = float(score)
+        except (TypeError, ValueError):
+            raise ValueError(f"invalid sentiment_score '{score}'") from None
+        if not -1.0 <= score <= 1.0:
+            raise ValueError("sentiment_score must be within [-1, 1]")
+
+    return {
+        "user_id": user_id,
+        "mood": mood,
+        "note": (str(rec["note"]) if rec.get("note") else None),
+        "sentiment_score": score,
+        "day": day,
+        "created_at": created_at,
+    }
+
+
+def _resolve_users(db: Session, user_ids: set[str], known: dict[str, int | None]):
+    missing = [u for u in user_ids if u not in known]
+    for i in range(0, len(missing), 5000):
+        chunk = missing[i:i + 5000]
+        found = dict(db.execute(select(User.user_id, User.id).where(User.user_id.in_(chunk))).all())
+        for u in chunk:
+            known[u] = found.get(u)
+
+
+def _flush_chunk(db: Session, chunk: list[tuple[int, dict]], known: dict[str, int | None], report: ImportReport):
+    _resolve_users(db, {v["user_id"] for _, v in chunk}, known)
+
+    rows, line_nos = [], []
+    for line_no, v in chunk:
+        user_pk = known.get(v["user_id"])
+        if user_pk is None:
+            report.error(line_no, f"unknown user_id '{v['user_id']}'")
+            continue
+        rows.append({
+            "user_id_fk": user_pk,
+            "mood": v["mood"],
+            "note": v["note"],
+            "sentiment_score": v["sentiment_score"],
+            "day": v["day"],
+            "created_at": v["created_at"],
+        })
+        line_nos.append(line_no)
+
+    if not rows:
+        return
+    try:
+        db.execute(insert(Mood), rows)
+        add_to_mood_daily(db, [(r["user_id_fk"], r["day"], r["mood"], r["sentiment_score"]) for r in rows])
+        db.commit()
+    except SQLAlchemyError as e:
+        db.rollback()
+        message = f"chunk not imported: {e.__class__.__name__}"
+        for line_no in line_nos:
+            report.error(line_no, message)
+        return
+    report.imported += len(rows)
+
+
+def import_moods(
+    lines: Iterable[str],
+    fmt: str = "ndjson",
+    chunk_size: int = 1000,
+    session_factory: Callable[[], Session] = SessionLocal,
+) -> ImportReport:
+    """
+    Blocking; run it in a worker thread from async code. `lines` may be a
+    lazy stream, it is consumed once.
+    """
+    if fmt not in IMPORT_FORMATS:
+        raise ValueError(f"unknown format '{fmt}'")
+
+    report = ImportReport()
+    known: dict[str, int | None] = {}
+    chunk: list[tuple[int, dict]] = []
+
+    with session_factory() as db:
+        for line_no, rec, err in _records(lines, fmt):
+            report.lines = line_no
+            if err is None:
+                try:
+                    chunk.append((line_no, _validate(rec)))
+                except ValueError as e:
+                    err = str(e)
+            if err is not None:
+                report.error(line_no, err)
+            if len(chunk) >= chunk_size:
+                _flush_chunk(db, chunk, known, report)
+                chunk = []
+        if chunk:
+            _flush_chunk(db, chunk, known, report)
+
+    return report
@@ -0,0 +1,164 @@
+# Token-bucket rate limiting for the chat endpoints.
+#
+# Each key gets a bucket of `capacity` tokens refilled at capacity/window per
+# second, so the long-run rate is `capacity` requests per window with bursts
+# up to `capacity`. Buckets live in a pluggable backend:
+#   memory  - per process, bounded by LRU + idle TTL eviction
+#   sqlite  - a shared SQLite file, so every uvicorn worker on the host
+#             draws from the same bucket (the limit isn't multiplied by N)
+# Keyed by client IP, or by user_id (RATE_LIMIT_KEY=user). user_id is
+# client-supplied, so in user mode each request also draws from a looser
+# per-IP bucket: rotating ids doesn't get around that one.
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import anyio
+
+
+def _refill(tokens: float, last: float, now: float, capacity: float, rate: float) -> float:
+    return min(capacity, tokens + max(0.0, now - last) * rate)
+
+
+def _take(tokens: float, rate: float) -> tuple[bool, float, float]:
+    """(allowed, tokens_left, retry_after_sec)"""
+    if tokens >= 1.0:
+        return True, tokens - 1.0, 0.0
+    return False, tokens, (1.0 - tokens) / rate
+
+
+class MemoryBackend:
+    blocking = False
+
+    def __init__(self, max_keys: int = 10000, ttl_sec: float = 600.0):
+        self.max_keys = max_keys
+        self.ttl_sec = ttl_sec
+        self._lock = threading.Lock()
+        # key -> (tokens, last_seen), least recently used first
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+
+    def hit(self, key: str, capacity: float, rate: float, now: float) -> tuple[bool, float]:
+        with self._lock:
+            tokens, last = self._buckets.pop(key, (capacity, now))
+            allowed, tokens, retry_after = _take(_refill(tokens, last, now, capacity, rate), rate)
+            self._buckets[key] = (tokens, now)
+            self._evict(now)
+            return allowed, retry_after
+
+    def _evict(self, now: float):
+        # Idle keys sit at the front; a full bucket carries no state anyway
+        while self._buckets:
+            _, (_, last) = next(iter(self._buckets.items()))
+            if now - last <= self.ttl_sec and len(self._buckets) <= self.max_keys:
+                break
+            self._buckets.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class SQLiteBackend:
+    blocking = True
+
+    _SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS rate_buckets ("
+        " key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL)"
+    )
+
+    def __init__(self, path: str, ttl_sec: float = 600.0, sweep_every: int = 1000):
+        self.path = path
+        self.ttl_sec = ttl_sec
+        self.sweep_every = sweep_every
+        self._local = threading.local()
+        self._calls = 0
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(self._SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            parent = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(parent, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def hit(self, key: str, capacity: float, rate: float, now: float) -> tuple[bool, float]:
+        conn = self._connect()
+        # IMMEDIATE takes the write lock up front: read-modify-write is atomic
+        # across processes
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT tokens, updated_at FROM rate_buckets WHERE key = ?", (key,)).fetchone()
+            tokens, last = row if row else (capacity, now)
+            allowed, tokens, retry_after = _take(_refill(tokens, last, now, capacity, rate), rate)
+            conn.execute(
+                "INSERT INTO rate_buckets (key, tokens, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET tokens = excluded.tokens, updated_at = excluded.updated_at",
+                (key, tokens, now),
+            )
+
+            self._calls += 1
+            if self._calls % self.sweep_every == 0:
+                conn.execute("DELETE FROM rate_buckets WHERE updated_at < ?", (now - self.ttl_sec,))
+
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return allowed, retry_after
+
+
+class RateLimiter:
+    def __init__(self, backend, max_requests: int, window_sec: float):
+        self.backend = backend
+        self.capacity = float(max_requests)
+        self.rate = max_requests / window_sec
+
+    async def hit(self, key: str) -> tuple[bool, float]:
+        """Take one token for `key`. Returns (allowed, retry_after_sec)."""
+        now = time.time()
+        if self.backend.blocking:
+            return await anyio.to_thread.run_sync(self.backend.hit, key, self.capacity, self.rate, now)
+        return self.backend.hit(key, self.capacity, self.rate, now)
+
+
+class ChatRateLimiter:
+    """
+    The chat limit: one bucket per IP, or per user_id plus a per-IP bucket
+    for all the ids seen from that IP (`ip_limiter`). Without a user_id a
+    request is charged to its IP at the per-user rate.
+    """
+
+    def __init__(self, limiter: RateLimiter, ip_limiter: RateLimiter | None = None):
+        self.limiter = limiter
+        self.ip_limiter = ip_limiter
+
+    async def hit(self, ip: str, user_id: str | None = None) -> tuple[bool, float]:
+        """Returns (allowed, retry_after_sec); denied if any bucket is empty."""
+        if self.ip_limiter is None or not user_id:
+            return await self.limiter.hit(f"ip:{ip}")
+        results = [
+            await self.limiter.hit(f"user:{user_id}"),
+            await self.ip_limiter.hit(f"ip-users:{ip}"),
+        ]
+        denied = [retry_after for allowed, retry_after in results if not allowed]
+        return (False, max(denied)) if denied else (True, 0.0)
+
+
+def build_rate_limiter(settings) -> ChatRateLimiter:
+    # Buckets idle for a few windows are full again; no need to keep them
+    ttl = max(settings.rate_limit_window_sec * 2, 60.0)
+    if settings.rate_limit_backend == "sqlite":
+        backend = SQLiteBackend(settings.rate_limit_sqlite_path, ttl_sec=ttl)
+    else:
+        backend = MemoryBackend(max_keys=settings.rate_limit_max_keys, ttl_sec=ttl)
+    limiter = RateLimiter(backend, settings.rate_limit_max_requests, settings.rate_limit_window_sec)
+    if settings.rate_limit_key != "user":
+        return ChatRateLimiter(limiter)
+    ip_limiter = RateLimiter(backend, settings.rate_limit_ip_max_requests, settings.rate_limit_window_sec)
+    return ChatRateLimiter(limiter, ip_limiter)
@@ -0,0 +1,250 @@
+# Per-provider protection for LLM calls so a provider brownout degrades to the
+# rule-based reply instead of piling up requests:
+#   - a concurrency cap with a bounded wait queue (callers past the queue, or
+#     waiting longer than queue_timeout_sec, are rejected immediately)
+#   - a circuit breaker over the last `window` calls that opens when the error
+#     rate or the slow-call rate crosses its threshold, rejects everything for
+#     open_sec, then lets a single probe through (half-open) to decide whether
+#     to close again
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+
+from ..settings import settings
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class ProviderUnavailable(Exception):
+    """The provider is rejecting calls (breaker open or wait queue full)."""
+
+    def __init__(self, provider: str, reason: str):
+        super().__init__(f"{provider}: {reason}")
+        self.provider = provider
+        self.reason = reason
+
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        window: int,
+        min_calls: int,
+        error_rate: float,
+        slow_call_sec: float,
+        slow_rate: float,
+        open_sec: float,
+    ):
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.slow_call_sec = slow_call_sec
+        self.slow_rate = slow_rate
+        self.open_sec = open_sec
+        # (failed, slow) per recent call
+        self._calls: deque[tuple[bool, bool]] = deque(maxlen=max(1, window))
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.trips = 0
+        self._probing = False
+
+    def allow(self, now: float) -> bool:
+        if self.state == OPEN:
+            if now - self.opened_at < self.open_sec:
+                return False
+            self.state = HALF_OPEN
+        if self.state == HALF_OPEN:
+            if self._probing:
+                return False
+            self._probing = True
+        return True
+
+    def release_probe(self):
+        """Give up a half-open probe slot without a result (the call never ran)."""
+        self._probing = False
+
+    def record(self, failed: bool, latency: float, now: float, cancelled: bool = False):
+        slow = latency >= self.slow_call_sec
+        if self.state == HALF_OPEN:
+            self._probing = False
+            if cancelled and not slow:
+                # Inconclusive probe; the next call probes again
+                return
+            if failed or slow:
+                self._open(now)
+            else:
+                self.state = CLOSED
+                self._calls.clear()
+            return
+
+        self._calls.append((failed, slow))
+        if len(self._calls) < self.min_calls:
+            return
+        n = len(self._calls)
+        errors = sum(1 for f, _ in self._calls if f)
+        slows = sum(1 for _, s in self._calls if s)
+        if errors / n >= self.error_rate or slows / n >= self.slow_rate:
+            self._open(now)
+
+    def _open(self, now: float):
+        self.state = OPEN
+        self.opened_at = now
+        self.trips += 1
+        self._calls.clear()
+
+    def snapshot(self, now: float) -> dict:
+        n = len(self._calls)
+        return {
+            "state": self.state,
+            "trips": self.trips,
+            "window_calls": n,
+            "window_error_rate": round(sum(1 for f, _ in self._calls if f) / n, 3) if n else 0.0,
+            "window_slow_rate": round(sum(1 for _, s in self._calls if s) / n, 3) if n else 0.0,
+            "open_for_sec": round(max(0.0, self.open_sec - (now - self.opened_at)), 1)
+            if self.state == OPEN else 0.0,
+        }
+
+
+class ProviderCall:
+    """Handle for one guarded call (what ProviderGuard.call() yields)."""
+
+    def __init__(self):
+        self.abandoned = False
+
+    def abandon(self):
+        """
+        The caller stopped waiting (hedge deadline) but leaves the block
+        normally, e.g. a stream that never produced its first token. Recorded
+        like a cancellation, never as a success.
+        """
+        self.abandoned = True
+
+
+class ProviderGuard:
+    def __init__(self, name: str, max_concurrency: int, max_queue: int, queue_timeout_sec: float, breaker: CircuitBreaker):
+        self.name = name
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout_sec = queue_timeout_sec
+        self.breaker = breaker
+        self._sem = asyncio.Semaphore(self.max_concurrency)
+        self.active = 0
+        self.waiting = 0
+        self.counters = {
+            "calls": 0,
+            "succeeded": 0,
+            "failed": 0,
+            "cancelled": 0,
+            "hedged": 0,
+            "rejected_open": 0,
+            "rejected_queue": 0,
+        }
+
+    async def _acquire(self):
+        if self._sem.locked():
+            if self.waiting >= self.max_queue:
+                self.counters["rejected_queue"] += 1
+                raise ProviderUnavailable(self.name, "queue_full")
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self._sem.acquire(), self.queue_timeout_sec)
+            except asyncio.TimeoutError:
+                self.counters["rejected_queue"] += 1
+                raise ProviderUnavailable(self.name, "queue_timeout") from None
+            finally:
+                self.waiting -= 1
+        else:
+            await self._sem.acquire()
+
+    @asynccontextmanager
+    async def call(self):
+        """
+        Slot for one provider call. Exceptions raised inside count as
+        failures; cancellation (hedge deadline, client gone) or an abandoned
+        call does not, but its latency still feeds the slow-call rate.
+        """
+        if not self.breaker.allow(time.monotonic()):
+            self.counters["rejected_open"] += 1
+            raise ProviderUnavailable(self.name, "circuit_open")
+        try:
+            await self._acquire()
+        except BaseException:
+            # Don't leave a half-open probe stuck
+            self.breaker.release_probe()
+            raise
+
+        self.active += 1
+        self.counters["calls"] += 1
+        start = time.monotonic()
+        failed = cancelled = False
+        call = ProviderCall()
+        try:
+            yield call
+            if call.abandoned:
+                cancelled = True
+                self.counters["cancelled"] += 1
+            else:
+                self.counters["succeeded"] += 1
+        except Exception:
+            failed = True
+            self.counters["failed"] += 1
+            raise
+        except BaseException:
+            cancelled = True
+            self.counters["cancelled"] += 1
+            raise
+        finally:
+            self.active -= 1
+            self._sem.release()
+            now = time.monotonic()
+            self.breaker.record(failed, now - start, now, cancelled=cancelled)
+
+    def note_hedged(self):
+        self.counters["hedged"] += 1
+
+    def snapshot(self) -> dict:
+        return {
+            "active": self.active,
+            "waiting": self.waiting,
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "breaker": self.breaker.snapshot(time.monotonic()),
+            **self.counters,
+        }
+
+
+_guards: dict[str, ProviderGuard] = {}
+
+
+def provider_guard(provider: str) -> ProviderGuard:
+    guard = _guards.get(provider)
+    if guard is None:
+        guard = _guards[provider] = ProviderGuard(
+            provider,
+            max_concurrency=settings.llm_max_concurrency,
+            max_queue=settings.llm_max_queue,
+            queue_timeout_sec=settings.llm_queue_timeout_sec,
+            breaker=CircuitBreaker(
+                window=settings.llm_breaker_window,
+                min_calls=settings.llm_breaker_min_calls,
+                error_rate=settings.llm_breaker_error_rate,
+                slow_call_sec=settings.llm_breaker_slow_call_sec,
+                slow_rate=settings.llm_breaker_slow_rate,
+                open_sec=settings.llm_breaker_open_sec,
+            ),
+        )
+    return guard
+
+
+def hedge_deadline() -> float | None:
+    """Seconds to wait for the provider before answering rule-based; None = off."""
+    ms = settings.llm_hedge_ms
+    return ms / 1000.0 if ms > 0 else None
+
+
+def providers_snapshot() -> dict:
+    return {
+        "hedge_ms": settings.llm_hedge_ms,
+        "providers": {name: guard.snapshot() for name, guard in _guards.items()},
+    }
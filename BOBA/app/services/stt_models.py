@@ -0,0 +1,80 @@
+# STT model registry: each engine/model is loaded once per process and
+# shared by all requests. Loading Whisper/Vosk costs seconds, so it must not
+# happen on the request path.
+import threading
+from contextlib import contextmanager
+from typing import Iterator
+
+from ..settings import settings
+
+_load_lock = threading.Lock()
+_models: dict[tuple, object] = {}
+_slots: dict[tuple, threading.BoundedSemaphore] = {}
+
+
+def _whisper_key() -> tuple:
+    return ("whisper", settings.whisper_model_size, settings.whisper_device, settings.whisper_compute_type)
+
+
+def _vosk_key() -> tuple:
+    return ("vosk", settings.vosk_model_path)
+
+
+def _load_whisper():
+    from faster_whisper import WhisperModel
+    return WhisperModel(
+        settings.whisper_model_size,
+        device=settings.whisper_device,
+        compute_type=settings.whisper_compute_type,
+    )
+
+
+def _load_vosk():
+    from vosk import Model
+    return Model(settings.vosk_model_path)
+
+
+def _get(key: tuple, loader):
+    model = _models.get(key)
+    if model is None:
+        with _load_lock:
+            model = _models.get(key)
+            if model is None:
+                model = loader()
+                _slots[key] = threading.BoundedSemaphore(max(1, settings.stt_max_concurrency))
+                _models[key] = model
+    return model
+
+
+def _resolve(engine: str) -> tuple[tuple, object]:
+    if engine == "vosk":
+        return _vosk_key(), _load_vosk
+    return _whisper_key(), _load_whisper
+
+
+def get_model(engine: str = "whisper"):
+    key, loader = _resolve(engine)
+    return _get(key, loader)
+
+
+@contextmanager
+def use_model(engine: str = "whisper") -> Iterator[object]:
+    """
+    Borrow the shared model for `engine`. At most `stt_max_concurrency`
+    callers use one model at a time; extra callers wait for a slot.
+    """
+    key, loader = _resolve(engine)
+    model = _get(key, loader)
+    with _slots[key]:
+        yield model
+
+
+def warmup(engines: str | None = None) -> list[str]:
+    """Load the configured engines up front (STT_WARMUP). Returns what was loaded."""
+    names = [e.strip().lower() for e in (engines if engines is not None else settings.stt_warmup).split(",")]
+    loaded = []
+    for name in names:
+        if name in {"whisper", "vosk"}:
+            get_model(name)
+            loaded.append(name)
+    return loaded
@@ -0,0 +1,91 @@
+# Rolling per-user sentiment state for the emotional trend reflection.
+# Holds the last WINDOW user-message compounds in a ring buffer plus running
+# sums of the early/late halves, so each new message is O(1) and the
+# reflection needs no history query.
+
+WINDOW = 18
+HEAVIER = "Over the last few chats, it seems like things have felt a bit heavier for you."
+LIGHTER = "Lately, you’ve sounded a little lighter—like something might be easing up, even if it’s subtle."
+
+
+def reflection(early_avg: float, late_avg: float) -> str | None:
+    delta = late_avg - early_avg
+
+    # Thresholds tuned to avoid over-claiming
+    if delta <= -0.12:
+        return HEAVIER
+    if delta >= 0.12:
+        return LIGHTER
+
+    # If no clear trend, avoid saying anything
+    return None
+
+
+class RollingSentiment:
+    """
+    Oldest -> newest compounds, split like the old query did:
+    early = first len // 2, late = the rest.
+    """
+
+    def __init__(
+        self,
+        capacity: int = WINDOW,
+        buf: list[float] | None = None,
+        head: int = 0,
+        size: int = 0,
+        early_sum: float = 0.0,
+        late_sum: float = 0.0,
+    ):
+        self.capacity = max(2, capacity)
+        if not buf or len(buf) != self.capacity:
+            # No usable buffer: start empty rather than trust size/sums
+            buf, head, size, early_sum, late_sum = None, 0, 0, 0.0, 0.0
+        self.buf = list(buf) if buf else [0.0] * self.capacity
+        self.head = head % self.capacity  # index of the oldest value
+        self.size = min(size, self.capacity)
+        self.early_sum = early_sum
+        self.late_sum = late_sum
+
+    def _at(self, i: int) -> float:
+        return self.buf[(self.head + i) % self.capacity]
+
+    def push(self, compound: float):
+        c = float(compound)
+        n = self.size
+        mid = n // 2
+
+        if n == self.capacity:
+            # Oldest drops out of early; the first late value becomes early
+            moved = self._at(mid)
+            self.early_sum += moved - self._at(0)
+            self.late_sum += c - moved
+            self.buf[self.head] = c
+            self.head = (self.head + 1) % self.capacity
+            if self.head == 0:
+                self._resum()  # shed float drift once per lap
+            return
+
+        if (n + 1) // 2 > mid:
+            moved = self._at(mid)
+            self.early_sum += moved
+            self.late_sum += c - moved
+        else:
+            self.late_sum += c
+        self.buf[(self.head + n) % self.capacity] = c
+        self.size = n + 1
+
+    def _resum(self):
+        mid = self.size // 2
+        self.early_sum = sum(self._at(i) for i in range(mid))
+        self.late_sum = sum(self._at(i) for i in range(mid, self.size))
+
+    def values(self) -> list[float]:
+        return [self._at(i) for i in range(self.size)]
+
+    def summary(self, min_msgs: int = 6) -> str | None:
+        if self.size < min_msgs:
+            return None
+        mid = self.size // 2
+        early_avg = self.early_sum / max(mid, 1)
+        late_avg = self.late_sum / max(self.size - mid, 1)
+        return reflection(early_avg, late_avg)
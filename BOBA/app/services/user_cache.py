@@ -0,0 +1,89 @@
+# In-process cache of user_id -> (pk, profile, last_seen).
+#
+# Almost every request starts with a User lookup by user_id; for active users
+# this serves it from memory. Writers keep it current (write-through) by
+# calling put() after they commit. Entries expire after a TTL so changes made
+# by other worker processes show up within that bound.
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+
+from sqlalchemy.orm import make_transient_to_detached
+
+from ..models import User
+from ..settings import settings
+
+PROFILE_FIELDS = ("name", "nickname", "age", "hobbies", "diagnosis")
+
+
+@dataclass(frozen=True)
+class CachedUser:
+    pk: int
+    user_id: str
+    profile: dict
+    last_seen: datetime | None
+
+    def to_detached_user(self) -> User:
+        """
+        A detached User carrying the cached columns, for Session.merge(load=False):
+        attach without a SELECT; only columns changed afterwards are UPDATEd.
+        """
+        user = User(id=self.pk, user_id=self.user_id, last_seen=self.last_seen, **self.profile)
+        make_transient_to_detached(user)
+        return user
+
+    def as_user_out(self) -> dict:
+        return {"id": self.pk, "user_id": self.user_id, "last_seen": self.last_seen, **self.profile}
+
+
+class UserCache:
+    def __init__(self, max_entries: int = 10000, ttl_sec: float = 120.0):
+        self.max_entries = max_entries
+        self.ttl_sec = ttl_sec
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, tuple[float, CachedUser]] = OrderedDict()
+
+    def get(self, user_id: str) -> CachedUser | None:
+        with self._lock:
+            item = self._entries.get(user_id)
+            if item is None:
+                return None
+            expires, cached = item
+            if expires < time.monotonic():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return cached
+
+    def put(self, user: User) -> CachedUser | None:
+        """Cache (or refresh) from a committed User row."""
+        if user is None or user.id is None:
+            return None
+        cached = CachedUser(
+            pk=user.id,
+            user_id=user.user_id,
+            profile={f: getattr(user, f) for f in PROFILE_FIELDS},
+            last_seen=user.last_seen,
+        )
+        with self._lock:
+            self._entries[cached.user_id] = (time.monotonic() + self.ttl_sec, cached)
+            self._entries.move_to_end(cached.user_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return cached
+
+    def invalidate(self, user_id: str):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+user_cache = UserCache(
+    max_entries=settings.user_cache_max_entries,
+    ttl_sec=settings.user_cache_ttl_sec,
+)
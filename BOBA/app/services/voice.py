@@ -1,51 +1,94 @@
 # Voice analysis: STT (Whisper or Vosk) + basic prosody via librosa.
+# Uploads are decoded once to a mono 16 kHz float32 buffer which is then
+# shared (not copied/re-decoded) by STT and prosody.
 from pydub import AudioSegment
 import numpy as np
 import librosa
 import io
-from faster_whisper import WhisperModel
+import json
+
+from .stt_models import get_model, use_model
+
+SAMPLE_RATE = 16000
 
 class STTResult(dict):
     text: str
 
-def convert_to_wav_bytes(file_bytes: bytes, mime_type: str) -> bytes:
+def decode_audio(file_bytes: bytes, mime_type: str) -> np.ndarray:
+    """Decode an upload (any ffmpeg format) to mono 16 kHz float32 in [-1, 1]."""
     audio = AudioSegment.from_file(io.BytesIO(file_bytes), format=mime_type.split("/")[-1])
-    buf = io.BytesIO()
-    audio.set_channels(1).set_frame_rate(16000).export(buf, format="wav")
-    return buf.getvalue()
+    audio = audio.set_channels(1).set_frame_rate(SAMPLE_RATE).set_sample_width(2)
+    samples = np.frombuffer(audio.raw_data, dtype=np.int16).astype(np.float32)
+    samples *= 1.0 / 32768.0
+    return samples
 
-def transcribe_bytes(wav_bytes: bytes, engine: str = "whisper") -> STTResult:
+def _to_pcm16(samples: np.ndarray) -> bytes:
+    return (np.clip(samples, -1.0, 1.0) * 32767.0).astype(np.int16).tobytes()
+
+def transcribe_samples(samples: np.ndarray, engine: str = "whisper") -> STTResult:
     try:
         if engine == "vosk":
-            from vosk import Model, KaldiRecognizer
-            import json, wave
-            # Expecting a local Vosk model at ./models/vosk (change path if needed)
-            model = Model("models/vosk")
-            wf = wave.open(io.BytesIO(wav_bytes), "rb")
-            rec = KaldiRecognizer(model, wf.getframerate())
-            res_text = []
-            while True:
-                data = wf.readframes(4000)
-                if len(data) == 0:
-                    break
-                if rec.AcceptWaveform(data):
-                    pass
-            final = rec.FinalResult()
+            from vosk import KaldiRecognizer
+            # Vosk wants 16-bit PCM; feed it in slices of one buffer
+            pcm = memoryview(_to_pcm16(samples))
+            with use_model("vosk") as model:
+                rec = KaldiRecognizer(model, SAMPLE_RATE)
+                for i in range(0, len(pcm), 8000):
+                    rec.AcceptWaveform(bytes(pcm[i:i + 8000]))
+                final = rec.FinalResult()
             res = json.loads(final)
             return {"text": res.get("text", "").strip()}
         else:
-            from faster_whisper import WhisperModel
-            model = WhisperModel("tiny", device="cpu", compute_type="int8")
-            y, sr = librosa.load(io.BytesIO(wav_bytes), sr=16000)
-            segments, _ = model.transcribe(y, language="en")
-            text = " ".join([seg.text for seg in segments])
+            with use_model("whisper") as model:
+                segments, _ = model.transcribe(samples, language="en")
+                # segments is lazy; decoding happens while iterating
+                text = " ".join([seg.text for seg in segments])
             return {"text": text.strip()}
     except Exception as e:
         return {"text": "", "error": str(e)}
 
-def prosody_features(wav_bytes: bytes) -> dict:
+class StreamingRecognizer:
+    """
+    Incremental Vosk recognition over 16-bit PCM chunks (one per live stream).
+    The recognizer resets itself after each detected utterance, so one
+    instance serves a whole multi-utterance session.
+    """
+
+    def __init__(self, sample_rate: int = SAMPLE_RATE, max_seconds: float = 30.0):
+        from vosk import KaldiRecognizer
+        self.sample_rate = sample_rate
+        self._rec = KaldiRecognizer(get_model("vosk"), sample_rate)
+        self._pcm = bytearray()
+        # 16-bit mono: the buffer (and the utterance) never exceeds this
+        self._max_bytes = int(max_seconds * sample_rate) * 2
+
+    def accept(self, chunk: bytes) -> tuple[bool, str]:
+        """
+        Feed a chunk. Returns (utterance_ended, text): final text at an
+        endpoint, else the partial. An utterance that reaches max_seconds
+        without a pause is ended here.
+        """
+        self._pcm += chunk[: max(0, self._max_bytes - len(self._pcm))]
+        if self._rec.AcceptWaveform(chunk):
+            return True, json.loads(self._rec.Result()).get("text", "").strip()
+        if len(self._pcm) >= self._max_bytes:
+            return True, self.finish()
+        return False, json.loads(self._rec.PartialResult()).get("partial", "").strip()
+
+    def finish(self) -> str:
+        """Flush the current utterance (client signalled end of speech)."""
+        return json.loads(self._rec.FinalResult()).get("text", "").strip()
+
+    def take_samples(self) -> np.ndarray:
+        """Audio of the utterance so far as float32 (for prosody); resets the buffer."""
+        samples = np.frombuffer(bytes(self._pcm), dtype=np.int16).astype(np.float32)
+        samples *= 1.0 / 32768.0
+        self._pcm.clear()
+        return samples
+
+def prosody_features(samples: np.ndarray, sr: int = SAMPLE_RATE) -> dict:
     try:
-        y, sr = librosa.load(io.BytesIO(wav_bytes), sr=16000)
+        y = samples
         # Energy
         rms = float(librosa.feature.rms(y=y).mean())
         # Pitch estimation via librosa.yin
@@ -0,0 +1,96 @@
+# Process pool for CPU-bound voice work (STT inference + prosody) so a long
+# clip never stalls the event loop. Each worker loads its STT models once in
+# the initializer and keeps them for its lifetime.
+import asyncio
+import logging
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import anyio
+import numpy as np
+
+from ..settings import settings
+
+log = logging.getLogger(__name__)
+
+
+class VoicePoolSaturated(Exception):
+    """All workers are busy and the pending queue is full."""
+
+
+class VoicePoolUnavailable(Exception):
+    """A worker died; the pool is being rebuilt and the clip was not processed."""
+
+
+_executor: ProcessPoolExecutor | None = None
+_inflight = 0
+
+
+def _init_worker(engines: str):
+    # An initializer that raises marks the whole executor broken, so a model
+    # that fails to warm up is only logged; it loads lazily on first use.
+    try:
+        from . import stt_models
+        stt_models.warmup(engines)
+    except Exception:
+        log.warning("voice worker warmup failed (engines=%s)", engines, exc_info=True)
+
+
+def analyze_audio(samples: np.ndarray, engine: str) -> tuple[dict, dict]:
+    # Runs inside a worker (or a thread when the pool is disabled)
+    from .voice import transcribe_samples, prosody_features
+    return transcribe_samples(samples, engine=engine), prosody_features(samples)
+
+
+def _capacity() -> int:
+    return max(1, settings.voice_pool_workers) + max(0, settings.voice_pool_max_pending)
+
+
+def start_voice_pool():
+    global _executor
+    if _executor is None and settings.voice_pool_workers > 0:
+        # spawn: the inference runtimes are not fork-safe
+        _executor = ProcessPoolExecutor(
+            max_workers=settings.voice_pool_workers,
+            mp_context=mp.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(settings.voice_pool_warmup,),
+        )
+
+
+def shutdown_voice_pool():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+async def run_voice_analysis(samples: np.ndarray, engine: str = "whisper") -> tuple[dict, dict]:
+    """
+    (stt, prosody) for a decoded clip, computed off the event loop.
+    Raises VoicePoolSaturated instead of queueing without limit, and
+    VoicePoolUnavailable if a worker died (the pool is replaced for the
+    next request).
+    """
+    global _inflight
+    if _inflight >= _capacity():
+        raise VoicePoolSaturated()
+
+    _inflight += 1
+    try:
+        if _executor is None:
+            return await anyio.to_thread.run_sync(analyze_audio, samples, engine)
+        executor = _executor
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(executor, analyze_audio, samples, engine)
+        except BrokenProcessPool:
+            # e.g. a worker was OOM-killed; a broken executor never recovers
+            log.warning("voice pool broken, restarting", exc_info=True)
+            if _executor is executor:
+                shutdown_voice_pool()
+                start_voice_pool()
+            raise VoicePoolUnavailable()
+    finally:
+        _inflight -= 1
@@ -6,6 +6,10 @@ from dotenv import load_dotenv
 load_dotenv()
 
 
+def _env_bool(name: str, default: str = "false") -> bool:
+    return os.getenv(name, default).strip().lower() in {"1", "true", "yes", "on"}
+
+
 class Settings(BaseModel):
     # ===============================
     # Core environment
@@ -55,6 +59,110 @@ class Settings(BaseModel):
         "OLLAMA_BASE_URL",
         "http://localhost:11434"
     )
+    ollama_model: str = os.getenv("OLLAMA_MODEL", "llama3.1")
+    # How long Ollama keeps the model loaded after a request
+    ollama_keep_alive: str = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+
+    # ===============================
+    # LLM HTTP client (shared pool)
+    # ===============================
+    llm_timeout_sec: float = float(os.getenv("LLM_TIMEOUT_SEC", "60"))
+    llm_connect_timeout_sec: float = float(os.getenv("LLM_CONNECT_TIMEOUT_SEC", "10"))
+    llm_max_connections: int = int(os.getenv("LLM_MAX_CONNECTIONS", "100"))
+    llm_max_keepalive_connections: int = int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", "20"))
+    llm_keepalive_expiry_sec: float = float(os.getenv("LLM_KEEPALIVE_EXPIRY_SEC", "30"))
+    # Needs the `h2` package (httpx[http2]); falls back to HTTP/1.1 without it
+    llm_http2: bool = _env_bool("LLM_HTTP2")
+
+    # ===============================
+    # LLM provider resilience
+    # ===============================
+    # Concurrent calls per provider, plus a bounded queue of waiters
+    llm_max_concurrency: int = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+    llm_max_queue: int = int(os.getenv("LLM_MAX_QUEUE", "32"))
+    llm_queue_timeout_sec: float = float(os.getenv("LLM_QUEUE_TIMEOUT_SEC", "5"))
+    # Circuit breaker over the last N calls
+    llm_breaker_window: int = int(os.getenv("LLM_BREAKER_WINDOW", "20"))
+    llm_breaker_min_calls: int = int(os.getenv("LLM_BREAKER_MIN_CALLS", "10"))
+    llm_breaker_error_rate: float = float(os.getenv("LLM_BREAKER_ERROR_RATE", "0.5"))
+    llm_breaker_slow_call_sec: float = float(os.getenv("LLM_BREAKER_SLOW_CALL_SEC", "20"))
+    llm_breaker_slow_rate: float = float(os.getenv("LLM_BREAKER_SLOW_RATE", "0.5"))
+    llm_breaker_open_sec: float = float(os.getenv("LLM_BREAKER_OPEN_SEC", "30"))
+    # Answer rule-based if the provider hasn't replied (or sent a first
+    # token) within this many ms; 0 disables hedging
+    llm_hedge_ms: int = int(os.getenv("LLM_HEDGE_MS", "0"))
+
+    # ===============================
+    # Prompt history
+    # ===============================
+    # Token budget for recent messages in the prompt (newest first)
+    history_token_budget: int = int(os.getenv("HISTORY_TOKEN_BUDGET", "1200"))
+    history_max_messages: int = int(os.getenv("HISTORY_MAX_MESSAGES", "24"))
+    # Rolling summary of turns that fell out of the window
+    history_summary_max_chars: int = int(os.getenv("HISTORY_SUMMARY_MAX_CHARS", "2000"))
+    history_summary_line_chars: int = int(os.getenv("HISTORY_SUMMARY_LINE_CHARS", "160"))
+
+    # ===============================
+    # Cohort analytics
+    # ===============================
+    # How often a background task refreshes the cohort cube (only days
+    # marked dirty); 0 leaves it to scripts/refresh_cohort_cube.py (cron)
+    cohort_refresh_interval_sec: float = float(os.getenv("COHORT_REFRESH_INTERVAL_SEC", "60"))
+    cohort_max_users: int = int(os.getenv("COHORT_MAX_USERS", "50000"))
+
+    # ===============================
+    # Speech-to-text
+    # ===============================
+    whisper_model_size: str = os.getenv("WHISPER_MODEL_SIZE", "tiny")
+    whisper_device: str = os.getenv("WHISPER_DEVICE", "cpu")
+    whisper_compute_type: str = os.getenv("WHISPER_COMPUTE_TYPE", "int8")
+    vosk_model_path: str = os.getenv("VOSK_MODEL_PATH", "models/vosk")
+    # Max concurrent transcriptions per loaded model
+    stt_max_concurrency: int = int(os.getenv("STT_MAX_CONCURRENCY", "2"))
+    # Engines to load at startup, comma-separated (e.g. "whisper" or "whisper,vosk")
+    stt_warmup: str = os.getenv("STT_WARMUP", "")
+
+    # ===============================
+    # Voice worker pool
+    # ===============================
+    # Worker processes for STT + prosody (0 = run in a thread in-process)
+    voice_pool_workers: int = int(os.getenv("VOICE_POOL_WORKERS", "1"))
+    # Jobs allowed to wait for a worker before /chat/voice answers 503
+    voice_pool_max_pending: int = int(os.getenv("VOICE_POOL_MAX_PENDING", "4"))
+    # Engines each worker loads on start
+    voice_pool_warmup: str = os.getenv("VOICE_POOL_WARMUP", "whisper")
+    # Concurrent /chat/voice/stream WebSocket sessions (incremental Vosk)
+    voice_ws_max_sessions: int = int(os.getenv("VOICE_WS_MAX_SESSIONS", "20"))
+    # Longest utterance a WebSocket session buffers before forcing its end
+    voice_ws_max_utterance_sec: float = float(os.getenv("VOICE_WS_MAX_UTTERANCE_SEC", "30"))
+
+    # ===============================
+    # Rate limiting (chat endpoints)
+    # ===============================
+    rate_limit_window_sec: float = float(os.getenv("RATE_LIMIT_WINDOW_SEC", "60"))
+    rate_limit_max_requests: int = int(os.getenv("RATE_LIMIT_MAX_REQUESTS", "10"))
+    # memory (per process) | sqlite (shared by all workers on the host)
+    rate_limit_backend: str = os.getenv("RATE_LIMIT_BACKEND", "memory")
+    rate_limit_sqlite_path: str = os.getenv("RATE_LIMIT_SQLITE_PATH", "./ratelimit.db")
+    # ip | user (user_id from X-User-Id, ?user_id= or the JSON body; falls back to ip).
+    # user_id is client-supplied until auth tokens exist, so in user mode the
+    # IP is also limited, to RATE_LIMIT_IP_MAX_REQUESTS across all its ids.
+    rate_limit_key: str = os.getenv("RATE_LIMIT_KEY", "ip")
+    rate_limit_ip_max_requests: int = int(os.getenv("RATE_LIMIT_IP_MAX_REQUESTS", "60"))
+    rate_limit_max_keys: int = int(os.getenv("RATE_LIMIT_MAX_KEYS", "10000"))
+
+    # ===============================
+    # User cache (user_id -> pk/profile/last_seen, per process)
+    # ===============================
+    user_cache_ttl_sec: float = float(os.getenv("USER_CACHE_TTL_SEC", "120"))
+    user_cache_max_entries: int = int(os.getenv("USER_CACHE_MAX_ENTRIES", "10000"))
+
+    # ===============================
+    # Safety
+    # ===============================
+    # Crisis lexicon file (default: app/data/crisis_terms.txt), hot-reloaded
+    crisis_lexicon_path: str | None = os.getenv("CRISIS_LEXICON_PATH")
+    crisis_reload_interval_sec: float = float(os.getenv("CRISIS_RELOAD_INTERVAL_SEC", "5"))
 
 
 # Singleton settings object
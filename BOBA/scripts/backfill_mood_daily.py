@@ -0,0 +1,21 @@
+"""
+Rebuild the mood_daily rollup from the moods table, and the cohort cube
+from it (idempotent).
+Runs automatically once on an existing database; use this to re-run it.
+
+    python -m scripts.backfill_mood_daily
+"""
+from app.db import engine
+from app.migrations import backfill_mood_daily
+from app.services.cohort import refresh_cohort_cube
+
+
+def main():
+    with engine.begin() as conn:
+        n = backfill_mood_daily(conn)
+        refresh_cohort_cube(conn, full=True)
+    print(f"rebuilt {n} rollup row(s) and the cohort cube")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,24 @@
+"""
+Backfill messages.sentiment_compound from annotations (idempotent).
+Runs automatically once when the column is added; use this to re-run it.
+
+    python -m scripts.backfill_sentiment [--batch-size 1000]
+"""
+import argparse
+
+from app.db import engine
+from app.migrations import backfill_sentiment_compound
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--batch-size", type=int, default=1000)
+    args = ap.parse_args()
+
+    with engine.begin() as conn:
+        n = backfill_sentiment_compound(conn, batch_size=args.batch_size)
+    print(f"updated {n} message(s)")
+
+
+if __name__ == "__main__":
+    main()
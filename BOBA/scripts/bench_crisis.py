@@ -0,0 +1,85 @@
+"""
+Micro-benchmark: compiled crisis matcher vs. the old per-keyword scan.
+
+    python -m scripts.bench_crisis [--terms 5000] [--chars 20000] [--runs 200]
+
+Scores long messages (no crisis phrase, so every keyword has to be checked)
+against the shipped lexicon plus a large synthetic one.
+"""
+import argparse
+import random
+import string
+import time
+
+from app.services.crisis import compile_lexicon, load_terms, DEFAULT_LEXICON_PATH
+
+WORDS = (
+    "today work tired sleep friends family coffee walk rain exam stress "
+    "happy okay honestly feel think maybe really little bit week weekend "
+    "music game phone call dinner school boss deadline weather trip"
+).split()
+
+
+def synthetic_terms(n: int, rng: random.Random) -> list[str]:
+    terms = set()
+    while len(terms) < n:
+        k = rng.randint(1, 4)
+        terms.add(" ".join("".join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 9))) for _ in range(k)))
+    return sorted(terms)
+
+
+def message(chars: int, rng: random.Random) -> str:
+    out, size = [], 0
+    while size < chars:
+        w = rng.choice(WORDS)
+        out.append(w)
+        size += len(w) + 1
+    return " ".join(out)
+
+
+def naive(terms: list[str]):
+    def check(text: str) -> bool:
+        t = text.lower()
+        return any(k in t for k in terms)
+    return check
+
+
+def compiled(terms: list[str]):
+    pattern = compile_lexicon(terms)
+    return lambda text: pattern.search(text.lower()) is not None
+
+
+def bench(name: str, fn, texts: list[str], runs: int):
+    start = time.perf_counter()
+    for _ in range(runs):
+        for t in texts:
+            fn(t)
+    elapsed = time.perf_counter() - start
+    per = elapsed / (runs * len(texts)) * 1e6
+    print(f"  {name:<10} {per:10.1f} us/message")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--terms", type=int, default=5000)
+    ap.add_argument("--chars", type=int, default=20000)
+    ap.add_argument("--messages", type=int, default=5)
+    ap.add_argument("--runs", type=int, default=50)
+    args = ap.parse_args()
+
+    rng = random.Random(7)
+    texts = [message(args.chars, rng) for _ in range(args.messages)]
+    shipped = load_terms(DEFAULT_LEXICON_PATH)
+    large = shipped + synthetic_terms(args.terms, rng)
+
+    for label, terms in (("shipped", shipped), ("large", large)):
+        print(f"{label} lexicon: {len(terms)} phrases, {args.chars} chars/message")
+        start = time.perf_counter()
+        compile_lexicon(terms)
+        print(f"  compile    {(time.perf_counter() - start) * 1e3:10.1f} ms")
+        bench("naive", naive(terms), texts, args.runs)
+        bench("compiled", compiled(terms), texts, args.runs)
+
+
+if __name__ == "__main__":
+    main()
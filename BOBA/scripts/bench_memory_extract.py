@@ -0,0 +1,123 @@
+"""
+Benchmark: single-pass memory fact extractor vs. the previous eight-regex
+version, over a synthetic but realistic chat corpus (mostly short messages
+with no facts, a few fact statements, some long pasted texts).
+
+    python -m scripts.bench_memory_extract [--messages 20000] [--runs 3]
+
+Also checks both versions agree on every message of the corpus.
+"""
+import argparse
+import random
+import re
+import time
+
+from app.services.memory import extract_memories_from_text
+
+SHORT = [
+    "ok", "thanks", "im tired", "hey boba", "not great today tbh",
+    "work was a lot", "i don't know what to do anymore", "haha yes",
+    "can we talk about something else", "my sister called me earlier",
+    "i slept badly again", "exams next week and i'm stressed out",
+    "it was fine I guess", "feeling a bit better than yesterday",
+]
+
+FACTS = [
+    "my name is Aisyah", "you can call me Boo", "i'm 24 years old",
+    "I am 31", "my hobbies are badminton and baking", "i like drawing",
+    "I love long walks at night.", "i was diagnosed with anxiety last year",
+    "my diagnosis is ADHD", "hi, call me Raj and i'm 19",
+]
+
+FILLER = (
+    "so basically what happened was that the meeting ran late and then "
+    "everyone kept talking about the deadline and I could not focus at all "
+)
+
+
+def legacy_extract(text: str) -> dict:
+    t = (text or "").strip()
+    low = t.lower()
+    out: dict = {}
+    m = re.search(r"\b(?:call me|you can call me)\s+([A-Za-z][A-Za-z0-9_\-]{1,20})\b", t, re.I)
+    if m:
+        out["nickname"] = m.group(1)
+    m = re.search(r"\bmy name is\s+([A-Za-z][A-Za-z0-9_\-]{1,20})\b", t, re.I)
+    if m:
+        out["name"] = m.group(1)
+    m = re.search(r"\b(?:i am|i'm)\s+(\d{1,2})\s*(?:years?\s*old)?\b", low)
+    if m:
+        age = int(m.group(1))
+        if 5 <= age <= 120:
+            out["age"] = age
+    m = re.search(r"\b(?:my hobbies are|my hobbies include)\s+(.+)$", t, re.I)
+    if m:
+        hobbies = m.group(1).strip(" .!")
+        if len(hobbies) <= 120:
+            out["hobbies"] = hobbies
+    m = re.search(r"\b(?:i like|i enjoy|i love)\s+(.+)$", t, re.I)
+    if m:
+        hobbies = m.group(1).strip(" .!")
+        if 2 <= len(hobbies) <= 120:
+            out.setdefault("hobbies", hobbies)
+    m = re.search(r"\b(?:i was diagnosed with|i've been diagnosed with)\s+(.+)$", t, re.I)
+    if m:
+        diag = m.group(1).strip(" .!")
+        if 2 <= len(diag) <= 80:
+            out["diagnosis"] = diag
+    m = re.search(r"\bmy diagnosis is\s+(.+)$", t, re.I)
+    if m:
+        diag = m.group(1).strip(" .!")
+        if 2 <= len(diag) <= 80:
+            out["diagnosis"] = diag
+    return out
+
+
+def corpus(n: int, rng: random.Random) -> list[str]:
+    out = []
+    for _ in range(n):
+        r = rng.random()
+        if r < 0.90:
+            out.append(rng.choice(SHORT))
+        elif r < 0.97:
+            out.append(rng.choice(FACTS))
+        else:
+            # Long pasted text, sometimes with "i like"/"i am" buried inside
+            body = FILLER * rng.randint(20, 150)
+            if rng.random() < 0.5:
+                body += " and honestly i like it when people listen"
+            out.append(body)
+    return out
+
+
+def bench(name: str, fn, texts: list[str], runs: int) -> float:
+    best = float("inf")
+    for _ in range(runs):
+        start = time.perf_counter()
+        for t in texts:
+            fn(t)
+        best = min(best, time.perf_counter() - start)
+    print(f"  {name:<12} {best / len(texts) * 1e6:8.2f} us/message  ({best * 1e3:.1f} ms total)")
+    return best
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--messages", type=int, default=20000)
+    ap.add_argument("--runs", type=int, default=3)
+    args = ap.parse_args()
+
+    texts = corpus(args.messages, random.Random(11))
+    long_texts = sum(len(t) > 1000 for t in texts)
+    print(f"corpus: {len(texts)} messages ({long_texts} long pasted texts)")
+
+    mismatches = [t for t in texts if len(t) <= 2000 and legacy_extract(t) != extract_memories_from_text(t)]
+    print(f"  mismatches vs legacy (messages <= 2000 chars): {len(mismatches)}")
+
+    old = bench("legacy", legacy_extract, texts, args.runs)
+    new = bench("single-pass", extract_memories_from_text, texts, args.runs)
+    print(f"  speedup      {old / new:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
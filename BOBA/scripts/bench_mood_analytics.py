@@ -0,0 +1,108 @@
+"""
+Micro-benchmark: vectorized mood analytics vs. a per-observation Python loop.
+
+    python -m scripts.bench_mood_analytics [--years 4] [--per-day 12] [--days 365] [--runs 20]
+
+Builds a synthetic multi-year history (mood logs + message compounds, with
+gaps), checks that both implementations agree, then times them over the
+trailing window.
+"""
+import argparse
+import random
+import time
+from collections import defaultdict
+from datetime import date, timedelta
+
+import numpy as np
+
+from app.services.analytics import (
+    SOURCE_MESSAGE,
+    SOURCE_MOOD,
+    mood_analytics,
+    window_start,
+)
+
+
+def synthetic_history(years: int, per_day: int, today: date, rng: random.Random):
+    days, values, sources = [], [], []
+    start = today - timedelta(days=365 * years)
+    d = start
+    while d <= today:
+        if rng.random() < 0.85:  # some days have nothing at all
+            base = 0.4 * np.sin(d.toordinal() / 20.0)
+            if rng.random() < 0.7:
+                days.append(d)
+                values.append(None if rng.random() < 0.2 else base + rng.uniform(-0.3, 0.3))
+                sources.append(SOURCE_MOOD)
+            for _ in range(rng.randint(0, per_day)):
+                days.append(d)
+                values.append(max(-1.0, min(1.0, base + rng.uniform(-0.6, 0.6))))
+                sources.append(SOURCE_MESSAGE)
+        d += timedelta(days=1)
+    return days, values, sources
+
+
+def naive(since: date, days: int, obs_days, values, sources) -> dict:
+    sums, counts, moods = defaultdict(float), defaultdict(int), defaultdict(int)
+    for d, v, src in zip(obs_days, values, sources):
+        i = (d - since).days
+        if not 0 <= i < days:
+            continue
+        if src == SOURCE_MOOD:
+            moods[i] += 1
+        if v is not None:
+            sums[i] += v
+            counts[i] += 1
+
+    rolling = []
+    for i in range(days):
+        s = sum(sums[j] for j in range(max(0, i - 6), i + 1))
+        c = sum(counts[j] for j in range(max(0, i - 6), i + 1))
+        rolling.append(round(s / c, 4) if c else None)
+
+    longest = run = 0
+    for i in range(days):
+        run = run + 1 if moods[i] else 0
+        longest = max(longest, run)
+    return {"rolling_7": rolling, "logging_longest": longest}
+
+
+def timed(fn, runs: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(runs):
+        fn()
+    return (time.perf_counter() - t0) / runs * 1000
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--years", type=int, default=4)
+    ap.add_argument("--per-day", type=int, default=12)
+    ap.add_argument("--days", type=int, default=365)
+    ap.add_argument("--runs", type=int, default=20)
+    ap.add_argument("--seed", type=int, default=7)
+    args = ap.parse_args()
+
+    rng = random.Random(args.seed)
+    today = date.today()
+    since = window_start(today, args.days)
+    days, values, sources = synthetic_history(args.years, args.per_day, today, rng)
+
+    obs_days = np.array([d.isoformat() for d in days], dtype="datetime64[D]")
+    obs_values = np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+    obs_sources = np.array(sources, dtype=np.int8)
+
+    fast = mood_analytics(since, args.days, obs_days, obs_values, obs_sources)
+    ref = naive(since, args.days, days, values, sources)
+    assert fast["series"]["rolling_7"] == ref["rolling_7"], "rolling_7 mismatch"
+    assert fast["streaks"]["logging"]["longest"] == ref["logging_longest"], "streak mismatch"
+
+    print(f"{len(days)} observations over {args.years}y, window {args.days}d")
+    t_fast = timed(lambda: mood_analytics(since, args.days, obs_days, obs_values, obs_sources), args.runs)
+    t_naive = timed(lambda: naive(since, args.days, days, values, sources), max(1, args.runs // 4))
+    print(f"numpy : {t_fast:8.2f} ms/run")
+    print(f"python: {t_naive:8.2f} ms/run  ({t_naive / t_fast:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
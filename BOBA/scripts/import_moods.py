@@ -0,0 +1,47 @@
+"""
+Bulk import historical moods from an NDJSON or CSV file (same format and
+validation as POST /mood/import). Users must already exist.
+
+    python -m scripts.import_moods moods.ndjson [--format csv] [--chunk-size 1000] [--errors errors.ndjson]
+
+Use "-" to read from stdin.
+"""
+import argparse
+import json
+import sys
+import time
+
+from app.services.moods import IMPORT_FORMATS, import_moods
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("path")
+    ap.add_argument("--format", choices=IMPORT_FORMATS, help="default: from the file extension")
+    ap.add_argument("--chunk-size", type=int, default=1000)
+    ap.add_argument("--errors", help="write the per-line error report here (NDJSON)")
+    args = ap.parse_args()
+
+    fmt = args.format or ("csv" if args.path.endswith(".csv") else "ndjson")
+    t0 = time.perf_counter()
+    if args.path == "-":
+        report = import_moods(sys.stdin, fmt, args.chunk_size)
+    else:
+        with open(args.path, encoding="utf-8", newline="") as f:
+            report = import_moods(f, fmt, args.chunk_size)
+    elapsed = time.perf_counter() - t0
+
+    print(
+        f"{report.imported} imported, {report.failed} failed "
+        f"({report.lines} lines, {elapsed:.1f}s, {report.imported / max(elapsed, 1e-9):.0f} rows/s)"
+    )
+    if args.errors and report.errors:
+        with open(args.errors, "w", encoding="utf-8") as f:
+            for e in report.errors:
+                f.write(json.dumps(e) + "\n")
+        if report.failed > len(report.errors):
+            print(f"first {len(report.errors)} errors written to {args.errors}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Stand-in for a local Ollama server, for exercising the `ollama` provider
+without a model.
+
+    python -m scripts.ollama_standin [--port 11434] [--delay-ms 40] [--fail]
+
+Then run the API with DEFAULT_MODEL_PROVIDER=ollama (and OLLAMA_BASE_URL if
+the port differs). POST /api/chat answers like Ollama: a single JSON object
+for "stream": false, NDJSON chunks ending in "done": true otherwise. The
+reply echoes the last user line so prompts can be checked end to end.
+"""
+import argparse
+import json
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def reply_for(messages: list[dict]) -> str:
+    prompt = next((m.get("content") or "" for m in reversed(messages) if m.get("role") == "user"), "")
+    last = prompt.strip().splitlines()[-1] if prompt.strip() else ""
+    return f"(stand-in) I hear you. You said: {last}"
+
+
+def make_handler(delay_sec: float, fail: bool):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _json(self, status: int, body: dict):
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path == "/api/tags":
+                return self._json(200, {"models": [{"name": "stand-in"}]})
+            self._json(404, {"error": "not found"})
+
+        def do_POST(self):
+            if self.path != "/api/chat":
+                return self._json(404, {"error": "not found"})
+            length = int(self.headers.get("Content-Length") or 0)
+            try:
+                req = json.loads(self.rfile.read(length) or b"{}")
+            except ValueError:
+                return self._json(400, {"error": "invalid JSON"})
+            if fail:
+                return self._json(500, {"error": "stand-in failure"})
+
+            model = req.get("model") or "stand-in"
+            text = reply_for(req.get("messages") or [])
+            now = datetime.now(timezone.utc).isoformat()
+
+            if req.get("stream", True) is False:
+                time.sleep(delay_sec)
+                return self._json(200, {
+                    "model": model,
+                    "created_at": now,
+                    "message": {"role": "assistant", "content": text},
+                    "done": True,
+                })
+
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            words = text.split(" ")
+            for i, word in enumerate(words):
+                time.sleep(delay_sec)
+                self._chunk({
+                    "model": model,
+                    "created_at": now,
+                    "message": {"role": "assistant", "content": word if i == 0 else " " + word},
+                    "done": False,
+                })
+            self._chunk({"model": model, "created_at": now, "message": {"role": "assistant", "content": ""}, "done": True})
+            self.wfile.write(b"0\r\n\r\n")
+
+        def _chunk(self, obj: dict):
+            line = (json.dumps(obj) + "\n").encode()
+            self.wfile.write(f"{len(line):x}\r\n".encode() + line + b"\r\n")
+            self.wfile.flush()
+
+        def log_message(self, fmt, *args):
+            pass
+
+    return Handler
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=11434)
+    ap.add_argument("--delay-ms", type=float, default=40, help="delay per streamed chunk")
+    ap.add_argument("--fail", action="store_true", help="answer every chat with HTTP 500")
+    args = ap.parse_args()
+
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(args.delay_ms / 1000.0, args.fail))
+    print(f"ollama stand-in on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
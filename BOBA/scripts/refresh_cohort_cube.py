@@ -0,0 +1,25 @@
+"""
+Refresh the cohort cube (mood_cohort_daily) from mood_daily.
+The app refreshes it in the background every COHORT_REFRESH_INTERVAL_SEC; with
+that set to 0, run this from cron instead. --full rebuilds every day.
+
+    python -m scripts.refresh_cohort_cube [--full]
+"""
+import argparse
+
+from app.db import engine
+from app.services.cohort import refresh_cohort_cube
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--full", action="store_true", help="rebuild all days, not just dirty ones")
+    args = ap.parse_args()
+
+    with engine.begin() as conn:
+        n = refresh_cohort_cube(conn, full=args.full)
+    print(f"refreshed {n} day(s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+# Tests run against a throwaway SQLite file; the URL must be set before the
+# app modules read settings.
+import asyncio
+import os
+import sys
+import tempfile
+
+import pytest
+
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'boba-test.db')}"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.db import Base, SessionLocal, async_engine, engine  # noqa: E402
+from app.migrations import run_migrations  # noqa: E402
+from app.models import Conversation, User  # noqa: E402
+
+Base.metadata.create_all(bind=engine)
+run_migrations(engine)
+
+
+@pytest.fixture
+def run():
+    """Run a coroutine on a fresh loop; pooled aiosqlite connections don't outlive it."""
+    def _run(coro):
+        async def main():
+            try:
+                return await coro
+            finally:
+                await async_engine.dispose()
+        return asyncio.run(main())
+    return _run
+
+
+@pytest.fixture
+def conversation(request) -> tuple[int, int]:
+    """(user pk, conversation id) for a fresh user with one empty conversation."""
+    with SessionLocal() as db:
+        user = User(user_id=f"test-{request.node.name}", email=f"{request.node.name}@example.test", password_hash="x")
+        conv = Conversation(user=user, meta={}, turn_count=0, message_count=0)
+        db.add_all([user, conv])
+        db.commit()
+        return user.id, conv.id
+
+
+@pytest.fixture
+def make_user(request):
+    """Factory for fresh users (suffix -> (user pk, user_id)), unique per test."""
+    def _make(suffix: str = "") -> tuple[int, str]:
+        user_id = f"test-{request.node.name}{suffix}"
+        with SessionLocal() as db:
+            user = User(user_id=user_id, email=f"{user_id}@example.test", password_hash="x")
+            db.add(user)
+            db.commit()
+            return user.id, user_id
+    return _make
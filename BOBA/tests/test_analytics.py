@@ -0,0 +1,128 @@
+from datetime import date, datetime, timedelta, timezone
+
+import numpy as np
+
+from app.db import SessionLocal
+from app.models import Conversation, Message, Mood
+from app.services.analytics import (
+    SOURCE_MESSAGE,
+    SOURCE_MOOD,
+    load_sentiment_series,
+    mood_analytics,
+    window_start,
+)
+
+
+def _obs(*rows):
+    """(day, value | None, source) rows -> the arrays load_sentiment_series returns."""
+    days, values, sources = zip(*rows)
+    return (
+        np.array([str(d) for d in days], dtype="datetime64[D]"),
+        np.array([np.nan if v is None else v for v in values], dtype=np.float64),
+        np.array(sources, dtype=np.int8),
+    )
+
+
+def test_days_without_data_are_null_not_zero():
+    since = date(2024, 3, 4)
+    out = mood_analytics(since, 5, *_obs(
+        (date(2024, 3, 5), 0.5, SOURCE_MOOD),
+        (date(2024, 3, 5), 0.1, SOURCE_MESSAGE),
+        (date(2024, 3, 7), None, SOURCE_MOOD),  # logged, no score
+    ))
+    series = out["series"]
+
+    assert series["daily_mean"] == [None, 0.3, None, None, None]
+    # Trailing windows carry the last scored day forward, nothing before it
+    assert series["rolling_7"] == [None, 0.3, 0.3, 0.3, 0.3]
+    assert series["rolling_30"] == series["rolling_7"]
+    assert series["mood_count"] == [0, 1, 0, 1, 0]
+    assert series["message_count"] == [0, 1, 0, 0, 0]
+    assert out["totals"] == {"moods": 2, "messages": 1, "scored": 2, "mean": 0.3}
+
+
+def test_no_data_at_all():
+    empty = (np.empty(0, "datetime64[D]"), np.empty(0, np.float64), np.empty(0, np.int8))
+    out = mood_analytics(date(2024, 3, 1), 3, *empty)
+
+    assert out["series"]["daily_mean"] == [None, None, None]
+    assert out["series"]["rolling_7"] == [None, None, None]
+    assert out["totals"]["mean"] is None
+    assert out["volatility"] == {"daily_std": None, "mean_abs_change": None}
+    assert out["streaks"]["logging"] == {"current": 0, "longest": 0}
+    assert all(w["mean"] is None and w["n"] == 0 for w in out["weekday"])
+
+
+def test_single_day():
+    day = date(2024, 3, 6)
+    out = mood_analytics(day, 1, *_obs((day, -0.5, SOURCE_MOOD), (day, -0.3, SOURCE_MOOD)))
+
+    assert out["series"]["dates"] == ["2024-03-06"]
+    assert out["series"]["daily_mean"] == [-0.4]
+    assert out["series"]["rolling_7"] == [-0.4]
+    assert out["volatility"] == {"daily_std": None, "mean_abs_change": None}
+    assert out["streaks"]["negative"] == {"current": 1, "longest": 1}
+    assert out["streaks"]["positive"] == {"current": 0, "longest": 0}
+    assert out["streaks"]["logging"] == {"current": 1, "longest": 1}
+    # 2024-03-06 was a Wednesday
+    assert [w["weekday"] for w in out["weekday"] if w["n"]] == ["Wed"]
+
+
+def test_rolling_window_crosses_month_boundary():
+    since = date(2024, 1, 28)
+    days = 10  # through 2024-02-06
+    out = mood_analytics(since, days, *_obs(
+        (date(2024, 1, 28), 0.6, SOURCE_MOOD),
+        (date(2024, 1, 31), 0.4, SOURCE_MOOD),
+        (date(2024, 2, 1), -0.2, SOURCE_MOOD),
+        (date(2024, 2, 4), 0.0, SOURCE_MOOD),
+        (date(2024, 2, 10), 1.0, SOURCE_MOOD),  # after the window: ignored
+    ))
+    series = out["series"]
+
+    assert series["dates"][3:5] == ["2024-01-31", "2024-02-01"]
+    assert series["daily_mean"] == [0.6, None, None, 0.4, -0.2, None, None, 0.0, None, None]
+    # 02-03's window is 01-28..02-03; 02-04's drops 01-28
+    assert series["rolling_7"][6] == round((0.6 + 0.4 - 0.2) / 3, 4)
+    assert series["rolling_7"][7] == round((0.4 - 0.2 + 0.0) / 3, 4)
+    assert series["rolling_7"][9] == round((0.4 - 0.2 + 0.0) / 3, 4)
+    assert series["rolling_30"][9] == round((0.6 + 0.4 - 0.2 + 0.0) / 4, 4)
+    assert out["totals"]["moods"] == 4
+
+
+def test_streaks_use_label_thresholds_and_skip_gaps():
+    since = date(2024, 5, 1)
+    out = mood_analytics(since, 6, *_obs(
+        (date(2024, 5, 1), 0.3, SOURCE_MOOD),
+        (date(2024, 5, 2), 0.5, SOURCE_MOOD),
+        (date(2024, 5, 3), 0.29, SOURCE_MOOD),
+        (date(2024, 5, 4), 0.8, SOURCE_MESSAGE),
+        (date(2024, 5, 5), 0.9, SOURCE_MOOD),
+    ))
+
+    assert out["streaks"]["positive"] == {"current": 0, "longest": 2}
+    # Nothing logged on the last day yet: the logging streak still counts
+    assert out["streaks"]["logging"] == {"current": 1, "longest": 3}
+
+
+def test_load_sentiment_series_reads_moods_and_user_messages(make_user):
+    user_pk, _ = make_user()
+    today = datetime.now(timezone.utc).date()
+    since = window_start(today, 7)
+    with SessionLocal() as db:
+        conv = Conversation(user_id_fk=user_pk, meta={})
+        db.add(conv)
+        db.flush()
+        db.add_all([
+            Mood(user_id_fk=user_pk, mood="happy", sentiment_score=0.5, day=today),
+            Mood(user_id_fk=user_pk, mood="sad", day=today - timedelta(days=1)),
+            Mood(user_id_fk=user_pk, mood="sad", sentiment_score=-1.0, day=since - timedelta(days=1)),
+            Message(conversation_id=conv.id, role="user", content="x", sentiment_compound=-0.5),
+            Message(conversation_id=conv.id, role="assistant", content="y", sentiment_compound=0.9),
+        ])
+        db.commit()
+        obs_days, values, sources = load_sentiment_series(db, user_pk, since)
+
+    out = mood_analytics(since, 7, obs_days, values, sources)
+    assert out["totals"] == {"moods": 2, "messages": 1, "scored": 2, "mean": 0.0}
+    assert out["series"]["daily_mean"][-2:] == [None, 0.0]
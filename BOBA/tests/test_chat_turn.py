@@ -0,0 +1,100 @@
+import asyncio
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+from app.db import AsyncSessionLocal, unit_of_work
+from app.models import Conversation
+from app.routers import chatbot
+from app.schemas import ChatOut
+from app.services.llm import ReplySource
+from app.services.ratelimit import MemoryBackend, ChatRateLimiter, RateLimiter
+
+TURNS = 12
+
+
+async def _turn(user_id: str, conv_id: int, i: int):
+    analysis = {"sentiment": "neutral", "scores": {"compound": 0.1}}
+    async with AsyncSessionLocal() as db:
+        turn = await chatbot._prepare_turn(db, user_id, conv_id, f"hello {i}", analysis)
+        await db.commit()
+        async with unit_of_work(db):
+            await chatbot._stage_turn(db, turn, f"reply {i}", {"provider": "rule"})
+
+
+def test_concurrent_turns_each_advance_turn_count(run, conversation, request):
+    _, conv_id = conversation
+    user_id = f"test-{request.node.name}"
+
+    async def main():
+        await asyncio.gather(*(_turn(user_id, conv_id, i) for i in range(TURNS)))
+        async with AsyncSessionLocal() as db:
+            conv = await db.get(Conversation, conv_id)
+            return conv.turn_count, conv.message_count
+
+    turn_count, message_count = run(main())
+    assert turn_count == TURNS
+    assert message_count == 2 * TURNS
+
+
+def test_fallback_reply_is_not_annotated_as_provider():
+    turn = chatbot._Turn(
+        user=None, conv=None, text="hi", analysis={"sentiment": "sad"}, profile={},
+        last_seen=None, last_delta=None, crisis=False,
+    )
+
+    fallback = chatbot._llm_annotations(turn, ReplySource("rule", "queue_full"))
+    assert fallback == {"provider": "rule", "sentiment_seen": "sad", "fallback": "queue_full"}
+
+    answered = chatbot._llm_annotations(turn, ReplySource("xai"))
+    assert answered["provider"] == "xai" and "prompt_prefix" in answered
+
+
+class _FakeRecognizer:
+    def __init__(self, sample_rate, max_utterance_sec):
+        self.sample_rate = sample_rate
+
+    def accept(self, data):
+        return False, ""
+
+    def finish(self):
+        return "hello there"
+
+    def take_samples(self):
+        return np.zeros(160, dtype=np.float32)
+
+
+def test_voice_stream_reports_failed_turn_and_keeps_session(monkeypatch):
+    from app.main import app
+
+    calls = []
+
+    async def flaky_turn(db, user_id, conversation_id, text, analysis):
+        calls.append(text)
+        if len(calls) == 1:
+            raise RuntimeError("provider exploded")
+        return ChatOut(conversation_id=7, reply="hi!", annotations={})
+
+    monkeypatch.setattr(chatbot, "StreamingRecognizer", _FakeRecognizer)
+    monkeypatch.setattr(chatbot, "prosody_features", lambda samples, sr: {})
+    monkeypatch.setattr(chatbot, "analyze_text", lambda text: {"sentiment": "neutral"})
+    monkeypatch.setattr(chatbot, "_chat_turn", flaky_turn)
+    monkeypatch.setattr(app.state, "rate_limiter", ChatRateLimiter(RateLimiter(MemoryBackend(), 100, 60)))
+
+    with TestClient(app).websocket_connect("/chat/voice/stream") as ws:
+        ws.send_json({"type": "start", "user_id": "voice-user"})
+        assert ws.receive_json() == {"type": "ready"}
+
+        ws.send_json({"type": "end"})
+        assert ws.receive_json() == {"type": "final", "text": "hello there"}
+        error = ws.receive_json()
+        assert error["type"] == "error" and "provider exploded" not in error["detail"]
+
+        ws.send_json({"type": "end"})
+        assert ws.receive_json()["type"] == "final"
+        reply = ws.receive_json()
+        assert reply["type"] == "reply" and reply["reply"] == "hi!"
+
+        ws.send_json({"type": "stop"})
+
+    assert len(calls) == 2
@@ -0,0 +1,69 @@
+from datetime import date
+
+from sqlalchemy import func, select
+
+from app.db import SessionLocal, engine
+from app.models import Mood, MoodCohortDaily, MoodCohortDirty
+from app.services.cohort import refresh_cohort_cube
+from app.services.mood_rollup import add_to_mood_daily
+
+DAY = date(2001, 3, 4)
+
+
+def _log(db, user_pk: int, mood: str, score: float | None):
+    db.add(Mood(user_id_fk=user_pk, mood=mood, sentiment_score=score, day=DAY))
+    add_to_mood_daily(db, [(user_pk, DAY, mood, score)])
+
+
+def _cube(day: date) -> set[tuple]:
+    with SessionLocal() as db:
+        return set(db.execute(
+            select(
+                MoodCohortDaily.mood,
+                MoodCohortDaily.users,
+                MoodCohortDaily.count,
+                MoodCohortDaily.sum_sentiment,
+                MoodCohortDaily.sentiment_count,
+            ).where(MoodCohortDaily.day == day)
+        ).all())
+
+
+def _direct(day: date) -> set[tuple]:
+    with SessionLocal() as db:
+        return set(db.execute(
+            select(
+                Mood.mood,
+                func.count(func.distinct(Mood.user_id_fk)),
+                func.count(),
+                func.coalesce(func.sum(Mood.sentiment_score), 0.0),
+                func.count(Mood.sentiment_score),
+            ).where(Mood.day == day).group_by(Mood.mood)
+        ).all())
+
+
+def test_refresh_matches_direct_aggregate(make_user):
+    a, _ = make_user("-a")
+    b, _ = make_user("-b")
+    with SessionLocal() as db:
+        _log(db, a, "happy", 0.5)
+        _log(db, a, "happy", None)
+        _log(db, b, "happy", 0.25)
+        _log(db, b, "sad", -0.5)
+        db.commit()
+        assert DAY in set(db.execute(select(MoodCohortDirty.day)).scalars())
+
+    with engine.begin() as conn:
+        assert refresh_cohort_cube(conn) >= 1
+    assert _cube(DAY) == _direct(DAY) == {("happy", 2, 3, 0.75, 2), ("sad", 1, 1, -0.5, 1)}
+
+    # A later write only shows up after the next refresh
+    with SessionLocal() as db:
+        _log(db, b, "sad", -0.25)
+        db.commit()
+    assert _cube(DAY) != _direct(DAY)
+    with engine.begin() as conn:
+        refresh_cohort_cube(conn)
+    assert _cube(DAY) == _direct(DAY)
+
+    with SessionLocal() as db:
+        assert DAY not in set(db.execute(select(MoodCohortDirty.day)).scalars())
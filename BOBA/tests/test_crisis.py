@@ -0,0 +1,84 @@
+import os
+
+import pytest
+
+from app.services import crisis
+from app.services.crisis import DEFAULT_LEXICON_PATH, FALLBACK_TERMS, CrisisMatcher, load_terms
+
+SHIPPED = load_terms(DEFAULT_LEXICON_PATH)
+
+
+@pytest.fixture(scope="module")
+def matcher():
+    return CrisisMatcher(DEFAULT_LEXICON_PATH, check_interval=60)
+
+
+@pytest.mark.parametrize("term", SHIPPED)
+def test_every_shipped_phrase_matches(matcher, term):
+    assert matcher.is_crisis(f"honestly, {term.upper()}.")
+
+
+@pytest.mark.parametrize("text", [
+    "I've been thinking about self-harm again",
+    "self  harming",
+    "I can't go on like this",
+    "i cant go on",
+    "I can’t go on",
+    "thinking of ending it with an overdose",
+])
+def test_variants_match(matcher, text):
+    assert matcher.is_crisis(text)
+
+
+@pytest.mark.parametrize("text", [
+    "my phone is about to die",
+    "I'm dying to see that film",
+    "starting a new diet on monday",
+    "my cuttings are growing",
+    "selfharm",
+    "",
+])
+def test_ordinary_text_does_not_match(matcher, text):
+    assert not matcher.is_crisis(text)
+
+
+def test_fallback_terms_cover_the_shipped_lexicon():
+    assert sorted(FALLBACK_TERMS) == sorted(SHIPPED)
+
+
+def test_lexicon_edit_is_picked_up_after_interval(tmp_path, monkeypatch):
+    path = tmp_path / "terms.txt"
+    path.write_text("# comment\nhopeless\n", encoding="utf-8")
+    now = [1000.0]
+    monkeypatch.setattr(crisis.time, "monotonic", lambda: now[0])
+    m = CrisisMatcher(path, check_interval=5)
+    assert m.terms == ["hopeless"]
+
+    path.write_text("trapped\n", encoding="utf-8")
+    os.utime(path, (2_000_000_000, 2_000_000_000))
+    now[0] += 4
+    assert m.is_crisis("I feel hopeless")
+    assert not m.is_crisis("I feel trapped")
+
+    now[0] += 1
+    assert m.is_crisis("I feel trapped")
+    assert not m.is_crisis("I feel hopeless")
+
+
+@pytest.mark.parametrize("content", [None, "", "# only comments\n\n"])
+def test_missing_or_empty_file_falls_back(tmp_path, content):
+    path = tmp_path / "terms.txt"
+    if content is not None:
+        path.write_text(content, encoding="utf-8")
+    m = CrisisMatcher(path)
+    assert m.terms == FALLBACK_TERMS
+    assert m.is_crisis("I want to kill myself")
+
+
+def test_deleted_file_falls_back_on_reload(tmp_path):
+    path = tmp_path / "terms.txt"
+    path.write_text("hopeless\n", encoding="utf-8")
+    m = CrisisMatcher(path, check_interval=0)
+    path.unlink()
+    assert m.is_crisis("no reason to live")
+    assert not m.is_crisis("hopeless")
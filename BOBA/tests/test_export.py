@@ -0,0 +1,70 @@
+from datetime import datetime, timezone
+
+from fastapi.responses import StreamingResponse
+from sqlalchemy import event
+
+from app.db import SessionLocal, async_engine
+from app.models import Conversation, Message
+from app.routers.user import _attachment
+from app.services import export
+
+
+async def _empty():
+    yield b""
+
+
+def test_attachment_header_survives_quotes_and_non_ascii():
+    headers = _attachment('ana"bé 😀-export.ndjson')
+
+    # Starlette encodes headers as latin-1; this must not raise
+    response = StreamingResponse(_empty(), headers=headers)
+    value = dict(response.raw_headers)[b"content-disposition"].decode("latin-1")
+
+    assert value == (
+        'attachment; filename="ana_b___-export.ndjson"; '
+        "filename*=UTF-8''ana%22b%C3%A9%20%F0%9F%98%80-export.ndjson"
+    )
+
+
+def _conversation_with(db, user_pk: int, contents: list[str]) -> int:
+    conv = Conversation(user_id_fk=user_pk, meta={})
+    db.add(conv)
+    db.flush()
+    db.add_all(
+        Message(conversation_id=conv.id, role="user", content=c, created_at=datetime(2024, 1, 1, tzinfo=timezone.utc))
+        for c in contents
+    )
+    return conv.id
+
+
+def test_export_groups_one_message_query_by_conversation(run, make_user, monkeypatch):
+    user_pk, user_id = make_user()
+    with SessionLocal() as db:
+        first = _conversation_with(db, user_pk, ["a1", "a2", "a3"])
+        _conversation_with(db, user_pk, [])  # no messages: no record
+        second = _conversation_with(db, user_pk, ["b1", "b2"])
+        db.commit()
+
+    # Pages end inside and at the edge of a conversation
+    monkeypatch.setattr(export, "EXPORT_PAGE", 2)
+    statements = []
+
+    def count(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    async def main():
+        event.listen(async_engine.sync_engine, "before_cursor_execute", count)
+        try:
+            return [rec async for rec in export.export_records(user_pk, user_id, include_annotations=False)]
+        finally:
+            event.remove(async_engine.sync_engine, "before_cursor_execute", count)
+
+    records = run(main())
+
+    assert [(r["type"], r.get("content") or r.get("id")) for r in records[1:]] == [
+        ("conversation", first), ("message", "a1"), ("message", "a2"), ("message", "a3"),
+        ("conversation", second), ("message", "b1"), ("message", "b2"),
+    ]
+    assert all("annotations" not in r for r in records if r["type"] == "message")
+    # Conversation headers, then 3 pages of messages, however many conversations
+    assert len([s for s in statements if s.lstrip().upper().startswith("SELECT")]) == 4
@@ -0,0 +1,142 @@
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from app.db import AsyncSessionLocal, SessionLocal, unit_of_work
+from app.models import Conversation, Message
+from app.services.history import estimate_tokens, fold_summary, format_line, select_window
+from app.services.memory import history_window_async, store_summary_async
+from app.settings import settings
+
+T0 = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def _msg(i: int, content: str | None = None):
+    return SimpleNamespace(id=i, role="user" if i % 2 else "assistant", content=f"message {i}" if content is None else content)
+
+
+def _cost(m) -> int:
+    return estimate_tokens(format_line(m.role, m.content))
+
+
+def test_window_keeps_newest_messages_within_budget():
+    messages = [_msg(i) for i in range(1, 11)]
+    budget = sum(_cost(m) for m in messages[-3:])
+
+    dropped, kept = select_window(messages, budget, max_messages=50)
+
+    assert [m.id for m in kept] == [8, 9, 10]
+    assert [m.id for m in dropped] == list(range(1, 8))
+
+
+def test_window_respects_max_messages():
+    messages = [_msg(i) for i in range(1, 11)]
+    dropped, kept = select_window(messages, token_budget=10_000, max_messages=4)
+    assert [m.id for m in kept] == [7, 8, 9, 10]
+    assert len(dropped) == 6
+
+
+def test_single_message_over_budget_is_dropped():
+    messages = [_msg(1, "x" * 400)]
+    dropped, kept = select_window(messages, token_budget=10, max_messages=50)
+    assert (dropped, kept) == (messages, [])
+
+
+def test_newest_message_over_budget_drops_everything():
+    messages = [_msg(1), _msg(2), _msg(3, "x" * 400)]
+    dropped, kept = select_window(messages, token_budget=50, max_messages=50)
+    assert kept == [] and dropped == messages
+
+
+def test_fold_summary_clips_lines_and_trims_oldest():
+    summary = fold_summary(None, [_msg(1, "a  b\nc"), _msg(2, "")], max_chars=100, line_chars=50)
+    assert summary == "User: a b c"
+
+    long = fold_summary(summary, [_msg(3, "y" * 80)], max_chars=100, line_chars=20)
+    assert long.splitlines() == ["User: a b c", "User: " + "y" * 13 + "…"]
+
+    trimmed = fold_summary(long, [_msg(4, "z" * 80)], max_chars=45, line_chars=20)
+    assert trimmed.splitlines() == ["User: " + "y" * 13 + "…", "BOBA: " + "z" * 13 + "…"]
+
+
+@pytest.fixture
+def window_settings(monkeypatch):
+    monkeypatch.setattr(settings, "history_max_messages", 4)
+    monkeypatch.setattr(settings, "history_token_budget", 10_000)
+    monkeypatch.setattr(settings, "history_summary_max_chars", 100_000)
+    monkeypatch.setattr(settings, "history_summary_line_chars", 160)
+
+
+def _add_messages(conv_id: int, start: int, count: int) -> list[int]:
+    with SessionLocal() as db:
+        rows = [
+            Message(
+                conversation_id=conv_id,
+                role="user",
+                content=f"m{i}",
+                created_at=T0 + timedelta(minutes=i),
+            )
+            for i in range(start, start + count)
+        ]
+        db.add_all(rows)
+        db.commit()
+        return [m.id for m in rows]
+
+
+def test_backlog_fold_advances_and_next_fold_takes_only_newer_rows(run, conversation, window_settings):
+    _, conv_id = conversation
+    # More than the window fetch (max_messages + 8), as for a conversation
+    # from before summaries existed
+    ids = _add_messages(conv_id, 1, 30)
+
+    async def turn():
+        async with AsyncSessionLocal() as db:
+            conv = await db.get(Conversation, conv_id)
+            base_id = conv.summary_through_id
+            kept, summary, through_id = await history_window_async(db, conv)
+            if through_id is not None:
+                async with unit_of_work(db):
+                    assert await store_summary_async(db, conv, summary, through_id, base_id)
+            return [m.content for m in kept], summary, through_id
+
+    kept, summary, through_id = run(turn())
+    assert kept == ["m27", "m28", "m29", "m30"]
+    assert through_id == ids[25]
+    assert summary.splitlines() == [f"User: m{i}" for i in range(1, 27)]
+
+    _add_messages(conv_id, 31, 3)
+    kept, summary, through_id = run(turn())
+    assert kept == ["m30", "m31", "m32", "m33"]
+    assert through_id == ids[28]
+    assert summary.splitlines() == [f"User: m{i}" for i in range(1, 30)]
+
+    # Nothing new fell out of the window: no fold
+    assert run(turn())[2] is None
+
+
+def test_concurrent_folds_of_the_same_backlog_store_once(run, conversation, window_settings):
+    _, conv_id = conversation
+    _add_messages(conv_id, 1, 10)
+
+    async def fold():
+        async with AsyncSessionLocal() as db:
+            conv = await db.get(Conversation, conv_id)
+            return conv.summary_through_id, await history_window_async(db, conv)
+
+    async def store(base_id, summary, through_id):
+        async with AsyncSessionLocal() as db:
+            conv = await db.get(Conversation, conv_id)
+            async with unit_of_work(db):
+                return await store_summary_async(db, conv, summary, through_id, base_id)
+
+    async def main():
+        (base_a, (_, summary_a, through_a)), (base_b, (_, summary_b, through_b)) = await fold(), await fold()
+        stored = [await store(base_a, summary_a, through_a), await store(base_b, summary_b, through_b)]
+        async with AsyncSessionLocal() as db:
+            conv = await db.get(Conversation, conv_id)
+            return stored, conv.summary, through_a
+
+    stored, summary, through_id = run(main())
+    assert stored == [True, False]
+    assert summary.splitlines() == [f"User: m{i}" for i in range(1, 7)]
@@ -0,0 +1,24 @@
+from app.db import SessionLocal, engine
+from app.migrations import backfill_conversation_stats
+from app.models import Conversation, Message
+
+
+def test_backfill_leaves_empty_conversation_unlisted(conversation):
+    user_pk, empty_id = conversation
+    with SessionLocal() as db:
+        used = Conversation(user_id_fk=user_pk, meta={}, turn_count=1, message_count=0)
+        db.add(used)
+        db.flush()
+        db.add(Message(conversation_id=used.id, role="user", content="hello   there"))
+        db.commit()
+        used_id = used.id
+
+    with engine.begin() as conn:
+        backfill_conversation_stats(conn)
+
+    with SessionLocal() as db:
+        empty, used = db.get(Conversation, empty_id), db.get(Conversation, used_id)
+        assert (empty.message_count, empty.last_message_at) == (0, None)
+        assert used.message_count == 1
+        assert used.last_message_at is not None
+        assert used.last_message_preview == "hello there"
@@ -0,0 +1,89 @@
+import json
+from datetime import datetime, timedelta, timezone
+
+from fastapi.testclient import TestClient
+from sqlalchemy import func, select
+
+from app.db import SessionLocal
+from app.main import app
+from app.models import Mood, MoodDaily
+from scripts import backfill_mood_daily
+
+client = TestClient(app)
+
+
+def _rollup(user_pk: int) -> set[tuple]:
+    with SessionLocal() as db:
+        return set(db.execute(
+            select(
+                MoodDaily.day,
+                MoodDaily.mood,
+                MoodDaily.count,
+                MoodDaily.sum_sentiment,
+                MoodDaily.sentiment_count,
+            ).where(MoodDaily.user_id_fk == user_pk)
+        ).all())
+
+
+def _direct(user_pk: int) -> set[tuple]:
+    with SessionLocal() as db:
+        return set(db.execute(
+            select(
+                Mood.day,
+                Mood.mood,
+                func.count(),
+                func.coalesce(func.sum(Mood.sentiment_score), 0.0),
+                func.count(Mood.sentiment_score),
+            ).where(Mood.user_id_fk == user_pk).group_by(Mood.day, Mood.mood)
+        ).all())
+
+
+def _log(user_id: str, mood: str, score: float | None = None):
+    response = client.post("/mood/log", json={"user_id": user_id, "mood": mood, "sentiment_score": score})
+    assert response.status_code == 200, response.text
+
+
+def _summary(user_id: str) -> dict:
+    response = client.get("/mood/summary", params={"user_id": user_id, "days": 30})
+    assert response.status_code == 200
+    return {d["mood"]: (d["count"], d["avg_sentiment"]) for d in response.json()["distribution"]}
+
+
+def test_rollup_matches_moods_after_log_import_and_backfill(make_user):
+    user_pk, user_id = make_user()
+    today = datetime.now(timezone.utc).date()
+
+    _log(user_id, "happy", 0.5)
+    _log(user_id, "happy")
+    _log(user_id, "sad", -0.25)
+    assert _rollup(user_pk) == _direct(user_pk)
+    assert _summary(user_id) == {"happy": (2, 0.5), "sad": (1, -0.25)}
+
+    # Past days, including one that /mood/log already touched
+    records = [
+        {"user_id": user_id, "mood": "happy", "day": str(today), "sentiment_score": 0.25},
+        {"user_id": user_id, "mood": "tired", "day": str(today - timedelta(days=3))},
+        {"user_id": user_id, "mood": "tired", "created_at": f"{today - timedelta(days=3)}T22:00:00Z",
+         "sentiment_score": -0.5},
+        {"user_id": user_id, "mood": "anxious", "day": str(today - timedelta(days=10)), "sentiment_score": -0.75},
+    ]
+    response = client.post(
+        "/mood/import",
+        content="\n".join(json.dumps(r) for r in records),
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    assert response.json()["imported"] == len(records)
+    assert _rollup(user_pk) == _direct(user_pk)
+    assert _summary(user_id) == {
+        "happy": (3, 0.375),
+        "sad": (1, -0.25),
+        "tired": (2, -0.5),
+        "anxious": (1, -0.75),
+    }
+
+    # A rebuild from scratch lands on the same rows
+    with SessionLocal() as db:
+        db.query(MoodDaily).filter(MoodDaily.user_id_fk == user_pk).update({"count": 99})
+        db.commit()
+    backfill_mood_daily.main()
+    assert _rollup(user_pk) == _direct(user_pk)
@@ -0,0 +1,109 @@
+import json
+
+import anyio
+import httpx
+import pytest
+
+from app.services import llm, resilience
+from app.services.llm import ReplySource, StreamInterrupted
+from app.settings import settings
+
+
+def _ndjson(*chunks) -> bytes:
+    return b"".join((c if isinstance(c, bytes) else json.dumps(c).encode()) + b"\n" for c in chunks)
+
+
+def _delta(text: str) -> dict:
+    return {"message": {"role": "assistant", "content": text}, "done": False}
+
+
+DONE = {"message": {"role": "assistant", "content": ""}, "done": True}
+
+
+@pytest.fixture
+def ollama(monkeypatch):
+    """
+    Routes the shared client to an in-process Ollama stand-in; set
+    `responses["stream"]` / `responses["reply"]` to the bodies it returns.
+    Every request body is kept in `requests`.
+    """
+    responses = {"stream": _ndjson(_delta("hi"), DONE), "reply": {"message": {"content": " hello "}}}
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        assert request.url.path == "/api/chat"
+        body = json.loads(request.content)
+        requests.append(body)
+        if body["stream"]:
+            return httpx.Response(200, content=responses["stream"])
+        return httpx.Response(200, json=responses["reply"])
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(llm, "get_http_client", lambda: client)
+    monkeypatch.setattr(settings, "default_model_provider", "ollama")
+    monkeypatch.setattr(resilience, "_guards", {})
+    yield responses, requests
+    anyio.run(client.aclose)
+
+
+async def _collect(stream) -> str:
+    return "".join([token async for token in stream])
+
+
+def test_stream_concatenates_deltas_and_skips_bad_lines(ollama):
+    responses, requests = ollama
+    responses["stream"] = _ndjson(_delta("I hear "), b"{not json", b"", _delta("you."), DONE, _delta("ignored"))
+
+    text = anyio.run(_collect, llm.ollama_stream("hi", {}, "neutral", None, None))
+
+    assert text == "I hear you."
+    assert requests[0]["stream"] is True
+    assert requests[0]["model"] == settings.ollama_model
+    assert requests[0]["messages"][-1] == {"role": "user", "content": "hi"}
+
+
+def test_error_chunk_mid_stream_interrupts(ollama):
+    responses, _ = ollama
+    responses["stream"] = _ndjson(_delta("I hear "), {"error": "model crashed"})
+
+    source = ReplySource()
+    received = []
+
+    async def main():
+        async for token in llm.stream_reply("hi", {}, "neutral", None, source=source):
+            received.append(token)
+
+    with pytest.raises(StreamInterrupted):
+        anyio.run(main)
+    assert received == ["I hear "]
+    assert source.provider == "ollama"
+
+
+def test_error_chunk_before_first_token_falls_back(ollama):
+    responses, _ = ollama
+    responses["stream"] = _ndjson({"error": "model not found"})
+
+    source = ReplySource()
+    text = anyio.run(_collect, llm.stream_reply("hi", {}, "neutral", None, source=source))
+
+    assert text
+    assert source == ReplySource("rule", "error")
+
+
+def test_generate_reply_reports_ollama(ollama):
+    _, requests = ollama
+
+    text, source = anyio.run(llm.generate_reply, "hi", {}, "neutral", None)
+
+    assert (text, source) == ("hello", ReplySource("ollama"))
+    assert requests[0]["stream"] is False
+
+
+def test_generate_reply_falls_back_on_error_body(ollama):
+    responses, _ = ollama
+    responses["reply"] = {"error": "model not found"}
+
+    text, source = anyio.run(llm.generate_reply, "hi", {}, "neutral", None)
+
+    assert text
+    assert source == ReplySource("rule", "error")
@@ -0,0 +1,105 @@
+from types import SimpleNamespace
+
+import anyio
+import pytest
+from fastapi.testclient import TestClient
+
+from app import main
+from app.services.ratelimit import MemoryBackend, RateLimiter, SQLiteBackend, build_rate_limiter
+
+
+def test_memory_backend_evicts_least_recently_used():
+    backend = MemoryBackend(max_keys=2, ttl_sec=600)
+    backend.hit("a", 1, 1, now=0)
+    backend.hit("b", 1, 1, now=1)
+    backend.hit("a", 1, 1, now=2)  # a is now the most recent
+    backend.hit("c", 1, 1, now=3)
+
+    assert len(backend) == 2
+    assert list(backend._buckets) == ["a", "c"]
+
+
+def test_memory_backend_evicts_idle_keys():
+    backend = MemoryBackend(max_keys=100, ttl_sec=10)
+    backend.hit("idle", 1, 1, now=0)
+    backend.hit("busy", 1, 1, now=5)
+    backend.hit("busy", 1, 1, now=11)
+
+    assert list(backend._buckets) == ["busy"]
+
+
+def test_memory_backend_refills_over_time():
+    backend = MemoryBackend()
+    assert backend.hit("k", 1, 0.5, now=0) == (True, 0.0)
+    allowed, retry_after = backend.hit("k", 1, 0.5, now=1)
+    assert not allowed and retry_after == pytest.approx(1.0)
+    assert backend.hit("k", 1, 0.5, now=2)[0]
+
+
+def test_sqlite_backend_shares_buckets_across_instances(tmp_path):
+    path = str(tmp_path / "buckets.db")
+    first, second = SQLiteBackend(path), SQLiteBackend(path)
+
+    assert first.hit("k", 2, 0.01, now=0)[0]
+    assert second.hit("k", 2, 0.01, now=0)[0]
+    allowed, retry_after = first.hit("k", 2, 0.01, now=0)
+    assert not allowed and retry_after == pytest.approx(100.0)
+    assert second.hit("other", 2, 0.01, now=0)[0]
+
+
+def _settings(**overrides):
+    values = dict(
+        rate_limit_window_sec=60.0,
+        rate_limit_max_requests=2,
+        rate_limit_ip_max_requests=3,
+        rate_limit_backend="memory",
+        rate_limit_sqlite_path="",
+        rate_limit_key="ip",
+        rate_limit_max_keys=100,
+    )
+    values.update(overrides)
+    return SimpleNamespace(**values)
+
+
+@pytest.mark.parametrize("backend", ["memory", "sqlite"])
+def test_limited_chat_request_gets_429_with_retry_after(monkeypatch, tmp_path, backend):
+    limiter = build_rate_limiter(_settings(rate_limit_backend=backend, rate_limit_sqlite_path=str(tmp_path / "rl.db")))
+    monkeypatch.setattr(main, "rate_limiter", limiter)
+    client = TestClient(main.app)
+
+    # Unknown chat path: the middleware still charges it, then it 404s
+    assert [client.get("/chat/text/_probe").status_code for _ in range(2)] == [404, 404]
+    response = client.get("/chat/text/_probe")
+
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "30"
+    assert client.get("/health").status_code == 200
+
+
+def test_rotating_user_ids_still_hit_the_ip_limit(monkeypatch):
+    monkeypatch.setattr(main.settings, "rate_limit_key", "user")
+    monkeypatch.setattr(main, "rate_limiter", build_rate_limiter(_settings(rate_limit_key="user")))
+    client = TestClient(main.app)
+
+    statuses = [
+        client.get("/chat/text/_probe", headers={"X-User-Id": f"user-{i}"}).status_code
+        for i in range(4)
+    ]
+    assert statuses == [404, 404, 404, 429]
+
+
+def test_user_bucket_is_charged_per_id(monkeypatch):
+    limiter = build_rate_limiter(_settings(rate_limit_key="user", rate_limit_ip_max_requests=100))
+
+    async def hits(user_id):
+        return [(await limiter.hit("1.2.3.4", user_id))[0] for _ in range(3)]
+
+    assert anyio.run(hits, "a") == [True, True, False]
+    assert anyio.run(hits, "b") == [True, True, False]
+    # No id: charged to the IP at the per-user rate
+    assert anyio.run(hits, None) == [True, True, False]
+
+
+def test_rate_limiter_rate_matches_window():
+    limiter = RateLimiter(MemoryBackend(), max_requests=10, window_sec=60)
+    assert (limiter.capacity, limiter.rate) == (10.0, pytest.approx(1 / 6))
@@ -0,0 +1,102 @@
+import anyio
+import pytest
+
+from app.services import llm, resilience
+from app.services.llm import ReplySource
+from app.services.resilience import CLOSED, HALF_OPEN, OPEN, provider_guard
+from app.settings import settings
+
+
+@pytest.fixture
+def slow_provider(monkeypatch):
+    """An xai provider that never answers within the 50 ms hedge deadline."""
+    async def slow_reply(*args):
+        await anyio.sleep(1)
+        return "late"
+
+    async def slow_stream(*args):
+        await anyio.sleep(1)
+        yield "late"
+
+    monkeypatch.setattr(settings, "default_model_provider", "xai")
+    monkeypatch.setattr(settings, "xai_api_key", "test-key")
+    monkeypatch.setattr(settings, "llm_hedge_ms", 50)
+    monkeypatch.setitem(llm._PROVIDERS, "xai", (slow_reply, slow_stream))
+    monkeypatch.setattr(resilience, "_guards", {})
+    return provider_guard("xai")
+
+
+def _half_open(guard):
+    # Open long enough ago that the next call is the half-open probe
+    guard.breaker.state = OPEN
+    guard.breaker.opened_at = -guard.breaker.open_sec
+
+
+async def _collect(stream) -> str:
+    return "".join([token async for token in stream])
+
+
+def test_hedged_stream_probe_does_not_close_breaker(slow_provider):
+    guard = slow_provider
+    _half_open(guard)
+
+    source = ReplySource()
+    reply = anyio.run(_collect, llm.stream_reply("hi", {}, "neutral", None, source=source))
+
+    assert reply and reply != "late"  # rule-based fallback
+    assert source == ReplySource("rule", "hedged")
+    assert guard.breaker.state == HALF_OPEN
+    assert guard.counters["cancelled"] == 1
+    assert guard.counters["succeeded"] == 0
+    # Probe released: the next call may probe again
+    assert guard.breaker.allow(0.0)
+
+
+def test_hedged_reply_probe_does_not_close_breaker(slow_provider):
+    guard = slow_provider
+    _half_open(guard)
+
+    _, source = anyio.run(llm.generate_reply, "hi", {}, "neutral", None)
+
+    assert source == ReplySource("rule", "hedged")
+    assert guard.breaker.state == HALF_OPEN
+    assert guard.counters["cancelled"] == 1
+
+
+def test_stream_probe_that_answers_closes_breaker(slow_provider, monkeypatch):
+    async def fast_stream(*args):
+        yield "hello"
+
+    monkeypatch.setitem(llm._PROVIDERS, "xai", (None, fast_stream))
+    guard = slow_provider
+    _half_open(guard)
+
+    source = ReplySource()
+    assert anyio.run(_collect, llm.stream_reply("hi", {}, "neutral", None, source=source)) == "hello"
+    assert source == ReplySource("xai")
+    assert guard.breaker.state == CLOSED
+
+
+def test_open_breaker_reports_rule_fallback(slow_provider):
+    guard = slow_provider
+    guard.breaker.state = OPEN
+    guard.breaker.opened_at = 1e12  # stays open
+
+    _, source = anyio.run(llm.generate_reply, "hi", {}, "neutral", None)
+
+    assert source == ReplySource("rule", "circuit_open")
+
+
+def test_missing_api_key_is_not_a_provider_call(slow_provider, monkeypatch):
+    monkeypatch.setattr(settings, "xai_api_key", None)
+    guard = slow_provider
+
+    _, source = anyio.run(llm.generate_reply, "hi", {}, "neutral", None)
+    assert source == ReplySource("rule", "no_api_key")
+
+    stream_source = ReplySource()
+    assert anyio.run(_collect, llm.stream_reply("hi", {}, "neutral", None, source=stream_source))
+    assert stream_source == ReplySource("rule", "no_api_key")
+
+    assert guard.counters["calls"] == 0
+    assert guard.breaker.state == CLOSED
@@ -0,0 +1,63 @@
+import asyncio
+
+from app.db import AsyncSessionLocal, unit_of_work
+from app.models import Conversation, SentimentState, User
+from app.services.memory import append_message_async
+from app.services.trend import WINDOW, RollingSentiment
+
+TURNS = WINDOW - 2
+
+
+async def _user_turn(user_pk: int, conv_id: int, i: int):
+    async with AsyncSessionLocal() as db:
+        user = await db.get(User, user_pk)
+        conv = await db.get(Conversation, conv_id)
+        async with unit_of_work(db):
+            await append_message_async(
+                db, conv, "user", f"message {i}", {"scores": {"compound": 0.5}}, user=user
+            )
+
+
+def test_concurrent_turns_keep_every_sentiment_update(run, conversation):
+    user_pk, conv_id = conversation
+
+    async def main():
+        await asyncio.gather(*(_user_turn(user_pk, conv_id, i) for i in range(TURNS)))
+        async with AsyncSessionLocal() as db:
+            state = await db.get(SentimentState, user_pk)
+            conv = await db.get(Conversation, conv_id)
+            return state.size, state.early_sum + state.late_sum, conv.message_count
+
+    size, total, message_count = run(main())
+    assert message_count == TURNS
+    assert size == TURNS
+    assert abs(total - 0.5 * TURNS) < 1e-9
+
+
+def test_window_of_another_length_is_rebuilt_from_messages(run, conversation):
+    user_pk, conv_id = conversation
+
+    async def main():
+        for i in range(2):
+            await _user_turn(user_pk, conv_id, i)
+        # As if WINDOW had changed since the state was written
+        async with AsyncSessionLocal() as db:
+            state = await db.get(SentimentState, user_pk)
+            state.window = [0.5] * (WINDOW - 4)
+            await db.commit()
+        await _user_turn(user_pk, conv_id, 2)
+        async with AsyncSessionLocal() as db:
+            state = await db.get(SentimentState, user_pk)
+            rolling = RollingSentiment(WINDOW, state.window, state.head, state.size)
+            return len(state.window), rolling.values(), state.early_sum + state.late_sum
+
+    length, values, total = run(main())
+    assert length == WINDOW
+    assert values == [0.5] * 3
+    assert abs(total - 1.5) < 1e-9
+
+
+def test_rolling_ignores_size_and_sums_without_a_usable_buffer():
+    rolling = RollingSentiment(WINDOW, buf=[0.5] * 3, head=1, size=3, early_sum=0.5, late_sum=1.0)
+    assert rolling.values() == []
+    assert (rolling.early_sum, rolling.late_sum) == (0.0, 0.0)